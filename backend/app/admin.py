@@ -0,0 +1,24 @@
+import hmac
+import os
+
+from fastapi import Header, HTTPException, status
+
+ADMIN_TOKEN_HEADER = "X-Admin-Token"
+
+
+def get_admin_token() -> str:
+    return os.getenv("ADMIN_TOKEN", "").strip()
+
+
+def is_admin_token(value: str | None) -> bool:
+    expected = get_admin_token()
+    if not expected or not value:
+        return False
+    return hmac.compare_digest(value.strip().encode("utf-8"), expected.encode("utf-8"))
+
+
+def require_admin(
+    x_admin_token: str | None = Header(default=None, alias=ADMIN_TOKEN_HEADER),
+) -> None:
+    if not is_admin_token(x_admin_token):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin token required.")
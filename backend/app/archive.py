@@ -0,0 +1,213 @@
+"""Columnar archive of completed tournaments.
+
+`archive_tournament` writes the final standings, ties, matches and final games to
+`<ARCHIVE_DIR>/<name>/`, one columnar file per table plus `meta.json`, and then removes
+the ties, matches, rally events, match players, player stats and finals from the hot
+tables. Teams, players, referees and ratings stay for the next event.
+
+Tables are Arrow IPC files (`.arrow`) when pyarrow is installed. Without it they use a
+small pure-Python columnar format (`.cols`): a magic line, a JSON header holding the row
+count and the byte range of each column, then each column as a JSON array.
+
+Both formats are read through memory mapping, and only the requested columns are
+decoded. Archived results are served without touching the database.
+"""
+
+import json
+import mmap
+import os
+import re
+import shutil
+import time
+from collections.abc import Iterable
+from pathlib import Path
+from typing import Any
+
+from sqlalchemy import delete, update
+from sqlalchemy.orm import Session
+
+from . import crud, exporter, models
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as pa_ipc
+except ImportError:
+    pa = None
+    pa_ipc = None
+
+ARCHIVE_TABLES: tuple[exporter.ExportDataset, ...] = ("standings", "ties", "matches", "final_games")
+COLUMNS_MAGIC = b"B7GCOLS1\n"
+
+_NAME_PATTERN = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_.-]{0,63}$")
+
+
+def get_archive_dir() -> Path:
+    return Path(os.getenv("ARCHIVE_DIR", "").strip() or "archives")
+
+
+def _archive_path(archive_dir: Path, name: str) -> Path:
+    if not _NAME_PATTERN.match(name):
+        raise ValueError("Archive names use letters, digits, '.', '_' and '-' only.")
+    return archive_dir / name
+
+
+def _write_columns(path: Path, columns: list[str], rows: list[dict[str, Any]]) -> None:
+    blobs = [
+        json.dumps([row[column] for row in rows], separators=(",", ":")).encode("utf-8")
+        for column in columns
+    ]
+    offsets: dict[str, list[int]] = {}
+    position = 0
+    for column, blob in zip(columns, blobs, strict=True):
+        offsets[column] = [position, len(blob)]
+        position += len(blob)
+
+    header = json.dumps({"rows": len(rows), "columns": offsets}).encode("utf-8")
+    with path.open("wb") as handle:
+        handle.write(COLUMNS_MAGIC)
+        handle.write(len(header).to_bytes(8, "big"))
+        handle.write(header)
+        for blob in blobs:
+            handle.write(blob)
+
+
+def _read_columns(path: Path, wanted: list[str] | None) -> tuple[list[str], list[list[Any]]]:
+    with path.open("rb") as handle, mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        if data[: len(COLUMNS_MAGIC)] != COLUMNS_MAGIC:
+            raise ValueError(f"{path.name} is not a column archive.")
+        start = len(COLUMNS_MAGIC) + 8
+        header_size = int.from_bytes(data[len(COLUMNS_MAGIC) : start], "big")
+        header = json.loads(data[start : start + header_size])
+        base = start + header_size
+
+        columns = [column for column in header["columns"] if wanted is None or column in wanted]
+        values = []
+        for column in columns:
+            offset, size = header["columns"][column]
+            values.append(json.loads(data[base + offset : base + offset + size]))
+    return columns, values
+
+
+def _write_table(
+    directory: Path, table: str, columns: list[str], rows: list[dict[str, Any]]
+) -> str:
+    if pa is not None:
+        filename = f"{table}.arrow"
+        arrow_table = pa.table({column: [row[column] for row in rows] for column in columns})
+        with pa.OSFile(str(directory / filename), "wb") as sink:
+            with pa_ipc.new_file(sink, arrow_table.schema) as writer:
+                writer.write_table(arrow_table)
+        return filename
+
+    filename = f"{table}.cols"
+    _write_columns(directory / filename, columns, rows)
+    return filename
+
+
+def archive_tournament(
+    db: Session,
+    name: str,
+    archive_dir: Path | None = None,
+    force: bool = False,
+) -> dict[str, Any]:
+    """Archive the current tournament as `name` and clear it from the hot tables."""
+    directory = _archive_path(archive_dir or get_archive_dir(), name)
+    if directory.exists():
+        raise ValueError(f"Archive '{name}' already exists.")
+
+    ties = db.query(models.Tie).all()
+    if not ties:
+        raise ValueError("There is no tournament to archive.")
+    final_match = db.query(models.FinalMatch).first()
+    _, _, league_complete = crud.league_completion_from(ties)
+    completed = league_complete and final_match is not None and final_match.status == "completed"
+    if not completed and not force:
+        raise ValueError("Only a completed tournament (league and final) can be archived.")
+
+    meta: dict[str, Any] = {
+        "name": name,
+        "archived_at": int(time.time()),
+        "completed": completed,
+        "champion": (
+            final_match.winner_team.name if final_match and final_match.winner_team else None
+        ),
+        "tables": {},
+    }
+    # A staging directory left by an interrupted run holds no finished archive.
+    staging = directory.with_name(f".{name}.tmp")
+    shutil.rmtree(staging, ignore_errors=True)
+    staging.mkdir(parents=True)
+    try:
+        for table in ARCHIVE_TABLES:
+            columns, rows = exporter.dataset_rows(db, table)
+            materialized = list(rows)
+            meta["tables"][table] = {
+                "file": _write_table(staging, table, columns, materialized),
+                "rows": len(materialized),
+            }
+        (staging / "meta.json").write_text(json.dumps(meta, indent=2), encoding="utf-8")
+        staging.rename(directory)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    # Every match belongs to a tie, so the whole schedule goes. Rated games keep their
+    # history but lose the match link, since match ids can be reused.
+    db.execute(update(models.RatingGame).values(match_id=None))
+    db.execute(delete(models.RallyEvent))
+    db.execute(delete(models.MatchPlayer))
+    db.execute(delete(models.PlayerStat))
+    db.execute(delete(models.Match))
+    db.execute(delete(models.FinalGame))
+    db.execute(delete(models.FinalMatch))
+    db.execute(delete(models.Tie))
+    db.commit()
+    db.expunge_all()
+    return meta
+
+
+def list_archives(archive_dir: Path | None = None) -> list[dict[str, Any]]:
+    root = archive_dir or get_archive_dir()
+    if not root.is_dir():
+        return []
+    return [
+        json.loads((path / "meta.json").read_text(encoding="utf-8"))
+        for path in sorted(root.iterdir())
+        if (path / "meta.json").is_file()
+    ]
+
+
+def read_archive_table(
+    name: str,
+    table: str,
+    columns: Iterable[str] | None = None,
+    archive_dir: Path | None = None,
+) -> list[dict[str, Any]]:
+    directory = _archive_path(archive_dir or get_archive_dir(), name)
+    meta_path = directory / "meta.json"
+    if not meta_path.is_file():
+        raise LookupError("Archive not found.")
+    entry = json.loads(meta_path.read_text(encoding="utf-8"))["tables"].get(table)
+    if entry is None:
+        raise LookupError("Archived table not found.")
+
+    wanted = list(columns) if columns is not None else None
+    path = directory / entry["file"]
+    if path.suffix == ".arrow":
+        if pa is None:
+            raise ValueError("pyarrow is required to read this archive.")
+        with pa.memory_map(str(path), "r") as source:
+            # Zero-copy: the table's buffers point into the mapping, so convert before closing it.
+            arrow_table = pa_ipc.open_file(source).read_all()
+            if wanted is not None:
+                arrow_table = arrow_table.select(
+                    [column for column in arrow_table.column_names if column in wanted]
+                )
+            return arrow_table.to_pylist()
+
+    names, values = _read_columns(path, wanted)
+    return (
+        [dict(zip(names, row, strict=True)) for row in zip(*values, strict=True)]
+        if names
+        else [{} for _ in range(entry["rows"])]
+    )
@@ -0,0 +1,308 @@
+"""Data version, in-process response cache and cross-worker invalidation.
+
+Every session commit that wrote tournament data also bumps a data version in the same
+transaction:
+
+- Postgres: `nextval('data_version_seq')` plus `pg_notify('b7g_data_version', <version>)`.
+  The notification is delivered to listeners only if the transaction commits.
+- other databases: the single `data_version` row is incremented.
+
+Each worker process tracks the version it last saw. Its own commits advance it
+immediately; a listener thread picks up everybody else's (`LISTEN` on Postgres, polling
+the `data_version` row every `DATA_VERSION_POLL_SECONDS` elsewhere). Any change clears
+the response cache and wakes clients waiting on `/viewer/version` or `/viewer/stream`.
+
+Versions are change tokens, not an ordering: Postgres may deliver them out of order and
+a database reset starts them again, so "different" always means "changed".
+
+The response cache (`RESPONSE_CACHE_ENABLED`) keeps computed read payloads until the
+version moves. Replica sessions bypass it: a lagging replica must not pin an old payload
+to a newer version. So does the score buffer, whose taps change payloads without a
+commit.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+from collections.abc import Callable, Hashable
+from typing import Any, TypeVar
+
+from sqlalchemy import event, func, select, text, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import ORMExecuteState, Session
+
+from . import models, score_buffer
+from .database import env_flag
+
+logger = logging.getLogger(__name__)
+
+NOTIFY_CHANNEL = "b7g_data_version"
+
+T = TypeVar("T")
+
+# Bookkeeping tables whose writes do not change what spectators see.
+_UNTRACKED_TABLES = {models.IdempotencyKey.__tablename__, models.DataVersion.__tablename__}
+
+
+def get_poll_seconds() -> float:
+    return max(0.05, float(os.getenv("DATA_VERSION_POLL_SECONDS", "1")))
+
+
+class DataVersion:
+    """The data version this process has seen, with async waiters for the next change."""
+
+    def __init__(self) -> None:
+        self._value = 0
+        self._lock = threading.Lock()
+        self._waiters: set[tuple[asyncio.AbstractEventLoop, asyncio.Event]] = set()
+        self._callbacks: list[Callable[[], None]] = []
+
+    @property
+    def value(self) -> int:
+        return self._value
+
+    def on_change(self, callback: Callable[[], None]) -> None:
+        self._callbacks.append(callback)
+
+    def advance(self, value: int) -> bool:
+        """Record `value` (from any thread); returns whether it was a change."""
+        with self._lock:
+            if value == self._value:
+                return False
+            self._value = value
+            waiters = list(self._waiters)
+
+        for callback in self._callbacks:
+            callback()
+        for loop, changed in waiters:
+            try:
+                loop.call_soon_threadsafe(changed.set)
+            except RuntimeError:
+                # The waiter's event loop is already closed.
+                pass
+        return True
+
+    async def wait_for_change(self, since: int, timeout: float) -> int:
+        """Return the version once it differs from `since`, or after `timeout` seconds."""
+        changed = asyncio.Event()
+        waiter = (asyncio.get_running_loop(), changed)
+        with self._lock:
+            if self._value != since:
+                return self._value
+            self._waiters.add(waiter)
+
+        try:
+            await asyncio.wait_for(changed.wait(), timeout)
+        except TimeoutError:
+            pass
+        finally:
+            with self._lock:
+                self._waiters.discard(waiter)
+        return self._value
+
+
+data_version = DataVersion()
+
+
+def bump_data_version(db: Session) -> int:
+    """Advance the stored data version inside the session's transaction."""
+    if db.get_bind().dialect.name == "postgresql":
+        bump = text(
+            "WITH bumped AS (SELECT nextval('data_version_seq') AS version) "
+            "SELECT version, pg_notify(:channel, version::text) FROM bumped"
+        )
+        return int(db.execute(bump, {"channel": NOTIFY_CHANNEL}).scalar_one())
+
+    bump = (
+        update(models.DataVersion)
+        .where(models.DataVersion.id == 1)
+        .values(version=models.DataVersion.version + 1)
+        .returning(models.DataVersion.version)
+        .execution_options(synchronize_session=False)
+    )
+    return int(db.execute(bump).scalar_one())
+
+
+def read_data_version(engine: Engine) -> int:
+    with engine.connect() as connection:
+        if engine.dialect.name == "postgresql":
+            return int(
+                connection.execute(text("SELECT last_value FROM data_version_seq")).scalar_one()
+            )
+        value = connection.execute(select(func.max(models.DataVersion.version))).scalar()
+        return int(value or 0)
+
+
+def _tracked(obj: Any) -> bool:
+    return getattr(obj, "__tablename__", None) not in _UNTRACKED_TABLES
+
+
+def _touches_data(db: Session) -> bool:
+    # `db.dirty` also holds objects whose attributes were set to the values they had.
+    return (
+        any(_tracked(obj) for obj in db.new)
+        or any(_tracked(obj) for obj in db.deleted)
+        or any(_tracked(obj) and db.is_modified(obj) for obj in db.dirty)
+    )
+
+
+@event.listens_for(Session, "after_flush")
+def _mark_flushed_changes(db: Session, flush_context: Any) -> None:
+    if _touches_data(db):
+        db.info["data_changed"] = True
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _mark_bulk_changes(state: ORMExecuteState) -> None:
+    if state.is_insert or state.is_update or state.is_delete:
+        table = getattr(state.statement, "table", None)
+        if getattr(table, "name", None) not in _UNTRACKED_TABLES:
+            state.session.info["data_changed"] = True
+
+
+def has_data_changes(db: Session) -> bool:
+    """Whether the session's open transaction wrote, or is about to flush, tracked data."""
+    # Pending objects are flushed after `before_commit`, so they count as changes too.
+    return bool(db.info.get("data_changed")) or _touches_data(db)
+
+
+@event.listens_for(Session, "before_commit")
+def _bump_before_commit(db: Session) -> None:
+    changed = has_data_changes(db)
+    db.info.pop("data_changed", None)
+    if changed and not db.info.get("read_only"):
+        db.info["data_version"] = bump_data_version(db)
+        # The bump itself is a write; it must not mark the next transaction as changed.
+        db.info.pop("data_changed", None)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_after_commit(db: Session) -> None:
+    # The commit's own flush runs after `before_commit` and marks changes again.
+    db.info.pop("data_changed", None)
+    version = db.info.pop("data_version", None)
+    if version is not None:
+        data_version.advance(version)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(db: Session) -> None:
+    db.info.pop("data_changed", None)
+    db.info.pop("data_version", None)
+
+
+class DataVersionListener:
+    """Per-worker thread that follows data versions committed by other processes."""
+
+    def __init__(self, engine: Engine, poll_seconds: float) -> None:
+        self._engine = engine
+        self._poll_seconds = poll_seconds
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="data-version-listener", daemon=True)
+        self._thread.start()
+
+    def close(self) -> None:
+        self._stopped.set()
+        self._thread.join(timeout=self._poll_seconds + 1)
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            try:
+                if self._engine.dialect.name == "postgresql":
+                    self._listen()
+                else:
+                    self._poll()
+            except Exception:
+                logger.exception("Data version listener failed; retrying.")
+                self._stopped.wait(self._poll_seconds)
+
+    def _poll(self) -> None:
+        while not self._stopped.is_set():
+            data_version.advance(read_data_version(self._engine))
+            self._stopped.wait(self._poll_seconds)
+
+    def _listen(self) -> None:
+        raw = self._engine.raw_connection()
+        try:
+            connection = raw.driver_connection
+            connection.autocommit = True
+            connection.execute(f"LISTEN {NOTIFY_CHANNEL}")
+            # Catch up on anything committed while no listener was connected.
+            data_version.advance(read_data_version(self._engine))
+            while not self._stopped.is_set():
+                for notify in connection.notifies(timeout=self._poll_seconds):
+                    data_version.advance(int(notify.payload))
+        finally:
+            raw.invalidate()
+
+
+class ResponseCache:
+    """Read payloads keyed by route and parameters, valid for one data version."""
+
+    def __init__(self) -> None:
+        self._entries: dict[Hashable, tuple[int, Any]] = {}
+        self._lock = threading.Lock()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def get_or_build(self, key: Hashable, build: Callable[[], T]) -> T:
+        # Read the version first: a write committed while building makes the entry stale.
+        version = data_version.value
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None and entry[0] == version:
+            return entry[1]
+
+        value = build()
+        with self._lock:
+            self._entries[key] = (version, value)
+        return value
+
+
+_cache: ResponseCache | None = None
+_listener: DataVersionListener | None = None
+
+
+def get_response_cache() -> ResponseCache | None:
+    return _cache
+
+
+def set_response_cache(cache: ResponseCache | None) -> None:
+    global _cache
+    _cache = cache
+
+
+def cached(
+    db: Session, key: Hashable, build: Callable[[], T], cache: ResponseCache | None = None
+) -> T:
+    """`build()` through `cache` (the response cache when enabled), if `db` reads the primary."""
+    cache = cache or _cache
+    if cache is None or db.info.get("read_only") or score_buffer.get_score_buffer() is not None:
+        return build()
+    return cache.get_or_build(key, build)
+
+
+def _clear_response_cache() -> None:
+    cache = _cache
+    if cache is not None:
+        cache.clear()
+
+
+data_version.on_change(_clear_response_cache)
+
+
+def configure_cache(engine: Engine) -> DataVersionListener | None:
+    global _listener
+    if env_flag("RESPONSE_CACHE_ENABLED"):
+        set_response_cache(ResponseCache())
+
+    if engine.dialect.name == "sqlite" and engine.url.database in (None, "", ":memory:"):
+        # A private in-memory database has no other writers to follow.
+        return None
+
+    data_version.advance(read_data_version(engine))
+    _listener = DataVersionListener(engine, get_poll_seconds())
+    return _listener
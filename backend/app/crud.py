@@ -1,9 +1,13 @@
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager
 from typing import Literal
 
-from sqlalchemy import func
-from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import ColumnElement, and_, delete, insert, or_, select, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session, contains_eager, joinedload, selectinload
 
-from . import models, schemas, serializers
+from . import cache, models, ratings, schemas, serializers, tiebreaks, win_probability
 
 MatchStage = Literal["tie"]
 MatchStatus = Literal["pending", "live", "completed"]
@@ -35,10 +39,7 @@ def _match_sort_key(match: models.Match) -> tuple[int, int, int, str, int, int,
 
 
 def _is_finished(score1: int, score2: int) -> bool:
-    high = max(score1, score2)
-    low = min(score1, score2)
-
-    return (high >= 21 and (high - low) >= 2) or high == 30
+    return win_probability.game_finished(score1, score2)
 
 
 def _calculate_winner_side(score1: int, score2: int) -> int | None:
@@ -92,12 +93,6 @@ def _lineup_parts(value: str) -> list[str]:
     return [_normalize_text(item) for item in value.split("/") if _normalize_text(item)]
 
 
-def _is_decider_match(match: models.Match) -> bool:
-    if match.match_no == 13:
-        return True
-    return "decider" in (match.discipline or "").lower()
-
-
 def _is_decider_unlocked(tie: models.Tie | None) -> bool:
     if tie is None:
         return False
@@ -117,14 +112,14 @@ def _is_decider_allowed_in_views(tie: models.Tie | None) -> bool:
 
 
 def _assert_decider_unlocked(match: models.Match) -> None:
-    if not _is_decider_match(match):
+    if not models.is_decider_match(match):
         return
     if not _is_decider_unlocked(match.tie):
         raise ValueError("Game 13 can start only when the tie score is 6-6.")
 
 
 def _should_include_match_in_views(match: models.Match) -> bool:
-    if not _is_decider_match(match):
+    if not models.is_decider_match(match):
         return True
 
     tie = match.tie
@@ -133,29 +128,36 @@ def _should_include_match_in_views(match: models.Match) -> bool:
     return _is_decider_allowed_in_views(tie)
 
 
-def _recalculate_tie(db: Session, tie_id: int) -> None:
-    tie = db.get(models.Tie, tie_id)
-    if not tie:
-        return
+TieAggregates = tuple[int, int, int | None, int, int, int | None, str, int | None]
 
-    matches = (
-        db.query(models.Match)
-        .filter(models.Match.tie_id == tie_id, models.Match.stage == "tie")
-        .order_by(models.Match.match_no.asc())
-        .all()
-    )
+_TIE_AGGREGATE_COLUMNS = (
+    "score1",
+    "score2",
+    "regular_total",
+    "regular_completed",
+    "started_matches",
+    "decider_winner_side",
+    "status",
+    "winner_team_id",
+)
 
-    score1 = sum(1 for match in matches if match.winner_side == 1)
-    score2 = sum(1 for match in matches if match.winner_side == 2)
 
-    tie.score1 = score1
-    tie.score2 = score2
+# (winner side, started, team1 score, team2 score) of a match before a write.
+MatchContribution = tuple[int | None, bool, int, int]
 
-    regular_matches = [match for match in matches if not _is_decider_match(match)]
-    decider_match = next((match for match in matches if _is_decider_match(match)), None)
-    regular_completed = sum(1 for match in regular_matches if match.winner_side in (1, 2))
-    all_regular_completed = bool(regular_matches) and regular_completed == len(regular_matches)
-    decider_completed = decider_match is not None and decider_match.winner_side in (1, 2)
+
+def _match_tie_contribution(match: models.Match) -> MatchContribution:
+    started = match.status == "live" or (match.team1_score or 0) > 0 or (match.team2_score or 0) > 0
+    return match.winner_side, started, match.team1_score or 0, match.team2_score or 0
+
+
+def _tie_aggregates(tie: models.Tie) -> TieAggregates:
+    return tuple(getattr(tie, column) for column in _TIE_AGGREGATE_COLUMNS)  # type: ignore[return-value]
+
+
+def _apply_tie_result(tie: models.Tie) -> None:
+    all_regular_completed = bool(tie.regular_total) and tie.regular_completed == tie.regular_total
+    decider_completed = tie.decider_winner_side in (1, 2)
 
     winner_team_id = None
     tie_completed = False
@@ -163,25 +165,272 @@ def _recalculate_tie(db: Session, tie_id: int) -> None:
     # Tie result becomes final only after all 12 regular matches are complete.
     # If regular matches end 6-6, result is final only after decider (Game 13) completes.
     if all_regular_completed:
-        if score1 != score2:
-            winner_team_id = tie.team1_id if score1 > score2 else tie.team2_id
+        if tie.score1 != tie.score2:
+            winner_team_id = tie.team1_id if tie.score1 > tie.score2 else tie.team2_id
             tie_completed = True
         elif decider_completed:
-            winner_team_id = tie.team1_id if score1 > score2 else tie.team2_id
+            winner_team_id = tie.team1_id if tie.score1 > tie.score2 else tie.team2_id
             tie_completed = True
 
     tie.winner_team_id = winner_team_id
 
     if tie_completed:
         tie.status = "completed"
-    elif any(match.status == "live" for match in matches) or any(
-        match.team1_score > 0 or match.team2_score > 0 for match in matches
-    ):
+    elif tie.started_matches > 0:
         tie.status = "live"
     else:
         tie.status = "pending"
 
+
+def _recount_tie_from_matches(tie: models.Tie, matches: list[models.Match]) -> None:
+    matches = sorted(
+        (match for match in matches if match.stage == "tie"), key=lambda match: match.match_no
+    )
+    regular_matches = [match for match in matches if not models.is_decider_match(match)]
+    decider_match = next((match for match in matches if models.is_decider_match(match)), None)
+
+    tie.score1 = sum(1 for match in matches if match.winner_side == 1)
+    tie.score2 = sum(1 for match in matches if match.winner_side == 2)
+    tie.regular_total = len(regular_matches)
+    tie.regular_completed = sum(1 for match in regular_matches if match.winner_side in (1, 2))
+    tie.started_matches = sum(1 for match in matches if _match_tie_contribution(match)[1])
+    tie.decider_winner_side = decider_match.winner_side if decider_match is not None else None
+
+    _apply_tie_result(tie)
+
+
+def _recount_tie(db: Session, tie: models.Tie) -> None:
+    # Full recount; loaded matches come from the identity map with pending edits applied.
+    matches = db.query(models.Match).filter(models.Match.tie_id == tie.id).all()
+    _recount_tie_from_matches(tie, matches)
+
+
+def _shift_tie_counters(tie: models.Tie, match: models.Match, before: MatchContribution) -> None:
+    old_winner, old_started = before[:2]
+    new_winner, new_started = _match_tie_contribution(match)[:2]
+
+    tie.score1 += int(new_winner == 1) - int(old_winner == 1)
+    tie.score2 += int(new_winner == 2) - int(old_winner == 2)
+    if models.is_decider_match(match):
+        tie.decider_winner_side = new_winner
+    else:
+        tie.regular_completed += int(new_winner in (1, 2)) - int(old_winner in (1, 2))
+    tie.started_matches += int(new_started) - int(old_started)
+
+
+def _apply_match_deltas(db: Session, changes: list[tuple[models.Match, MatchContribution]]) -> None:
+    """Move tie aggregates from each match's `before` contribution to its current one.
+
+    Counter shifts are O(1) and query-free once a tie's aggregates are known; ties
+    created outside crud (seed, imports) start with NULL aggregates and are recounted
+    once. Status, winner and the optional verification run once per affected tie.
+    """
+    _apply_player_stat_deltas(db, changes)
+
+    ties: dict[int, models.Tie] = {}
+    for match, _ in changes:
+        if match.stage == "tie" and match.tie is not None:
+            ties.setdefault(match.tie.id, match.tie)
+    if not ties:
+        return
+
+    if db.info.get("tie_aggregates") == "trigger":
+        # Triggers recount the tie rows during the flush; reload them lazily if read again.
+        db.flush()
+        for tie in ties.values():
+            db.expire(tie, list(_TIE_AGGREGATE_COLUMNS))
+            if db.info.get("tie_aggregate_verify"):
+                _verify_tie_aggregates(db, tie)
+        return
+
+    for match, before in changes:
+        tie = match.tie
+        if match.stage == "tie" and tie is not None and tie.regular_total is not None:
+            _shift_tie_counters(tie, match, before)
+
+    for tie in ties.values():
+        if tie.regular_total is None:
+            _recount_tie(db, tie)
+            continue
+
+        _apply_tie_result(tie)
+        if db.info.get("tie_aggregate_verify"):
+            _verify_tie_aggregates(db, tie)
+
+
+def _apply_match_delta(db: Session, match: models.Match, before: MatchContribution) -> None:
+    _apply_match_deltas(db, [(match, before)])
+
+
+def _match_result(contribution: MatchContribution) -> tuple[int, int, int] | None:
+    winner_side, _, score1, score2 = contribution
+    return (winner_side, score1, score2) if winner_side in (1, 2) else None
+
+
+def _player_stat_rows(
+    result: tuple[int, int, int],
+    discipline: str,
+    participants: list[tuple[int, int, str]],
+    sign: int,
+) -> list[dict[str, object]]:
+    winner_side, score1, score2 = result
+    deuce = int(min(score1, score2) >= 20)
+    rows = []
+    for player_id, side, set_level in participants:
+        own, other = (score1, score2) if side == 1 else (score2, score1)
+        for key in (discipline, models.PlayerStat.ALL_DISCIPLINES):
+            rows.append(
+                {
+                    "player_id": player_id,
+                    "discipline": key,
+                    "set_level": set_level,
+                    "played": sign,
+                    "wins": sign * int(winner_side == side),
+                    "losses": sign * int(winner_side != side),
+                    "points_for": sign * own,
+                    "points_against": sign * other,
+                    "deuce_games": sign * deuce,
+                }
+            )
+    return rows
+
+
+PLAYER_STAT_BATCH_SIZE = 500
+_PLAYER_STAT_COUNTERS = ("played", "wins", "losses", "points_for", "points_against", "deuce_games")
+
+
+def _add_player_stats(db: Session, rows: list[dict[str, object]]) -> None:
+    merged: dict[tuple[object, object], dict[str, object]] = {}
+    for row in rows:
+        key = (row["player_id"], row["discipline"])
+        if key not in merged:
+            merged[key] = dict(row)
+            continue
+        for column in _PLAYER_STAT_COUNTERS:
+            merged[key][column] += row[column]  # type: ignore[operator]
+    changed = [
+        row for row in merged.values() if any(row[column] for column in _PLAYER_STAT_COUNTERS)
+    ]
+    if not changed:
+        return
+
+    # One upsert adds every delta (a match completion is a single statement) and
+    # creates rows for first-time players; a rebuild goes in chunks.
+    for start in range(0, len(changed), PLAYER_STAT_BATCH_SIZE):
+        statement = _upsert(db, models.PlayerStat).values(
+            changed[start : start + PLAYER_STAT_BATCH_SIZE]
+        )
+        db.execute(
+            statement.on_conflict_do_update(
+                index_elements=[models.PlayerStat.player_id, models.PlayerStat.discipline],
+                set_={
+                    "set_level": statement.excluded.set_level,
+                    **{
+                        column: getattr(models.PlayerStat, column)
+                        + getattr(statement.excluded, column)
+                        for column in _PLAYER_STAT_COUNTERS
+                    },
+                },
+            )
+        )
+
+
+def _match_participants(db: Session, match_ids: list[int]) -> dict[int, list[tuple[int, int, str]]]:
+    participants: dict[int, list[tuple[int, int, str]]] = {}
+    rows = db.execute(
+        select(
+            models.MatchPlayer.match_id,
+            models.MatchPlayer.player_id,
+            models.MatchPlayer.side,
+            models.Player.set_level,
+        )
+        .join(models.Player, models.Player.id == models.MatchPlayer.player_id)
+        .where(models.MatchPlayer.match_id.in_(match_ids))
+    ).all()
+    for match_id, player_id, side, set_level in rows:
+        participants.setdefault(match_id, []).append((player_id, side, set_level))
+    return participants
+
+
+def _apply_player_stat_deltas(
+    db: Session, changes: list[tuple[models.Match, MatchContribution]]
+) -> None:
+    """Move player stats from each match's `before` result to its current one.
+
+    Only completed results count, so this is query-free unless a write completes,
+    corrects or reopens a match.
+    """
+    moved = [
+        (match, old, new)
+        for match, before in changes
+        if (old := _match_result(before)) != (new := _match_result(_match_tie_contribution(match)))
+    ]
+    if not moved:
+        return
+
+    participants = _match_participants(db, [match.id for match, _, _ in moved])
+    rows: list[dict[str, object]] = []
+    for match, old, new in moved:
+        players = participants.get(match.id, [])
+        if old is not None:
+            rows += _player_stat_rows(old, match.discipline, players, -1)
+        if new is not None:
+            rows += _player_stat_rows(new, match.discipline, players, 1)
+    _add_player_stats(db, rows)
+
+    # Ratings only follow the winner, so a corrected score with the same winner keeps them.
+    ratings.rerate(
+        db,
+        [
+            (
+                match.id,
+                match.discipline,
+                new[0] if new else None,
+                _rated_players(participants.get(match.id, [])),
+            )
+            for match, old, new in moved
+            if (old[0] if old else None) != (new[0] if new else None)
+        ],
+    )
+
+
+def _rated_players(players: list[tuple[int, int, str]]) -> list[tuple[int, int]]:
+    return [(player_id, side) for player_id, side, _ in players]
+
+
+def _verify_tie_aggregates(db: Session, tie: models.Tie) -> None:
+    incremental = _tie_aggregates(tie)
+    _recount_tie(db, tie)
+    recounted = _tie_aggregates(tie)
+    if incremental != recounted:
+        raise RuntimeError(
+            f"Tie {tie.id} aggregates drifted: incremental={incremental} recounted={recounted}."
+        )
+
+
+def recount_ties(db: Session, tie_id: int | None = None) -> tuple[int, list[int]]:
+    """Recount tie aggregates from their matches; returns (ties checked, repaired tie ids)."""
+    query = (
+        db.query(models.Tie)
+        .options(selectinload(models.Tie.matches))
+        .order_by(models.Tie.tie_no.asc())
+    )
+    if tie_id is not None:
+        query = query.filter(models.Tie.id == tie_id)
+
+    ties = query.all()
+    if tie_id is not None and not ties:
+        raise LookupError("Tie not found.")
+
+    repaired: list[int] = []
+    for tie in ties:
+        stored = _tie_aggregates(tie)
+        _recount_tie_from_matches(tie, list(tie.matches))
+        if _tie_aggregates(tie) != stored:
+            repaired.append(tie.id)
+
     db.commit()
+    return len(ties), repaired
 
 
 # ---------------------------------------------------------------------------
@@ -193,23 +442,28 @@ def get_teams(db: Session) -> list[models.Team]:
     return db.query(models.Team).order_by(models.Team.name.asc()).all()
 
 
+def _upsert(db: Session, model: type[models.Base]) -> postgresql.Insert | sqlite.Insert:
+    """Dialect insert supporting ON CONFLICT for `model`."""
+    dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+    return dialect.insert(model)
+
+
 def create_team(db: Session, payload: schemas.TeamCreate) -> models.Team:
     name = _normalize_text(payload.name)
     if not name:
         raise ValueError("Team name cannot be empty.")
 
-    existing = (
-        db.query(models.Team)
-        .filter(func.lower(models.Team.name) == name.lower())
-        .first()
-    )
-    if existing:
+    team = db.scalars(
+        _upsert(db, models.Team)
+        .values(name=name, name_key=models.name_key(name))
+        .on_conflict_do_nothing(index_elements=[models.Team.name_key])
+        .returning(models.Team)
+    ).one_or_none()
+    if team is None:
+        db.rollback()
         raise ValueError("A team with this name already exists.")
 
-    team = models.Team(name=name)
-    db.add(team)
     db.commit()
-    db.refresh(team)
     return team
 
 
@@ -231,21 +485,22 @@ def create_player(db: Session, payload: schemas.PlayerCreate) -> models.Player:
     if not team:
         raise LookupError("Team not found.")
 
-    existing = (
-        db.query(models.Player)
-        .filter(
-            models.Player.team_id == payload.team_id,
-            func.lower(models.Player.name) == name.lower(),
+    player = db.scalars(
+        _upsert(db, models.Player)
+        .values(
+            name=name,
+            name_key=models.name_key(name),
+            set_level=payload.set_level,
+            team_id=payload.team_id,
         )
-        .first()
-    )
-    if existing:
+        .on_conflict_do_nothing(index_elements=[models.Player.team_id, models.Player.name_key])
+        .returning(models.Player)
+    ).one_or_none()
+    if player is None:
+        db.rollback()
         raise ValueError("A player with this name already exists for this team.")
 
-    player = models.Player(name=name, set_level=payload.set_level, team_id=payload.team_id)
-    db.add(player)
     db.commit()
-    db.refresh(player)
     return player
 
 
@@ -280,6 +535,115 @@ def get_ties(db: Session) -> list[models.Tie]:
     return ties
 
 
+def _get_team_or_raise(db: Session, team_id: int) -> models.Team:
+    team = db.get(models.Team, team_id)
+    if team is None:
+        raise LookupError("Team not found.")
+    return team
+
+
+def _ties_with_visible_matches(
+    db: Session,
+    condition: ColumnElement[bool],
+) -> list[tuple[models.Tie, list[models.Match]]]:
+    ties = (
+        db.query(models.Tie)
+        .options(
+            selectinload(models.Tie.team1),
+            selectinload(models.Tie.team2),
+            selectinload(models.Tie.winner_team),
+            selectinload(models.Tie.matches).selectinload(models.Match.team1),
+            selectinload(models.Tie.matches).selectinload(models.Match.team2),
+            selectinload(models.Tie.matches).selectinload(models.Match.referee),
+        )
+        .filter(condition)
+        .order_by(models.Tie.tie_no.asc())
+        .all()
+    )
+    return [
+        (tie, sorted(visible_matches(tie.matches), key=lambda match: match.match_no))
+        for tie in ties
+    ]
+
+
+def get_team_fixtures(db: Session, team_id: int) -> schemas.TeamFixtures:
+    team = _get_team_or_raise(db, team_id)
+    # Served by the (team1_id, team2_id) and (team2_id, team1_id) indexes, one per branch.
+    ties = _ties_with_visible_matches(
+        db, or_(models.Tie.team1_id == team_id, models.Tie.team2_id == team_id)
+    )
+    return build_team_fixtures_from(team, ties)
+
+
+def build_team_fixtures_from(
+    team: models.Team,
+    ties: list[tuple[models.Tie, list[models.Match]]],
+) -> schemas.TeamFixtures:
+    return schemas.TeamFixtures(
+        team=schemas.TeamRead(id=team.id, name=team.name),
+        ties=[
+            serializers.tie_to_read(tie, matches)
+            for tie, matches in ties
+            if team.id in (tie.team1_id, tie.team2_id)
+        ],
+    )
+
+
+def get_head_to_head(db: Session, team_a_id: int, team_b_id: int) -> schemas.HeadToHead:
+    if team_a_id == team_b_id:
+        raise ValueError("Head-to-head needs two different teams.")
+    team_a = _get_team_or_raise(db, team_a_id)
+    team_b = _get_team_or_raise(db, team_b_id)
+    ties = _ties_with_visible_matches(
+        db,
+        or_(
+            and_(models.Tie.team1_id == team_a_id, models.Tie.team2_id == team_b_id),
+            and_(models.Tie.team1_id == team_b_id, models.Tie.team2_id == team_a_id),
+        ),
+    )
+    return build_head_to_head_from(team_a, team_b, ties)
+
+
+def build_head_to_head_from(
+    team_a: models.Team,
+    team_b: models.Team,
+    ties: list[tuple[models.Tie, list[models.Match]]],
+) -> schemas.HeadToHead:
+    """Record of `team_a` against `team_b` over completed ties and completed matches."""
+    pair = {team_a.id, team_b.id}
+    record = schemas.HeadToHead(
+        team_a=schemas.TeamRead(id=team_a.id, name=team_a.name),
+        team_b=schemas.TeamRead(id=team_b.id, name=team_b.name),
+    )
+    for tie, matches in ties:
+        if {tie.team1_id, tie.team2_id} != pair:
+            continue
+        record.ties.append(serializers.tie_to_read(tie, matches))
+        if tie.status == "completed":
+            record.ties_played += 1
+            if tie.winner_team_id == team_a.id:
+                record.team_a_ties_won += 1
+            elif tie.winner_team_id == team_b.id:
+                record.team_b_ties_won += 1
+
+        for match in matches:
+            if match.status != "completed":
+                continue
+            a_side = 1 if match.team1_id == team_a.id else 2
+            a_score, b_score = (
+                (match.team1_score, match.team2_score)
+                if a_side == 1
+                else (match.team2_score, match.team1_score)
+            )
+            record.team_a_points += a_score
+            record.team_b_points += b_score
+            if match.winner_side == a_side:
+                record.team_a_games_won += 1
+            elif match.winner_side is not None:
+                record.team_b_games_won += 1
+    return record
+
+
 def get_tie_or_raise(db: Session, tie_id: int) -> models.Tie:
     tie = (
         db.query(models.Tie)
@@ -322,9 +686,14 @@ def list_matches(
     if tie_id is not None:
         query = query.filter(models.Match.tie_id == tie_id)
 
-    matches = [match for match in query.all() if _should_include_match_in_views(match)]
-    matches.sort(key=_match_sort_key)
-    return matches
+    return visible_matches(query.all())
+
+
+def visible_matches(matches: list[models.Match]) -> list[models.Match]:
+    """Matches shown to viewers (locked deciders hidden), in schedule order."""
+    return sorted(
+        (match for match in matches if _should_include_match_in_views(match)), key=_match_sort_key
+    )
 
 
 def list_matches_by_tie(db: Session, tie_id: int) -> list[models.Match]:
@@ -350,20 +719,122 @@ def get_match_or_raise(db: Session, match_id: int) -> models.Match:
     return match
 
 
-def update_score(db: Session, match_id: int, score1: int, score2: int) -> models.Match:
-    _validate_score_input(score1, score2)
+_write_locks: dict[tuple[str, int], threading.Lock] = {}
+_write_locks_guard = threading.Lock()
+
+
+def _get_write_lock(kind: str, key: int) -> threading.Lock:
+    with _write_locks_guard:
+        lock = _write_locks.get((kind, key))
+        if lock is None:
+            lock = _write_locks[(kind, key)] = threading.Lock()
+        return lock
+
+
+def _uses_row_locks(db: Session) -> bool:
+    return db.get_bind().dialect.name == "postgresql"
+
 
-    match = db.get(models.Match, match_id)
+@contextmanager
+def _serialized_write(db: Session, locks: "list[threading.Lock]") -> Iterator[None]:
+    # Locks are taken in a stable order (sorted keys) so multi-tie writes cannot deadlock.
+    for lock in locks:
+        lock.acquire()
+    try:
+        yield
+    except (LookupError, ValueError):
+        if cache.has_data_changes(db):
+            db.rollback()
+        else:
+            # A rule failed before anything was written: end the transaction without
+            # expiring every loaded object, which a rollback would do.
+            db.commit()
+        raise
+    except BaseException:
+        db.rollback()
+        raise
+    finally:
+        for lock in reversed(locks):
+            lock.release()
+
+
+def _match_write_query(db: Session):
+    # One round-trip loads everything `match_to_read` needs, so write paths can
+    # answer from the session after their single commit instead of re-reading.
+    return (
+        db.query(models.Match)
+        .join(models.Match.tie)
+        .options(
+            joinedload(models.Match.team1),
+            joinedload(models.Match.team2),
+            joinedload(models.Match.referee),
+            contains_eager(models.Match.tie),
+        )
+    )
+
+
+def _get_match_for_write(db: Session, match_id: int, for_update: bool = False) -> models.Match:
+    query = _match_write_query(db).filter(models.Match.id == match_id)
+    if for_update:
+        query = query.with_for_update(of=[models.Match, models.Tie])
+
+    match = query.first()
     if not match:
         raise LookupError("Match not found.")
 
+    return match
+
+
+@contextmanager
+def _match_write(db: Session, match_id: int) -> Iterator[models.Match]:
+    """Yield a match for writing, serialized against other writes to the same tie.
+
+    Postgres locks the match and tie rows with SELECT ... FOR UPDATE; SQLite takes an
+    in-process lock per tie. Either way courts scoring different ties never wait on
+    each other. The caller commits inside the block.
+    """
+    row_locks = _uses_row_locks(db)
+    locks = []
+    if not row_locks:
+        # Every match belongs to a tie (ck_stage_tie_link), so no tie id means no match.
+        tie_id = db.query(models.Match.tie_id).filter(models.Match.id == match_id).scalar()
+        if tie_id is None:
+            raise LookupError("Match not found.")
+        locks.append(_get_write_lock("tie", tie_id))
+
+    with _serialized_write(db, locks):
+        yield _get_match_for_write(db, match_id, for_update=row_locks)
+
+
+@contextmanager
+def _matches_write(db: Session, match_ids: list[int]) -> Iterator[dict[int, models.Match]]:
+    # Multi-match variant of `_match_write`; missing ids are simply absent from the result.
+    row_locks = _uses_row_locks(db)
+    locks = []
+    if not row_locks:
+        rows = db.query(models.Match.tie_id).filter(models.Match.id.in_(match_ids)).all()
+        tie_ids = {tie_id for (tie_id,) in rows}
+        locks = [_get_write_lock("tie", tie_id) for tie_id in sorted(tie_ids)]
+
+    with _serialized_write(db, locks):
+        query = (
+            _match_write_query(db)
+            .filter(models.Match.id.in_(match_ids))
+            .order_by(models.Match.tie_id.asc(), models.Match.id.asc())
+        )
+        if row_locks:
+            query = query.with_for_update(of=[models.Match, models.Tie])
+        yield {match.id: match for match in query.all()}
+
+
+def _assert_match_scorable(match: models.Match) -> None:
     if match.referee_id is None:
         raise ValueError("Assign referee before updating score.")
 
     if not match.lineup_confirmed:
         raise ValueError("Player names must be confirmed before scoring.")
 
-    if _is_decider_match(match) and match.winner_side not in (1, 2):
+    if models.is_decider_match(match) and match.winner_side not in (1, 2):
         _assert_decider_unlocked(match)
 
     if _requires_referee_lineup_entry(match):
@@ -374,32 +845,214 @@ def update_score(db: Session, match_id: int, score1: int, score2: int) -> models
                 "Referee must confirm two player names per side for this match before scoring."
             )
 
-    winner_side = _calculate_winner_side(score1, score2)
 
+def _assert_not_rally_tracked(match: models.Match) -> None:
+    # An absolute score would leave the rally log (and `rally_seq`) behind the score.
+    if match.rally_seq:
+        raise ValueError("Match is scored through its rally log; send rallies instead.")
+
+
+def _set_match_score(match: models.Match, score1: int, score2: int) -> None:
+    _validate_score_input(score1, score2)
+    _assert_match_scorable(match)
+    _assert_not_rally_tracked(match)
+
+    winner_side = _calculate_winner_side(score1, score2)
     match.team1_score = score1
     match.team2_score = score2
     match.winner_side = winner_side
     match.status = "completed" if winner_side else "live"
 
-    if match.stage == "tie" and match.tie_id is not None:
-        _recalculate_tie(db, match.tie_id)
 
-    db.commit()
+def validate_score(score1: int, score2: int) -> int | None:
+    """Check a score against the rally-point rules and return its winner side, if any."""
+    _validate_score_input(score1, score2)
+    return _calculate_winner_side(score1, score2)
 
-    return get_match_or_raise(db, match_id)
 
+def score_can_be_deferred(match: models.Match, score1: int, score2: int) -> bool:
+    """Validate a score for `match` like `update_score` and say whether it may be written later.
 
-def update_lineups(db: Session, match_id: int, team1_lineup: str, team2_lineup: str) -> models.Match:
-    match = db.get(models.Match, match_id)
-    if not match:
+    Only mid-game scores qualify: the match is already live, nobody has won before or
+    after, so the tie aggregates do not depend on when the score reaches the database.
+    """
+    _validate_score_input(score1, score2)
+    _assert_match_scorable(match)
+    _assert_not_rally_tracked(match)
+    return (
+        match.status == "live"
+        and match.winner_side is None
+        and _calculate_winner_side(score1, score2) is None
+    )
+
+
+def update_score(db: Session, match_id: int, score1: int, score2: int) -> models.Match:
+    _validate_score_input(score1, score2)
+
+    with _match_write(db, match_id) as match:
+        before = _match_tie_contribution(match)
+        _set_match_score(match, score1, score2)
+
+        _apply_match_delta(db, match, before)
+
+        db.commit()
+
+    return match
+
+
+def _fold_rallies(
+    match: models.Match, rallies: list[tuple[int, int]]
+) -> tuple[list[tuple[int, int]], int, int, int]:
+    """Validate rallies against the match and return (new rallies, duplicates, score1, score2).
+
+    Each rally adds a point to its side on top of the current score, so a match scored
+    only through the log has scores equal to its per-side rally counts (once a match has
+    rallies, absolute score writes are rejected). Sequence numbers at or below
+    `match.rally_seq` are retries and are skipped; gaps are rejected.
+    """
+    score1 = match.team1_score
+    score2 = match.team2_score
+    next_seq = match.rally_seq + 1
+    fresh: list[tuple[int, int]] = []
+    duplicates = 0
+
+    for seq, side in sorted(rallies):
+        if seq < next_seq:
+            duplicates += 1
+            continue
+        if seq > next_seq:
+            raise ValueError(f"Rally {next_seq} is missing; rallies must be sent in sequence.")
+        if _calculate_winner_side(score1, score2) is not None:
+            raise ValueError("Game is already finished; no further rallies can be recorded.")
+
+        if side == 1:
+            score1 += 1
+        else:
+            score2 += 1
+        _validate_score_input(score1, score2)
+
+        fresh.append((seq, side))
+        next_seq += 1
+
+    return fresh, duplicates, score1, score2
+
+
+def _check_rally_retries(
+    db: Session, matches: dict[int, models.Match], rallies: list[tuple[int, int, int]]
+) -> None:
+    """Raise ValueError if a rally is sent for both sides, or retried for the other side."""
+    sides: dict[tuple[int, int], int] = {}
+    for match_id, seq, side in rallies:
+        if sides.setdefault((match_id, seq), side) != side:
+            raise ValueError(f"Rally {seq} of match {match_id} is sent for both sides.")
+
+    retried = [
+        (match_id, seq)
+        for match_id, seq in sides
+        if match_id in matches and seq <= matches[match_id].rally_seq
+    ]
+    if not retried:
+        return
+
+    event = models.RallyEvent
+    recorded = db.query(event.match_id, event.seq, event.side).filter(
+        tuple_(event.match_id, event.seq).in_(retried)
+    )
+    for match_id, seq, side in recorded:
+        if sides[(match_id, seq)] != side:
+            raise ValueError(f"Rally {seq} of match {match_id} was recorded for side {side}.")
+
+
+def record_rallies(db: Session, rallies: list[tuple[int, int, int]]) -> schemas.RallyBatchResult:
+    """Append (match_id, seq, side) rallies for any number of matches in one transaction.
+
+    Every match is validated with the `update_score` rules; a match whose rallies are
+    rejected is reported with its error and left untouched while the others apply. A
+    retried rally that names the other side is a conflict: the whole batch is rejected
+    with a ValueError.
+    """
+    by_match: dict[int, list[tuple[int, int]]] = {}
+    for match_id, seq, side in rallies:
+        by_match.setdefault(match_id, []).append((seq, side))
+
+    results: list[schemas.RallyBatchItemResult] = []
+    with _matches_write(db, list(by_match)) as matches:
+        _check_rally_retries(db, matches, rallies)
+        events: list[dict[str, int]] = []
+        changes: list[tuple[models.Match, MatchContribution]] = []
+
+        for match_id, match_rallies in by_match.items():
+            match = matches.get(match_id)
+            if match is None:
+                results.append(
+                    schemas.RallyBatchItemResult(match_id=match_id, error="Match not found.")
+                )
+                continue
+
+            try:
+                _assert_match_scorable(match)
+                fresh, duplicates, score1, score2 = _fold_rallies(match, match_rallies)
+            except ValueError as exc:
+                results.append(
+                    schemas.RallyBatchItemResult(
+                        match_id=match_id, last_seq=match.rally_seq, error=str(exc)
+                    )
+                )
+                continue
+
+            if fresh:
+                before = _match_tie_contribution(match)
+                winner_side = _calculate_winner_side(score1, score2)
+                match.team1_score = score1
+                match.team2_score = score2
+                match.winner_side = winner_side
+                match.status = "completed" if winner_side else "live"
+                match.rally_seq = fresh[-1][0]
+                events.extend(
+                    {"match_id": match_id, "seq": seq, "side": side} for seq, side in fresh
+                )
+                changes.append((match, before))
+
+            results.append(
+                schemas.RallyBatchItemResult(
+                    match_id=match_id,
+                    accepted=len(fresh),
+                    duplicates=duplicates,
+                    last_seq=match.rally_seq,
+                )
+            )
+
+        _apply_match_deltas(db, changes)
+        if events:
+            db.execute(insert(models.RallyEvent), events)
+        db.commit()
+
+    for result in results:
+        match = matches.get(result.match_id)
+        if match is not None and result.error is None:
+            result.match = serializers.match_to_read(match)
+    return schemas.RallyBatchResult(results=results)
+
+
+def list_rallies(db: Session, match_id: int) -> list[models.RallyEvent]:
+    if db.get(models.Match, match_id) is None:
         raise LookupError("Match not found.")
 
+    return (
+        db.query(models.RallyEvent)
+        .filter(models.RallyEvent.match_id == match_id)
+        .order_by(models.RallyEvent.seq.asc())
+        .all()
+    )
+
+
+def _set_match_lineups(match: models.Match, team1_lineup: str, team2_lineup: str) -> None:
     clean_team1_lineup = _normalize_lineup_text(team1_lineup)
     clean_team2_lineup = _normalize_lineup_text(team2_lineup)
     if not clean_team1_lineup or not clean_team2_lineup:
         raise ValueError("Both lineups are required.")
 
-    if _is_decider_match(match):
+    if models.is_decider_match(match):
         # Decider is always singles: keep one player per team.
         team1_parts = _lineup_parts(clean_team1_lineup)
         team2_parts = _lineup_parts(clean_team2_lineup)
@@ -429,36 +1082,294 @@ def update_lineups(db: Session, match_id: int, team1_lineup: str, team2_lineup:
     match.team1_lineup = clean_team1_lineup
     match.team2_lineup = clean_team2_lineup
 
+
+def _sync_match_players(db: Session, matches: list[models.Match], shift_stats: bool = True) -> None:
+    """Replace the `match_players` rows of `matches` from their confirmed lineups.
+
+    Names that match no player of the team (guests, "TBD") are left out. Completed
+    matches move their player stats from the old participants to the new ones.
+    """
+    match_ids = [match.id for match in matches]
+    completed = [
+        (match, result)
+        for match in matches
+        if (result := _match_result(_match_tie_contribution(match))) is not None
+    ]
+    completed_ids = [match.id for match, _ in completed]
+    previous = _match_participants(db, completed_ids) if shift_stats and completed else {}
+    db.execute(delete(models.MatchPlayer).where(models.MatchPlayer.match_id.in_(match_ids)))
+
+    wanted: dict[tuple[int, str], list[tuple[int, int]]] = {}
+    for match in matches:
+        if not match.lineup_confirmed:
+            continue
+        for side, team_id, lineup in (
+            (1, match.team1_id, match.team1_lineup),
+            (2, match.team2_id, match.team2_lineup),
+        ):
+            for name in _lineup_parts(lineup or ""):
+                wanted.setdefault((team_id, models.name_key(name)), []).append((match.id, side))
+
+    rows: dict[tuple[int, int], int] = {}
+    if wanted:
+        players = db.execute(
+            select(models.Player.id, models.Player.team_id, models.Player.name_key).where(
+                models.Player.team_id.in_({team_id for team_id, _ in wanted}),
+                models.Player.name_key.in_({key for _, key in wanted}),
+            )
+        ).all()
+        rows = {
+            (match_id, player_id): side
+            for player_id, team_id, key in players
+            for match_id, side in wanted.get((team_id, key), [])
+        }
+    if rows:
+        db.execute(
+            insert(models.MatchPlayer),
+            [
+                {"match_id": match_id, "player_id": player_id, "side": side}
+                for (match_id, player_id), side in rows.items()
+            ],
+        )
+
+    if shift_stats and completed:
+        current = _match_participants(db, completed_ids)
+        stat_rows: list[dict[str, object]] = []
+        for match, result in completed:
+            stat_rows += _player_stat_rows(result, match.discipline, previous.get(match.id, []), -1)
+            stat_rows += _player_stat_rows(result, match.discipline, current.get(match.id, []), 1)
+        _add_player_stats(db, stat_rows)
+        ratings.rerate(
+            db,
+            [
+                (match.id, match.discipline, result[0], _rated_players(current.get(match.id, [])))
+                for match, result in completed
+                if sorted(previous.get(match.id, [])) != sorted(current.get(match.id, []))
+            ],
+        )
+
+
+def rebuild_match_players(db: Session) -> int:
+    """Resolve every match's lineup and recount player stats; returns the participation rows."""
+    matches = db.query(models.Match).all()
+    db.execute(delete(models.PlayerStat))
+    if matches:
+        _sync_match_players(db, matches, shift_stats=False)
+        participants = _match_participants(db, [match.id for match in matches])
+        stat_rows: list[dict[str, object]] = []
+        for match in matches:
+            result = _match_result(_match_tie_contribution(match))
+            if result is not None:
+                stat_rows += _player_stat_rows(
+                    result, match.discipline, participants.get(match.id, []), 1
+                )
+        _add_player_stats(db, stat_rows)
     db.commit()
-    return get_match_or_raise(db, match_id)
+    return db.query(models.MatchPlayer).count()
 
 
-def update_match_status(db: Session, match_id: int, status: MatchStatus) -> models.Match:
-    match = db.get(models.Match, match_id)
-    if not match:
-        raise LookupError("Match not found.")
+def list_player_matches(db: Session, player_id: int) -> list[models.Match]:
+    if db.get(models.Player, player_id) is None:
+        raise LookupError("Player not found.")
+
+    return (
+        db.query(models.Match)
+        .join(models.MatchPlayer, models.MatchPlayer.match_id == models.Match.id)
+        .options(
+            selectinload(models.Match.team1),
+            selectinload(models.Match.team2),
+            selectinload(models.Match.referee),
+        )
+        .filter(models.MatchPlayer.player_id == player_id)
+        .order_by(models.Match.day.asc(), models.Match.time.asc(), models.Match.match_no.asc())
+        .all()
+    )
+
+
+def _player_stat_line(stat: models.PlayerStat) -> schemas.PlayerStatLine:
+    return schemas.PlayerStatLine(
+        discipline=stat.discipline,
+        played=stat.played,
+        wins=stat.wins,
+        losses=stat.losses,
+        win_rate=round(stat.wins / stat.played, 4) if stat.played else 0.0,
+        points_for=stat.points_for,
+        points_against=stat.points_against,
+        deuce_games=stat.deuce_games,
+    )
+
+
+def get_player_stats(db: Session, player_id: int) -> schemas.PlayerStatsRead:
+    player = (
+        db.query(models.Player)
+        .options(joinedload(models.Player.team))
+        .filter(models.Player.id == player_id)
+        .first()
+    )
+    if player is None:
+        raise LookupError("Player not found.")
+
+    lines = [
+        _player_stat_line(stat)
+        for stat in db.query(models.PlayerStat)
+        .filter(models.PlayerStat.player_id == player_id, models.PlayerStat.played > 0)
+        .order_by(models.PlayerStat.discipline.asc())
+    ]
+    totals = next(
+        (line for line in lines if line.discipline == models.PlayerStat.ALL_DISCIPLINES),
+        schemas.PlayerStatLine(discipline=models.PlayerStat.ALL_DISCIPLINES),
+    )
+    return schemas.PlayerStatsRead(
+        player_id=player.id,
+        player=player.name,
+        team=player.team.name,
+        set_level=player.set_level,
+        totals=totals,
+        disciplines=[
+            line for line in lines if line.discipline != models.PlayerStat.ALL_DISCIPLINES
+        ],
+    )
+
+
+def player_leaderboard(
+    db: Session,
+    discipline: str | None = None,
+    set_level: str | None = None,
+    limit: int = 20,
+) -> list[schemas.LeaderboardRow]:
+    """Top players by wins, then point difference; an indexed read of `player_stats`."""
+    query = (
+        db.query(models.PlayerStat)
+        .options(joinedload(models.PlayerStat.player).joinedload(models.Player.team))
+        .filter(
+            models.PlayerStat.discipline == (discipline or models.PlayerStat.ALL_DISCIPLINES),
+            models.PlayerStat.played > 0,
+        )
+    )
+    if set_level is not None:
+        query = query.filter(models.PlayerStat.set_level == set_level)
+
+    stats = (
+        query.order_by(
+            models.PlayerStat.wins.desc(),
+            (models.PlayerStat.points_for - models.PlayerStat.points_against).desc(),
+            models.PlayerStat.player_id.asc(),
+        )
+        .limit(limit)
+        .all()
+    )
+    return [
+        schemas.LeaderboardRow(
+            rank=rank,
+            player_id=stat.player_id,
+            player=stat.player.name,
+            team=stat.player.team.name,
+            set_level=stat.set_level,
+            **serializers.model_dump_compat(_player_stat_line(stat)),
+        )
+        for rank, stat in enumerate(stats, start=1)
+    ]
+
+
+def update_lineups(db: Session, match_id: int, team1_lineup: str, team2_lineup: str) -> models.Match:
+    with _match_write(db, match_id) as match:
+        _set_match_lineups(match, team1_lineup, team2_lineup)
+        _sync_match_players(db, [match])
+
+        db.commit()
+
+    return match
+
 
+def _set_match_status(match: models.Match, status: MatchStatus) -> None:
     if match.status == "completed":
         raise ValueError("Completed match cannot be changed.")
 
     if status == "live":
-        if _is_decider_match(match):
+        if models.is_decider_match(match):
             _assert_decider_unlocked(match)
         if match.referee_id is None:
             raise ValueError("Assign referee before setting match live.")
         if match.winner_side in (1, 2):
             raise ValueError("Completed match cannot be set live.")
-    elif status == "pending":
+
+    if status == "pending":
         # Keep existing score to allow resuming interrupted games later.
         match.winner_side = None
 
     match.status = status
 
-    if match.stage == "tie" and match.tie_id is not None:
-        _recalculate_tie(db, match.tie_id)
 
-    db.commit()
-    return get_match_or_raise(db, match_id)
+def update_match_status(db: Session, match_id: int, status: MatchStatus) -> models.Match:
+    with _match_write(db, match_id) as match:
+        before = _match_tie_contribution(match)
+        _set_match_status(match, status)
+
+        _apply_match_delta(db, match, before)
+
+        db.commit()
+
+    return match
+
+
+def apply_match_batch(
+    db: Session, operations: list[schemas.MatchOperation]
+) -> schemas.MatchBatchResult:
+    """Apply score, lineup and status operations for many matches in one transaction.
+
+    Operations run in order with the same rules as `update_score`, `update_lineups`
+    and `update_match_status`. A rejected operation is reported with its error and
+    changes nothing; tie aggregates are settled once at the end. Each applied operation
+    reports the match as it stood right after that operation.
+    """
+    results: list[schemas.MatchBatchItemResult] = []
+    with _matches_write(db, sorted({operation.match_id for operation in operations})) as matches:
+        pending: dict[int, MatchContribution] = {}
+        lineups_changed: dict[int, models.Match] = {}
+
+        for index, operation in enumerate(operations):
+            result = schemas.MatchBatchItemResult(
+                index=index, op=operation.op, match_id=operation.match_id
+            )
+            results.append(result)
+
+            match = matches.get(operation.match_id)
+            if match is None:
+                result.error = "Match not found."
+                continue
+
+            if models.is_decider_match(match) and match.tie_id is not None:
+                # Game 13 unlocks on the tie score, so earlier changes in the tie must count.
+                settled = [
+                    match_id for match_id in pending if matches[match_id].tie_id == match.tie_id
+                ]
+                _apply_match_deltas(
+                    db, [(matches[match_id], pending.pop(match_id)) for match_id in settled]
+                )
+
+            pending.setdefault(match.id, _match_tie_contribution(match))
+            try:
+                if operation.op == "score":
+                    _set_match_score(match, operation.score1, operation.score2)
+                elif operation.op == "lineup":
+                    _set_match_lineups(match, operation.team1_lineup, operation.team2_lineup)
+                    lineups_changed[match.id] = match
+                else:
+                    _set_match_status(match, operation.status)
+            except ValueError as exc:
+                result.error = str(exc)
+            else:
+                result.match = serializers.match_to_read(match)
+
+        _apply_match_deltas(
+            db, [(matches[match_id], before) for match_id, before in pending.items()]
+        )
+        if lineups_changed:
+            _sync_match_players(db, list(lineups_changed.values()))
+        db.commit()
+
+    failed = sum(1 for result in results if result.error is not None)
+    return schemas.MatchBatchResult(applied=len(results) - failed, failed=failed, results=results)
 
 
 def get_or_create_referee(db: Session, name: str) -> models.Referee:
@@ -466,68 +1377,63 @@ def get_or_create_referee(db: Session, name: str) -> models.Referee:
     if not clean_name:
         raise ValueError("Referee name cannot be empty.")
 
-    referee = (
-        db.query(models.Referee)
-        .filter(func.lower(models.Referee.name) == clean_name.lower())
-        .first()
+    # One statement either way; the calling write path commits together with its own changes.
+    statement = _upsert(db, models.Referee).values(
+        name=clean_name, name_key=models.name_key(clean_name)
     )
-    if referee:
-        return referee
-
-    referee = models.Referee(name=clean_name)
-    db.add(referee)
-    db.commit()
-    db.refresh(referee)
-    return referee
+    return db.scalars(
+        statement.on_conflict_do_update(
+            index_elements=[models.Referee.name_key],
+            set_={"name_key": statement.excluded.name_key},
+        ).returning(models.Referee)
+    ).one()
 
 
 def assign_referee(db: Session, match_id: int, name: str) -> tuple[models.Referee, models.Match]:
-    referee = get_or_create_referee(db, name)
-    match = db.get(models.Match, match_id)
-    if not match:
-        raise LookupError("Match not found.")
-
-    _assert_decider_unlocked(match)
-
-    match.referee_id = referee.id
-
-    clean_team1_lineup = _normalize_lineup_text(match.team1_lineup or "")
-    clean_team2_lineup = _normalize_lineup_text(match.team2_lineup or "")
-    match.team1_lineup = clean_team1_lineup
-    match.team2_lineup = clean_team2_lineup
+    with _match_write(db, match_id) as match:
+        _assert_decider_unlocked(match)
 
-    if _is_decider_match(match):
-        team1_parts = _lineup_parts(clean_team1_lineup)
-        team2_parts = _lineup_parts(clean_team2_lineup)
-        if len(team1_parts) >= 1 and len(team2_parts) >= 1:
-            match.team1_lineup = team1_parts[0]
-            match.team2_lineup = team2_parts[0]
-            match.lineup_confirmed = True
+        referee = get_or_create_referee(db, name)
+        before = _match_tie_contribution(match)
+        match.referee = referee
+
+        clean_team1_lineup = _normalize_lineup_text(match.team1_lineup or "")
+        clean_team2_lineup = _normalize_lineup_text(match.team2_lineup or "")
+        match.team1_lineup = clean_team1_lineup
+        match.team2_lineup = clean_team2_lineup
+
+        if models.is_decider_match(match):
+            team1_parts = _lineup_parts(clean_team1_lineup)
+            team2_parts = _lineup_parts(clean_team2_lineup)
+            if len(team1_parts) >= 1 and len(team2_parts) >= 1:
+                match.team1_lineup = team1_parts[0]
+                match.team2_lineup = team2_parts[0]
+                match.lineup_confirmed = True
+            else:
+                match.lineup_confirmed = False
+        elif _requires_referee_lineup_entry(match):
+            team1_parts = _lineup_parts(clean_team1_lineup)
+            team2_parts = _lineup_parts(clean_team2_lineup)
+
+            if len(team1_parts) >= 2 and len(team2_parts) >= 2:
+                # Auto-select first two names so scoring can start immediately.
+                match.team1_lineup = f"{team1_parts[0]} / {team1_parts[1]}"
+                match.team2_lineup = f"{team2_parts[0]} / {team2_parts[1]}"
+                match.lineup_confirmed = True
+            else:
+                match.lineup_confirmed = False
         else:
-            match.lineup_confirmed = False
-    elif _requires_referee_lineup_entry(match):
-        team1_parts = _lineup_parts(clean_team1_lineup)
-        team2_parts = _lineup_parts(clean_team2_lineup)
+            match.lineup_confirmed = bool(clean_team1_lineup and clean_team2_lineup)
 
-        if len(team1_parts) >= 2 and len(team2_parts) >= 2:
-            # Auto-select first two names so scoring can start immediately.
-            match.team1_lineup = f"{team1_parts[0]} / {team1_parts[1]}"
-            match.team2_lineup = f"{team2_parts[0]} / {team2_parts[1]}"
-            match.lineup_confirmed = True
-        else:
-            match.lineup_confirmed = False
-    else:
-        match.lineup_confirmed = bool(clean_team1_lineup and clean_team2_lineup)
+        if match.status == "pending":
+            match.status = "live"
 
-    if match.status == "pending":
-        match.status = "live"
+        _sync_match_players(db, [match])
+        _apply_match_delta(db, match, before)
 
-    if match.stage == "tie" and match.tie_id is not None:
-        _recalculate_tie(db, match.tie_id)
+        db.commit()
 
-    db.commit()
-
-    return referee, get_match_or_raise(db, match_id)
+    return referee, match
 
 
 # ---------------------------------------------------------------------------
@@ -536,96 +1442,61 @@ def assign_referee(db: Session, match_id: int, name: str) -> tuple[models.Refere
 
 
 def build_standings(db: Session) -> list[schemas.StandingRow]:
-    teams = get_teams(db)
-    ties = get_ties(db)
+    return build_standings_from(get_teams(db), get_ties(db))
 
-    table: dict[int, dict[str, int | str]] = {
-        team.id: {
-            "team": team.name,
-            "ties_played": 0,
-            "ties_won": 0,
-            "ties_lost": 0,
-            "tie_points": 0,
-            "games_played": 0,
-            "games_won": 0,
-            "games_lost": 0,
-            "points_for": 0,
-            "points_against": 0,
-        }
-        for team in teams
-    }
 
-    for tie in ties:
-        team1_id = tie.team1_id
-        team2_id = tie.team2_id
+def build_standings_from(
+    teams: list[models.Team], ties: list[models.Tie]
+) -> list[schemas.StandingRow]:
+    # `teams` in name order: equal rows keep that order in the ranking.
+    table = {team.id: tiebreaks.TeamRecord(team.id, team.name) for team in teams}
+    meetings: list[tiebreaks.Meeting] = []
 
-        if team1_id not in table or team2_id not in table:
+    for tie in ties:
+        team1 = table.get(tie.team1_id)
+        team2 = table.get(tie.team2_id)
+        if team1 is None or team2 is None:
             continue
 
-        if tie.status == "completed" and tie.winner_team_id in (team1_id, team2_id):
-            table[team1_id]["ties_played"] += 1
-            table[team2_id]["ties_played"] += 1
+        if tie.status == "completed" and tie.winner_team_id in (tie.team1_id, tie.team2_id):
+            team1.ties_played += 1
+            team2.ties_played += 1
 
-            if tie.winner_team_id == team1_id:
-                table[team1_id]["ties_won"] += 1
-                table[team2_id]["ties_lost"] += 1
-                table[team1_id]["tie_points"] += 2
-            else:
-                table[team2_id]["ties_won"] += 1
-                table[team1_id]["ties_lost"] += 1
-                table[team2_id]["tie_points"] += 2
+            winner, loser = (team1, team2) if tie.winner_team_id == tie.team1_id else (team2, team1)
+            winner.ties_won += 1
+            winner.tie_points += 2
+            loser.ties_lost += 1
+            meetings.append((winner.team_id, loser.team_id))
 
         for match in tie.matches:
             if match.stage != "tie" or match.winner_side not in (1, 2):
                 continue
-            if _is_decider_match(match) and not _is_decider_allowed_in_views(tie):
+            if models.is_decider_match(match) and not _is_decider_allowed_in_views(tie):
                 continue
 
-            table[team1_id]["games_played"] += 1
-            table[team2_id]["games_played"] += 1
+            team1.games_played += 1
+            team2.games_played += 1
 
-            table[team1_id]["points_for"] += match.team1_score
-            table[team1_id]["points_against"] += match.team2_score
-            table[team2_id]["points_for"] += match.team2_score
-            table[team2_id]["points_against"] += match.team1_score
+            team1.points_for += match.team1_score
+            team1.points_against += match.team2_score
+            team2.points_for += match.team2_score
+            team2.points_against += match.team1_score
 
             if match.winner_side == 1:
-                table[team1_id]["games_won"] += 1
-                table[team2_id]["games_lost"] += 1
+                team1.games_won += 1
+                team2.games_lost += 1
             else:
-                table[team2_id]["games_won"] += 1
-                table[team1_id]["games_lost"] += 1
-
-    ranked = sorted(
-        table.items(),
-        key=lambda item: (
-            -int(item[1]["ties_won"]),
-            -int(item[1]["games_won"]),
-            -(
-                (
-                    int(item[1]["points_for"]) - int(item[1]["points_against"])
-                )
-                / max(1, int(item[1]["games_played"]))
-            ),
-            -(int(item[1]["points_for"]) - int(item[1]["points_against"])),
-            -(int(item[1]["games_won"]) - int(item[1]["games_lost"])),
-            str(item[1]["team"]),
-        ),
-    )
+                team2.games_won += 1
+                team1.games_lost += 1
 
-    total_ties = len(ties)
-    completed_ties = sum(1 for tie in ties if tie.status == "completed" and tie.winner_team_id is not None)
-    league_complete = total_ties > 0 and completed_ties == total_ties
+    ranked = tiebreaks.get_ruleset().rank(table.values(), meetings)
+
+    _, _, league_complete = league_completion_from(ties)
 
     standings: list[schemas.StandingRow] = []
-    for rank, (team_id, row) in enumerate(ranked, start=1):
-        games_played = int(row["games_played"])
-        games_won = int(row["games_won"])
-        games_lost = int(row["games_lost"])
-        points_for = int(row["points_for"])
-        points_against = int(row["points_against"])
-        point_difference = points_for - points_against
-        average_match_lead = point_difference / games_played if games_played > 0 else 0.0
+    for rank, row in enumerate(ranked, start=1):
+        point_difference = row.points_for - row.points_against
+        average_match_lead = point_difference / row.games_played if row.games_played > 0 else 0.0
 
         qualification = "none"
         if league_complete:
@@ -637,18 +1508,18 @@ def build_standings(db: Session) -> list[schemas.StandingRow]:
         standings.append(
             schemas.StandingRow(
                 rank=rank,
-                team_id=team_id,
-                team=str(row["team"]),
-                ties_played=int(row["ties_played"]),
-                ties_won=int(row["ties_won"]),
-                ties_lost=int(row["ties_lost"]),
-                tie_points=int(row["tie_points"]),
-                game_difference=games_won - games_lost,
-                games_played=games_played,
-                games_won=games_won,
-                games_lost=games_lost,
-                points_for=points_for,
-                points_against=points_against,
+                team_id=row.team_id,
+                team=row.team,
+                ties_played=row.ties_played,
+                ties_won=row.ties_won,
+                ties_lost=row.ties_lost,
+                tie_points=row.tie_points,
+                game_difference=row.games_won - row.games_lost,
+                games_played=row.games_played,
+                games_won=row.games_won,
+                games_lost=row.games_lost,
+                points_for=row.points_for,
+                points_against=row.points_against,
                 point_difference=point_difference,
                 average_match_lead=average_match_lead,
                 qualification=qualification,
@@ -659,7 +1530,10 @@ def build_standings(db: Session) -> list[schemas.StandingRow]:
 
 
 def _league_completion_info(db: Session) -> tuple[int, int, bool]:
-    ties = db.query(models.Tie).all()
+    return league_completion_from(db.query(models.Tie).all())
+
+
+def league_completion_from(ties: list[models.Tie]) -> tuple[int, int, bool]:
     total_ties = len(ties)
     completed_ties = sum(1 for tie in ties if tie.status == "completed" and tie.winner_team_id is not None)
     league_complete = total_ties > 0 and completed_ties == total_ties
@@ -728,11 +1602,8 @@ def _ensure_final_games(db: Session, final_match: models.FinalMatch, reset_state
             game.team2_lineup = final_match.team2.name if final_match.team2 else "TBD"
 
 
-def _recalculate_final_match(db: Session, final_match_id: int) -> None:
-    final_match = _get_final_match_query(db).filter(models.FinalMatch.id == final_match_id).first()
-    if not final_match:
-        return
-
+def _recalculate_final_match(final_match: models.FinalMatch) -> None:
+    # Works on the loaded final tie in memory; the caller owns the commit.
     games = sorted(final_match.matches, key=lambda item: item.match_no)
     score1 = sum(1 for game in games if game.winner_side == 1)
     score2 = sum(1 for game in games if game.winner_side == 2)
@@ -745,27 +1616,28 @@ def _recalculate_final_match(db: Session, final_match_id: int) -> None:
 
     if all_completed:
         if score1 > score2:
-            final_match.winner_team_id = final_match.team1_id
+            winner_side = 1
         elif score2 > score1:
-            final_match.winner_team_id = final_match.team2_id
+            winner_side = 2
         else:
             points1 = sum(game.team1_score for game in games if game.match_no <= 12)
             points2 = sum(game.team2_score for game in games if game.match_no <= 12)
             if points1 > points2:
-                final_match.winner_team_id = final_match.team1_id
+                winner_side = 1
             elif points2 > points1:
-                final_match.winner_team_id = final_match.team2_id
+                winner_side = 2
             else:
-                last_winner_side = next(
+                winner_side = next(
                     (game.winner_side for game in sorted(games, key=lambda item: item.match_no, reverse=True) if game.winner_side in (1, 2)),
                     1,
                 )
-                final_match.winner_team_id = final_match.team1_id if last_winner_side == 1 else final_match.team2_id
 
+        # Assign the relationship (not just the id) so the loaded object serializes correctly.
+        final_match.winner_team = final_match.team1 if winner_side == 1 else final_match.team2
         final_match.status = "completed"
         return
 
-    final_match.winner_team_id = None
+    final_match.winner_team = None
     if any(game.status == "live" for game in games) or any(game.team1_score > 0 or game.team2_score > 0 for game in games):
         final_match.status = "live"
     else:
@@ -790,6 +1662,9 @@ def get_or_sync_final_match(
     finalist2_id = standings[1].team_id
 
     final_match = _get_final_match_query(db).first()
+    if db.info.get("read_only"):
+        # Replica sessions cannot sync; the primary does on its next final/dashboard read.
+        return final_match
     created = False
     if final_match is None:
         final_match = models.FinalMatch(
@@ -809,12 +1684,19 @@ def get_or_sync_final_match(
         final_match.team1_id = finalist1_id
         final_match.team2_id = finalist2_id
         db.flush()
-        final_match = _get_final_match_query(db).filter(models.FinalMatch.id == final_match.id).first()
+        final_match = (
+            _get_final_match_query(db)
+            .populate_existing()
+            .filter(models.FinalMatch.id == final_match.id)
+            .first()
+        )
 
     _ensure_final_games(db, final_match, reset_state=created or finalists_changed)
     db.flush()
-    _recalculate_final_match(db, final_match.id)
-    db.commit()
+    _recalculate_final_match(final_match)
+    # Reads sync the final too; only a real change is committed (and bumps the version).
+    if cache.has_data_changes(db):
+        db.commit()
 
     return _get_final_match_query(db).filter(models.FinalMatch.id == final_match.id).first()
 
@@ -835,42 +1717,73 @@ def get_final_game_or_raise(db: Session, game_id: int) -> models.FinalGame:
     return game
 
 
+@contextmanager
+def _final_game_write(
+    db: Session, game_id: int
+) -> Iterator[tuple[models.FinalMatch, models.FinalGame]]:
+    # Same locking rules as `_match_write`, scoped to the final tie the game belongs to.
+    # The whole final tie is loaded once and the response is served from it after commit.
+    row_locks = _uses_row_locks(db)
+    locks = []
+    if not row_locks:
+        final_match_id = (
+            db.query(models.FinalGame.final_match_id)
+            .filter(models.FinalGame.id == game_id)
+            .scalar()
+        )
+        if final_match_id is not None:
+            locks.append(_get_write_lock("final", final_match_id))
+
+    with _serialized_write(db, locks):
+        query = (
+            _get_final_match_query(db)
+            .join(models.FinalMatch.matches)
+            .filter(models.FinalGame.id == game_id)
+        )
+        if row_locks:
+            query = query.with_for_update(of=models.FinalMatch)
+
+        final_match = query.first()
+        game = (
+            next((item for item in final_match.matches if item.id == game_id), None)
+            if final_match
+            else None
+        )
+        if final_match is None or game is None:
+            raise LookupError("Final game not found.")
+        yield final_match, game
+
+
 def assign_final_game_referee(db: Session, game_id: int, name: str) -> models.FinalMatch:
-    game = get_final_game_or_raise(db, game_id)
-    referee = get_or_create_referee(db, name)
+    with _final_game_write(db, game_id) as (final_match, game):
+        referee = get_or_create_referee(db, name)
 
-    game.referee_id = referee.id
-    if game.status == "pending":
-        game.status = "live"
-    _recalculate_final_match(db, game.final_match_id)
-    db.commit()
+        game.referee = referee
+        if game.status == "pending":
+            game.status = "live"
+        _recalculate_final_match(final_match)
+        db.commit()
 
-    refreshed = _get_final_match_query(db).filter(models.FinalMatch.id == game.final_match_id).first()
-    if not refreshed:
-        raise LookupError("Final tie not found.")
-    return refreshed
+    return final_match
 
 
 def update_final_game_score(db: Session, game_id: int, score1: int, score2: int) -> models.FinalMatch:
-    game = get_final_game_or_raise(db, game_id)
-    if game.referee_id is None:
-        raise ValueError("Assign referee before updating final score.")
+    with _final_game_write(db, game_id) as (final_match, game):
+        if game.referee_id is None:
+            raise ValueError("Assign referee before updating final score.")
 
-    _validate_score_input(score1, score2)
-    winner_side = _calculate_winner_side(score1, score2)
+        _validate_score_input(score1, score2)
+        winner_side = _calculate_winner_side(score1, score2)
 
-    game.team1_score = score1
-    game.team2_score = score2
-    game.winner_side = winner_side
-    game.status = "completed" if winner_side in (1, 2) else "live"
+        game.team1_score = score1
+        game.team2_score = score2
+        game.winner_side = winner_side
+        game.status = "completed" if winner_side in (1, 2) else "live"
 
-    _recalculate_final_match(db, game.final_match_id)
-    db.commit()
+        _recalculate_final_match(final_match)
+        db.commit()
 
-    refreshed = _get_final_match_query(db).filter(models.FinalMatch.id == game.final_match_id).first()
-    if not refreshed:
-        raise LookupError("Final tie not found.")
-    return refreshed
+    return final_match
 
 
 def build_medal_summary(
@@ -879,7 +1792,14 @@ def build_medal_summary(
     final_match: models.FinalMatch | None,
 ) -> schemas.MedalSummary:
     _, _, league_complete = _league_completion_info(db)
+    return _medal_summary(league_complete, standings, final_match)
+
 
+def _medal_summary(
+    league_complete: bool,
+    standings: list[schemas.StandingRow],
+    final_match: models.FinalMatch | None,
+) -> schemas.MedalSummary:
     finalist1 = standings[0].team if league_complete and len(standings) >= 2 else None
     finalist2 = standings[1].team if league_complete and len(standings) >= 2 else None
     bronze_team = standings[2].team if league_complete and len(standings) >= 3 else None
@@ -908,11 +1828,30 @@ def build_viewer_dashboard(db: Session) -> schemas.ViewerDashboard:
     all_matches = list_matches(db)
     standings = build_standings(db)
     final_match = get_or_sync_final_match(db, standings)
-    medals = build_medal_summary(db, standings, final_match)
+
+    return build_viewer_dashboard_from(
+        [(tie, tie.matches) for tie in ties],
+        all_matches,
+        standings,
+        final_match,
+        _league_completion_info(db),
+    )
+
+
+def build_viewer_dashboard_from(
+    ties: list[tuple[models.Tie, list[models.Match]]],
+    all_matches: list[models.Match],
+    standings: list[schemas.StandingRow],
+    final_match: models.FinalMatch | None,
+    league_completion: tuple[int, int, bool],
+) -> schemas.ViewerDashboard:
+    """Assemble the dashboard from loaded data; `ties` pairs each tie with its visible matches."""
+    total_ties, completed_ties, league_complete = league_completion
+    medals = _medal_summary(league_complete, standings, final_match)
 
     tie_payload = [
-        serializers.tie_to_read(tie, sorted(tie.matches, key=lambda match: match.match_no))
-        for tie in sorted(ties, key=lambda tie: tie.tie_no)
+        serializers.tie_to_read(tie, sorted(matches, key=lambda match: match.match_no))
+        for tie, matches in sorted(ties, key=lambda item: item[0].tie_no)
     ]
 
     pending_games = sum(1 for match in all_matches if match.status == "pending")
@@ -928,8 +1867,6 @@ def build_viewer_dashboard(db: Session) -> schemas.ViewerDashboard:
         live_games += sum(1 for game in final_games if game.status == "live")
         completed_games += sum(1 for game in final_games if game.status == "completed")
 
-    total_ties, completed_ties, _ = _league_completion_info(db)
-
     return schemas.ViewerDashboard(
         summary=schemas.DashboardSummary(
             total_games=total_games,
@@ -946,7 +1883,7 @@ def build_viewer_dashboard(db: Session) -> schemas.ViewerDashboard:
         rule_highlights=[
             "Round-robin league: every team plays every other team once.",
             "Finals qualification is locked only after all league ties are completed.",
-            "Ranking order: tie wins, then games won, then average lead per game.",
+            f"Ranking order: {tiebreaks.get_ruleset().description}.",
             "Top 2 qualify as Finalist 1 and Finalist 2; 3rd place gets Bronze medal.",
             "Final tie winner gets Gold medal; other finalist gets Silver medal.",
             "Each match is played to 21; at 20-all continue to a 2-point lead, capped at 30.",
@@ -21,18 +21,54 @@ def normalize_database_url(raw_url: str | None) -> str:
     return value
 
 
+def env_flag(name: str, default: str = "false") -> bool:
+    value = os.getenv(name, default).strip().lower()
+    return value in {"1", "true", "yes", "on"}
+
+
+def engine_kwargs_for(url: str) -> dict[str, object]:
+    engine_kwargs: dict[str, object] = {}
+    if url.startswith("sqlite"):
+        engine_kwargs["connect_args"] = {"check_same_thread": False, "timeout": 30}
+    return engine_kwargs
+
+
 DATABASE_URL = normalize_database_url(os.getenv("DATABASE_URL"))
 
-engine_kwargs: dict[str, object] = {}
-if DATABASE_URL.startswith("sqlite"):
-    engine_kwargs["connect_args"] = {"check_same_thread": False, "timeout": 30}
+# "python" keeps tie aggregates in crud; "trigger" leaves them to database triggers.
+TIE_AGGREGATE_ENGINE = os.getenv("TIE_AGGREGATE_ENGINE", "python").strip().lower()
+if TIE_AGGREGATE_ENGINE not in {"python", "trigger"}:
+    raise ValueError("TIE_AGGREGATE_ENGINE must be 'python' or 'trigger'.")
 
+engine_kwargs = engine_kwargs_for(DATABASE_URL)
 engine = create_engine(DATABASE_URL, **engine_kwargs)
 SessionLocal = sessionmaker(
     bind=engine,
     autoflush=False,
     autocommit=False,
     expire_on_commit=False,
+    info={
+        "tie_aggregates": TIE_AGGREGATE_ENGINE,
+        "tie_aggregate_verify": env_flag("TIE_AGGREGATE_VERIFY"),
+    },
+)
+
+# Optional replica for spectator reads; see `read_replica.get_read_db`.
+DATABASE_READ_URL = os.getenv("DATABASE_READ_URL", "").strip()
+read_engine = None
+if DATABASE_READ_URL:
+    read_url = normalize_database_url(DATABASE_READ_URL)
+    read_engine = create_engine(read_url, **engine_kwargs_for(read_url))
+ReadSessionLocal = (
+    sessionmaker(
+        bind=read_engine,
+        autoflush=False,
+        autocommit=False,
+        expire_on_commit=False,
+        info={"read_only": True},
+    )
+    if read_engine is not None
+    else None
 )
 Base = declarative_base()
 
@@ -0,0 +1,153 @@
+"""Streaming exports of matches, ties, standings and final games.
+
+Rows are read as plain columns with `yield_per`, which streams them through a
+server-side cursor on Postgres, and are encoded one chunk at a time as NDJSON or CSV.
+Memory stays flat however many matches exist. Standings are one row per team and are
+built with `crud.build_standings`.
+"""
+
+import csv
+import io
+import json
+from collections.abc import Iterator
+from typing import Any, Literal
+
+from sqlalchemy import Select, select
+from sqlalchemy.orm import Session, aliased
+
+from . import crud, models, serializers
+
+ExportDataset = Literal["matches", "ties", "standings", "final_games"]
+ExportFormat = Literal["ndjson", "csv"]
+
+EXPORT_YIELD_PER = 500
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+
+
+def _matches_query() -> Select[Any]:
+    team1 = aliased(models.Team)
+    team2 = aliased(models.Team)
+    return (
+        select(
+            models.Match.id,
+            models.Tie.tie_no,
+            models.Match.match_no,
+            models.Match.discipline,
+            models.Match.day,
+            models.Match.session,
+            models.Match.court,
+            models.Match.time,
+            models.Match.status,
+            team1.name.label("team1"),
+            team2.name.label("team2"),
+            models.Match.team1_lineup,
+            models.Match.team2_lineup,
+            models.Match.team1_score,
+            models.Match.team2_score,
+            models.Match.winner_side,
+            models.Referee.name.label("referee"),
+        )
+        .join(models.Tie, models.Match.tie_id == models.Tie.id)
+        .join(team1, models.Match.team1_id == team1.id)
+        .join(team2, models.Match.team2_id == team2.id)
+        .outerjoin(models.Referee, models.Match.referee_id == models.Referee.id)
+        .order_by(models.Tie.tie_no.asc(), models.Match.match_no.asc())
+    )
+
+
+def _ties_query() -> Select[Any]:
+    team1 = aliased(models.Team)
+    team2 = aliased(models.Team)
+    winner = aliased(models.Team)
+    return (
+        select(
+            models.Tie.id,
+            models.Tie.tie_no,
+            models.Tie.day,
+            models.Tie.session,
+            models.Tie.court,
+            team1.name.label("team1"),
+            team2.name.label("team2"),
+            models.Tie.score1,
+            models.Tie.score2,
+            models.Tie.status,
+            winner.name.label("winner_team"),
+        )
+        .join(team1, models.Tie.team1_id == team1.id)
+        .join(team2, models.Tie.team2_id == team2.id)
+        .outerjoin(winner, models.Tie.winner_team_id == winner.id)
+        .order_by(models.Tie.tie_no.asc())
+    )
+
+
+def _final_games_query() -> Select[Any]:
+    team1 = aliased(models.Team)
+    team2 = aliased(models.Team)
+    return (
+        select(
+            models.FinalGame.id,
+            models.FinalGame.match_no,
+            models.FinalGame.discipline,
+            models.FinalGame.status,
+            team1.name.label("team1"),
+            team2.name.label("team2"),
+            models.FinalGame.team1_lineup,
+            models.FinalGame.team2_lineup,
+            models.FinalGame.team1_score,
+            models.FinalGame.team2_score,
+            models.FinalGame.winner_side,
+            models.Referee.name.label("referee"),
+        )
+        .join(models.FinalMatch, models.FinalGame.final_match_id == models.FinalMatch.id)
+        .join(team1, models.FinalMatch.team1_id == team1.id)
+        .join(team2, models.FinalMatch.team2_id == team2.id)
+        .outerjoin(models.Referee, models.FinalGame.referee_id == models.Referee.id)
+        .order_by(models.FinalGame.match_no.asc())
+    )
+
+
+_QUERIES = {
+    "matches": _matches_query,
+    "ties": _ties_query,
+    "final_games": _final_games_query,
+}
+
+
+def dataset_rows(db: Session, dataset: ExportDataset) -> tuple[list[str], Iterator[dict[str, Any]]]:
+    if dataset == "standings":
+        rows = [serializers.model_dump_compat(row) for row in crud.build_standings(db)]
+        return list(rows[0]) if rows else [], iter(rows)
+
+    result = db.execute(_QUERIES[dataset]().execution_options(yield_per=EXPORT_YIELD_PER))
+    return list(result.keys()), (dict(row._mapping) for row in result)
+
+
+def stream_export(
+    db: Session, dataset: ExportDataset, export_format: ExportFormat
+) -> Iterator[bytes]:
+    """Encoded export chunks; closes `db` once the stream ends or is abandoned."""
+    try:
+        columns, rows = dataset_rows(db, dataset)
+        if export_format == "csv":
+            buffer = io.StringIO()
+            writer = csv.DictWriter(buffer, fieldnames=columns)
+            writer.writeheader()
+            for index, row in enumerate(rows, start=1):
+                writer.writerow(row)
+                if index % EXPORT_YIELD_PER == 0:
+                    yield buffer.getvalue().encode("utf-8")
+                    buffer.seek(0)
+                    buffer.truncate()
+            yield buffer.getvalue().encode("utf-8")
+            return
+
+        chunk: list[str] = []
+        for row in rows:
+            chunk.append(json.dumps(row, separators=(",", ":")))
+            if len(chunk) == EXPORT_YIELD_PER:
+                yield ("\n".join(chunk) + "\n").encode("utf-8")
+                chunk = []
+        if chunk:
+            yield ("\n".join(chunk) + "\n").encode("utf-8")
+    finally:
+        db.close()
@@ -0,0 +1,243 @@
+"""Idempotency keys for referee write endpoints.
+
+A client that sends `Idempotency-Key: <unique value>` with a write gets the stored
+response back if it retries the same request, without the write path running again
+(no match, tie or final rows are read or locked). Keys expire after
+`IDEMPOTENCY_TTL_SECONDS`; expired rows are swept at most once per
+`IDEMPOTENCY_SWEEP_SECONDS` by whichever worker stores the next response.
+
+The first request reserves its key with an INSERT before it writes, so a retry that
+arrives while it is still running gets 409 instead of running the write again. The
+write's own commit marks the key as applied, in the same transaction, and the response
+is stored right after. A reservation that was never applied is released when the
+request fails, and lapses after `IDEMPOTENCY_LEASE_SECONDS` if its worker died; an
+applied key is never run again within its TTL, even if its response was lost.
+
+Only successful responses are stored, so a request rejected for a precondition
+(no referee yet, decider locked) can be retried with the same key once fixed.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+import zlib
+from collections.abc import Generator
+from typing import Any
+
+from fastapi import Depends, Header, HTTPException, Request, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from . import cache, models
+from .database import get_db
+from .state_engine import get_write_db
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+# `Session.info` entry naming the reservation the session's next commit applies.
+_APPLIES_INFO_KEY = "idempotency_applies"
+
+
+def get_ttl_seconds() -> int:
+    return max(1, int(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400")))
+
+
+def get_lease_seconds() -> int:
+    return max(1, int(os.getenv("IDEMPOTENCY_LEASE_SECONDS", "60")))
+
+
+def get_sweep_seconds() -> int:
+    return max(0, int(os.getenv("IDEMPOTENCY_SWEEP_SECONDS", "60")))
+
+
+_last_sweep = 0.0
+_sweep_guard = threading.Lock()
+
+
+def _sweep_due(now: float) -> bool:
+    global _last_sweep
+    with _sweep_guard:
+        if now - _last_sweep < get_sweep_seconds():
+            return False
+        _last_sweep = now
+        return True
+
+
+def purge_expired_keys(db: Session, now: int | None = None) -> int:
+    now = int(time.time()) if now is None else now
+    deleted = (
+        db.query(models.IdempotencyKey)
+        .filter(models.IdempotencyKey.expires_at <= now)
+        .delete(synchronize_session=False)
+    )
+    db.commit()
+    return deleted
+
+
+def _key_filter(key: str, request_hash: str) -> Any:
+    return (models.IdempotencyKey.key == key) & (models.IdempotencyKey.request_hash == request_hash)
+
+
+class IdempotentRequest:
+    def __init__(
+        self, db: Session, key: str | None, request_hash: str, write_db: Session | None = None
+    ) -> None:
+        self.db = db
+        self.key = key
+        self.request_hash = request_hash
+        # The session the write commits on (the in-memory state's, when that engine is on).
+        self.write_db = db if write_db is None else write_db
+        self._reserved = False
+
+    def replay(self) -> Response | None:
+        """Return the stored response for a retried request, or None to run the write.
+
+        None means this request now holds the key: the write's commit applies it.
+        """
+        if self.key is None:
+            return None
+
+        now = int(time.time())
+        # Expired keys, and reservations whose request died before writing, are reusable.
+        self.db.query(models.IdempotencyKey).filter(
+            models.IdempotencyKey.key == self.key, models.IdempotencyKey.expires_at <= now
+        ).delete(synchronize_session=False)
+        self.db.add(
+            models.IdempotencyKey(
+                key=self.key,
+                request_hash=self.request_hash,
+                applied=False,
+                expires_at=now + get_lease_seconds(),
+            )
+        )
+        try:
+            self.db.commit()
+        except IntegrityError:
+            self.db.rollback()
+        else:
+            self._reserved = True
+            self.write_db.info[_APPLIES_INFO_KEY] = self
+            return None
+
+        record = self.db.get(models.IdempotencyKey, self.key, populate_existing=True)
+        if record is None:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"{IDEMPOTENCY_HEADER} was released by another request; retry.",
+            )
+        if record.request_hash != self.request_hash:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"{IDEMPOTENCY_HEADER} was already used for a different request.",
+            )
+        if record.response_body is None:
+            detail = (
+                "was applied, but its response was not stored"
+                if record.applied
+                else "is still in progress"
+            )
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"The request with this {IDEMPOTENCY_HEADER} {detail}.",
+            )
+
+        return Response(
+            content=zlib.decompress(record.response_body),
+            status_code=record.status_code,
+            media_type="application/json",
+            headers={REPLAYED_HEADER: "true"},
+        )
+
+    def store(self, result: Any, status_code: int = status.HTTP_200_OK) -> Any:
+        """Remember `result` as the response for this key and return it unchanged."""
+        if self.key is None:
+            return result
+
+        self.write_db.info.pop(_APPLIES_INFO_KEY, None)
+        body = json.dumps(jsonable_encoder(result), separators=(",", ":")).encode("utf-8")
+        now = int(time.time())
+        self.db.query(models.IdempotencyKey).filter(
+            _key_filter(self.key, self.request_hash)
+        ).update(
+            {
+                models.IdempotencyKey.applied: True,
+                models.IdempotencyKey.status_code: status_code,
+                models.IdempotencyKey.response_body: zlib.compress(body),
+                models.IdempotencyKey.expires_at: now + get_ttl_seconds(),
+            },
+            synchronize_session=False,
+        )
+        self.db.commit()
+        self._reserved = False
+
+        if _sweep_due(time.monotonic()):
+            purge_expired_keys(self.db, now)
+        return result
+
+    def release(self) -> None:
+        """Give up the key after a failed request, unless its write was committed."""
+        if not self._reserved:
+            return
+
+        self._reserved = False
+        self.write_db.info.pop(_APPLIES_INFO_KEY, None)
+        self.db.rollback()
+        self.db.query(models.IdempotencyKey).filter(
+            _key_filter(self.key, self.request_hash),
+            models.IdempotencyKey.applied.is_(False),
+        ).delete(synchronize_session=False)
+        self.db.commit()
+
+
+@event.listens_for(Session, "before_commit", insert=True)
+def _apply_reserved_key(db: Session) -> None:
+    # Runs inside the write's transaction (ahead of the data version bump, which clears
+    # the change marker): the key is applied exactly when the write is.
+    if not cache.has_data_changes(db):
+        return
+    request = db.info.pop(_APPLIES_INFO_KEY, None)
+    if request is None:
+        return
+    db.query(models.IdempotencyKey).filter(_key_filter(request.key, request.request_hash)).update(
+        {
+            models.IdempotencyKey.applied: True,
+            models.IdempotencyKey.expires_at: int(time.time()) + get_ttl_seconds(),
+        },
+        synchronize_session=False,
+    )
+
+
+async def _request_key(
+    request: Request,
+    idempotency_key: str | None = Header(default=None, alias=IDEMPOTENCY_HEADER, max_length=255),
+) -> tuple[str | None, str]:
+    key = idempotency_key.strip() if idempotency_key else None
+    request_hash = ""
+    if key:
+        digest = hashlib.sha256()
+        digest.update(request.method.encode("utf-8"))
+        digest.update(b"\0" + request.url.path.encode("utf-8"))
+        digest.update(b"\0" + request.url.query.encode("utf-8"))
+        digest.update(b"\0" + await request.body())
+        request_hash = digest.hexdigest()
+
+    return key or None, request_hash
+
+
+def idempotent_request(
+    db: Session = Depends(get_db),
+    write_db: Session = Depends(get_write_db),
+    request_key: tuple[str | None, str] = Depends(_request_key),
+) -> Generator[IdempotentRequest, None, None]:
+    idempotency = IdempotentRequest(db, *request_key, write_db=write_db)
+    try:
+        yield idempotency
+    except BaseException:
+        idempotency.release()
+        raise
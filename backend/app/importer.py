@@ -0,0 +1,281 @@
+"""Bulk roster and fixture import.
+
+An import has up to four sections: `teams`, `players` (with set levels), `ties` and
+`match_templates`. Every imported tie gets one match per template. Players and ties name
+their teams, which may be new in the same import or already in the database.
+
+JSON bodies carry one list per section. CSV bodies are a single sheet with a `section`
+column; each row fills only the columns of its section, e.g.
+
+    section,name,team,set_level,tie_no,day,session,court,team1,team2,match_no,discipline
+    teams,Smash Hawks,,,,,,,,,,
+    players,Pratham,Smash Hawks,Set-1,,,,,,,,
+    ties,,,,1,1,morning,1,Smash Hawks,Spartans,,
+    match_templates,,,,,,,,,,1,Set 1 / Set 1
+
+Every row is validated in memory first, against the `schemas` constraints and against
+the database. Any row error rejects the whole import and all errors are reported.
+Otherwise the rows are inserted in batches inside one transaction.
+"""
+
+import csv
+import io
+from collections.abc import Iterable
+from datetime import datetime, timedelta
+from typing import Any
+
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from . import models, schemas
+
+IMPORT_SECTIONS: dict[str, type[BaseModel]] = {
+    "teams": schemas.TeamCreate,
+    "players": schemas.PlayerImport,
+    "ties": schemas.TieImport,
+    "match_templates": schemas.MatchTemplateImport,
+}
+INSERT_BATCH_SIZE = 500
+MATCH_SLOT_MINUTES = 15
+
+# (CSV line number or None, raw row) per section.
+RawRows = dict[str, list[tuple[int | None, dict[str, Any]]]]
+
+
+def rows_from_json(payload: Any) -> RawRows:
+    if not isinstance(payload, dict):
+        raise ValueError("Import body must be a JSON object with one list per section.")
+
+    unknown = sorted(set(payload) - set(IMPORT_SECTIONS))
+    if unknown:
+        raise ValueError(f"Unknown import sections: {', '.join(unknown)}.")
+
+    rows: RawRows = {}
+    for section, items in payload.items():
+        if not isinstance(items, list) or not all(isinstance(item, dict) for item in items):
+            raise ValueError(f"Section '{section}' must be a list of objects.")
+        rows[section] = [(None, item) for item in items]
+    return rows
+
+
+def rows_from_csv(text: str) -> RawRows:
+    reader = csv.DictReader(io.StringIO(text))
+    if reader.fieldnames is None or "section" not in reader.fieldnames:
+        raise ValueError("CSV import needs a header row with a 'section' column.")
+
+    rows: RawRows = {}
+    for record in reader:
+        section = (record.pop("section") or "").strip()
+        if section not in IMPORT_SECTIONS:
+            raise ValueError(f"Unknown import section '{section}' on line {reader.line_num}.")
+        # Blank cells belong to other sections' columns, or fall back to defaults.
+        values = {
+            key: value.strip() for key, value in record.items() if key and value and value.strip()
+        }
+        rows.setdefault(section, []).append((reader.line_num, values))
+    return rows
+
+
+def _validation_message(exc: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in error['loc']) or 'row'}: {error['msg']}"
+        for error in exc.errors()
+    )
+
+
+def _batched(rows: list[dict[str, Any]]) -> Iterable[list[dict[str, Any]]]:
+    for start in range(0, len(rows), INSERT_BATCH_SIZE):
+        yield rows[start : start + INSERT_BATCH_SIZE]
+
+
+def _match_time(start_time: str, template: schemas.MatchTemplateImport) -> str:
+    offset = template.offset_minutes
+    if offset is None:
+        offset = (template.match_no - 1) * MATCH_SLOT_MINUTES
+    return (datetime.strptime(start_time, "%H:%M") + timedelta(minutes=offset)).strftime("%H:%M")
+
+
+class _Validator:
+    def __init__(self, rows: RawRows) -> None:
+        self.rows = rows
+        self.errors: list[schemas.ImportRowError] = []
+
+    def error(self, section: str, index: int, line: int | None, message: str) -> None:
+        self.errors.append(
+            schemas.ImportRowError(section=section, index=index, line=line, error=message)
+        )
+
+    def parsed(self, section: str) -> list[tuple[int, int | None, Any]]:
+        model = IMPORT_SECTIONS[section]
+        valid = []
+        for index, (line, data) in enumerate(self.rows.get(section, [])):
+            try:
+                valid.append((index, line, model.model_validate(data)))
+            except ValidationError as exc:
+                self.error(section, index, line, _validation_message(exc))
+        return valid
+
+
+def import_roster(db: Session, rows: RawRows) -> schemas.ImportResult:
+    check = _Validator(rows)
+    teams = check.parsed("teams")
+    players = check.parsed("players")
+    ties = check.parsed("ties")
+    templates = check.parsed("match_templates")
+
+    # Teams referenced by name, whether new in this import or already stored.
+    referenced = {models.name_key(item.name) for _, _, item in teams}
+    referenced |= {models.name_key(item.team) for _, _, item in players}
+    referenced |= {
+        models.name_key(name) for _, _, item in ties for name in (item.team1, item.team2)
+    }
+    existing_teams = dict(
+        db.execute(
+            select(models.Team.name_key, models.Team.id).where(models.Team.name_key.in_(referenced))
+        ).all()
+    )
+
+    new_teams: dict[str, str] = {}
+    for index, line, item in teams:
+        key = models.name_key(item.name)
+        if key in existing_teams or key in new_teams:
+            check.error("teams", index, line, f"Team '{item.name}' already exists.")
+        else:
+            new_teams[key] = " ".join(item.name.split())
+
+    known_teams = set(existing_teams) | set(new_teams)
+    existing_players = set(
+        db.execute(
+            select(models.Team.name_key, models.Player.name_key)
+            .join(models.Player.team)
+            .where(models.Team.name_key.in_(referenced))
+        ).all()
+    )
+    seen_players: set[tuple[str, str]] = set()
+    for index, line, item in players:
+        team_key = models.name_key(item.team)
+        player_key = (team_key, models.name_key(item.name))
+        if team_key not in known_teams:
+            check.error("players", index, line, f"Team '{item.team}' not found.")
+        elif player_key in existing_players or player_key in seen_players:
+            check.error(
+                "players", index, line, f"Player '{item.name}' already exists for '{item.team}'."
+            )
+        seen_players.add(player_key)
+
+    tie_numbers = {item.tie_no for _, _, item in ties}
+    existing_tie_numbers = set(
+        db.scalars(select(models.Tie.tie_no).where(models.Tie.tie_no.in_(tie_numbers))).all()
+    )
+    seen_tie_numbers: set[int] = set()
+    for index, line, item in ties:
+        team_keys = [models.name_key(item.team1), models.name_key(item.team2)]
+        missing = [
+            name
+            for name, key in zip((item.team1, item.team2), team_keys, strict=True)
+            if key not in known_teams
+        ]
+        if missing:
+            check.error("ties", index, line, f"Team '{missing[0]}' not found.")
+        elif team_keys[0] == team_keys[1]:
+            check.error("ties", index, line, "A tie needs two different teams.")
+        elif item.tie_no in existing_tie_numbers or item.tie_no in seen_tie_numbers:
+            check.error("ties", index, line, f"Tie number {item.tie_no} already exists.")
+        seen_tie_numbers.add(item.tie_no)
+
+    seen_match_numbers: set[int] = set()
+    for index, line, item in templates:
+        if item.match_no in seen_match_numbers:
+            check.error("match_templates", index, line, f"Duplicate match number {item.match_no}.")
+        seen_match_numbers.add(item.match_no)
+
+    if check.errors:
+        check.errors.sort(
+            key=lambda error: (list(IMPORT_SECTIONS).index(error.section), error.index)
+        )
+        return schemas.ImportResult(imported=False, errors=check.errors)
+
+    try:
+        result = _insert_rows(db, existing_teams, new_teams, players, ties, templates)
+        db.commit()
+    except IntegrityError as exc:
+        db.rollback()
+        raise ValueError("Import conflicts with a concurrent change; retry it.") from exc
+    return result
+
+
+def _insert_rows(
+    db: Session,
+    team_ids: dict[str, int],
+    new_teams: dict[str, str],
+    players: list[tuple[int, int | None, Any]],
+    ties: list[tuple[int, int | None, Any]],
+    templates: list[tuple[int, int | None, Any]],
+) -> schemas.ImportResult:
+    team_rows = [{"name": name, "name_key": key} for key, name in new_teams.items()]
+    for batch in _batched(team_rows):
+        statement = insert(models.Team).returning(models.Team.name_key, models.Team.id)
+        rows = db.execute(statement, batch)
+        team_ids.update((name_key, team_id) for name_key, team_id in rows)
+
+    player_rows = [
+        {
+            "name": " ".join(item.name.split()),
+            "name_key": models.name_key(item.name),
+            "set_level": item.set_level,
+            "team_id": team_ids[models.name_key(item.team)],
+        }
+        for _, _, item in players
+    ]
+    for batch in _batched(player_rows):
+        db.execute(insert(models.Player), batch)
+
+    tie_rows = [
+        {
+            "tie_no": item.tie_no,
+            "day": item.day,
+            "session": item.session,
+            "court": item.court,
+            "team1_id": team_ids[models.name_key(item.team1)],
+            "team2_id": team_ids[models.name_key(item.team2)],
+            "status": "pending",
+        }
+        for _, _, item in ties
+    ]
+    tie_ids: dict[int, int] = {}
+    for batch in _batched(tie_rows):
+        rows = db.execute(insert(models.Tie).returning(models.Tie.tie_no, models.Tie.id), batch)
+        tie_ids.update((tie_no, tie_id) for tie_no, tie_id in rows)
+
+    match_rows = [
+        {
+            "stage": "tie",
+            "status": "pending",
+            "tie_id": tie_ids[tie.tie_no],
+            "match_no": template.match_no,
+            "discipline": template.discipline,
+            "team1_id": tie_row["team1_id"],
+            "team2_id": tie_row["team2_id"],
+            "team1_lineup": template.team1_lineup,
+            "team2_lineup": template.team2_lineup,
+            "lineup_confirmed": False,
+            "day": tie.day,
+            "session": tie.session,
+            "court": tie.court,
+            "time": _match_time(tie.start_time, template),
+        }
+        for (_, _, tie), tie_row in zip(ties, tie_rows, strict=True)
+        for _, _, template in sorted(templates, key=lambda row: row[2].match_no)
+    ]
+    for batch in _batched(match_rows):
+        db.execute(insert(models.Match), batch)
+
+    return schemas.ImportResult(
+        imported=True,
+        teams=len(team_rows),
+        players=len(player_rows),
+        ties=len(tie_rows),
+        matches=len(match_rows),
+    )
@@ -3,9 +3,30 @@ import os
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from .database import Base, SessionLocal, engine
+from .cache import configure_cache
+from .database import TIE_AGGREGATE_ENGINE, Base, SessionLocal, engine
 from .models import Team
-from .routes import finals, matches, players, referee, schedule, teams, ties, viewer
+from .profiling import ProfilingMiddleware
+from .projection import configure_projection
+from .read_replica import ReadYourWritesMiddleware
+from .routes import (
+    admin,
+    archives,
+    export,
+    finals,
+    matches,
+    players,
+    referee,
+    schedule,
+    teams,
+    ties,
+    viewer,
+)
+from .schema_sync import sync_schema
+from .score_buffer import configure_score_buffer
+from .state_engine import configure_state_engine
+from .tie_triggers import sync_tie_triggers
+from .tiebreaks import configure_tiebreaks
 
 app = FastAPI(
     title="Badminton Tournament API",
@@ -28,9 +49,14 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Primary-Pin", "X-Score-Seq", "Idempotent-Replayed"],
 )
+app.add_middleware(ReadYourWritesMiddleware)
+app.add_middleware(ProfilingMiddleware)
 
 Base.metadata.create_all(bind=engine)
+sync_schema(engine)
+sync_tie_triggers(engine, TIE_AGGREGATE_ENGINE)
 
 
 def should_auto_seed() -> bool:
@@ -68,7 +94,12 @@ def seed_if_empty() -> None:
     seed(demo_progress=False, reset_db=False)
 
 
+configure_tiebreaks()
 seed_if_empty()
+configure_score_buffer(SessionLocal)
+configure_state_engine(SessionLocal)
+configure_cache(engine)
+configure_projection(SessionLocal)
 
 
 @app.get("/health")
@@ -87,3 +118,6 @@ app.include_router(viewer.router, prefix="/viewer")
 # Register viewer endpoints without prefix as a compatibility fallback.
 app.include_router(viewer.router)
 app.include_router(finals.router, prefix="/finals")
+app.include_router(admin.router, prefix="/admin")
+app.include_router(export.router, prefix="/export")
+app.include_router(archives.router, prefix="/archives")
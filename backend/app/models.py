@@ -1,14 +1,42 @@
-from sqlalchemy import Boolean, CheckConstraint, Column, ForeignKey, Integer, String, UniqueConstraint
+from sqlalchemy import (
+    DDL,
+    BigInteger,
+    Boolean,
+    CheckConstraint,
+    Column,
+    DateTime,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    LargeBinary,
+    Sequence,
+    SmallInteger,
+    String,
+    UniqueConstraint,
+    event,
+    func,
+)
 from sqlalchemy.orm import relationship
 
 from .database import Base
 
 
+def name_key(name: str) -> str:
+    """Case- and spacing-insensitive identity of a team, player or referee name."""
+    return " ".join(name.split()).lower()
+
+
+def _name_key_default(context) -> str:  # type: ignore[no-untyped-def]
+    return name_key(context.get_current_parameters()["name"])
+
+
 class Team(Base):
     __tablename__ = "teams"
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(100), unique=True, nullable=False, index=True)
+    name_key = Column(String(100), unique=True, nullable=False, default=_name_key_default)
 
     players = relationship("Player", back_populates="team", cascade="all, delete-orphan")
 
@@ -33,13 +61,14 @@ class Player(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(100), nullable=False)
+    name_key = Column(String(100), nullable=False, default=_name_key_default)
     set_level = Column(String(16), nullable=False, index=True)
     team_id = Column(Integer, ForeignKey("teams.id"), nullable=False, index=True)
 
     team = relationship("Team", back_populates="players")
 
     __table_args__ = (
-        UniqueConstraint("name", "team_id", name="uq_player_name_team"),
+        UniqueConstraint("team_id", "name_key", name="uq_player_name_key_team"),
         CheckConstraint(
             "set_level in ('Set-1', 'Set-2', 'Set-3', 'Set-4', 'Set-5')",
             name="ck_player_set_level_valid",
@@ -57,8 +86,9 @@ class Tie(Base):
     session = Column(String(32), nullable=False)
     court = Column(Integer, nullable=False)
 
-    team1_id = Column(Integer, ForeignKey("teams.id"), nullable=False, index=True)
-    team2_id = Column(Integer, ForeignKey("teams.id"), nullable=False, index=True)
+    # Team lookups use the composite indexes below in either direction.
+    team1_id = Column(Integer, ForeignKey("teams.id"), nullable=False)
+    team2_id = Column(Integer, ForeignKey("teams.id"), nullable=False)
 
     score1 = Column(Integer, default=0, nullable=False)
     score2 = Column(Integer, default=0, nullable=False)
@@ -66,6 +96,13 @@ class Tie(Base):
 
     winner_team_id = Column(Integer, ForeignKey("teams.id"), nullable=True)
 
+    # Incremental aggregates kept in step with match writes by crud.
+    # NULL regular_total means "unknown": the next write recounts the tie.
+    regular_total = Column(Integer, nullable=True)
+    regular_completed = Column(Integer, default=0, nullable=False)
+    started_matches = Column(Integer, default=0, nullable=False)
+    decider_winner_side = Column(Integer, nullable=True)
+
     team1 = relationship("Team", foreign_keys=[team1_id], back_populates="home_ties")
     team2 = relationship("Team", foreign_keys=[team2_id], back_populates="away_ties")
     winner_team = relationship("Team", foreign_keys=[winner_team_id], back_populates="won_ties")
@@ -73,6 +110,8 @@ class Tie(Base):
     matches = relationship("Match", back_populates="tie", cascade="all, delete-orphan")
 
     __table_args__ = (
+        Index("ix_ties_team1_team2", "team1_id", "team2_id"),
+        Index("ix_ties_team2_team1", "team2_id", "team1_id"),
         CheckConstraint("team1_id <> team2_id", name="ck_tie_distinct_teams"),
         CheckConstraint("score1 >= 0", name="ck_tie_score1_nonnegative"),
         CheckConstraint("score2 >= 0", name="ck_tie_score2_nonnegative"),
@@ -88,6 +127,7 @@ class Referee(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(100), unique=True, nullable=False, index=True)
+    name_key = Column(String(100), unique=True, nullable=False, default=_name_key_default)
 
     matches = relationship("Match", back_populates="referee")
 
@@ -123,6 +163,9 @@ class Match(Base):
     referee_id = Column(Integer, ForeignKey("referees.id"), nullable=True, index=True)
     winner_side = Column(Integer, nullable=True)
 
+    # Highest rally sequence number applied from the rally log (0 = none yet).
+    rally_seq = Column(Integer, default=0, nullable=False)
+
     tie = relationship("Tie", back_populates="matches")
     team1 = relationship("Team", foreign_keys=[team1_id], back_populates="matches_as_team1")
     team2 = relationship("Team", foreign_keys=[team2_id], back_populates="matches_as_team2")
@@ -140,6 +183,129 @@ class Match(Base):
     )
 
 
+def is_decider_match(match: Match) -> bool:
+    """Game 13 of a tie, played only when the regular games end level."""
+    if match.match_no == 13:
+        return True
+    return "decider" in (match.discipline or "").lower()
+
+
+class RallyEvent(Base):
+    """Append-only rally log: one row per point won, in referee sequence order."""
+
+    __tablename__ = "rally_events"
+
+    match_id = Column(Integer, ForeignKey("matches.id"), primary_key=True)
+    seq = Column(Integer, primary_key=True)
+    side = Column(SmallInteger, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    __table_args__ = (
+        CheckConstraint("side in (1, 2)", name="ck_rally_side_valid"),
+        CheckConstraint("seq >= 1", name="ck_rally_seq_positive"),
+    )
+
+
+class MatchPlayer(Base):
+    """Players resolved from a match's confirmed lineup: one row per player and match."""
+
+    __tablename__ = "match_players"
+
+    match_id = Column(Integer, ForeignKey("matches.id"), primary_key=True)
+    player_id = Column(Integer, ForeignKey("players.id"), primary_key=True)
+    side = Column(SmallInteger, nullable=False)
+
+    __table_args__ = (
+        Index("ix_match_players_player_match", "player_id", "match_id"),
+        CheckConstraint("side in (1, 2)", name="ck_match_player_side_valid"),
+    )
+
+
+class PlayerStat(Base):
+    """Completed-match totals per player and discipline, kept in step by crud.
+
+    `discipline` is `ALL_DISCIPLINES` for the player's overall line. `set_level` is
+    copied from the player so set-level leaderboards are one indexed read.
+    """
+
+    __tablename__ = "player_stats"
+
+    ALL_DISCIPLINES = "all"
+
+    player_id = Column(Integer, ForeignKey("players.id"), primary_key=True)
+    discipline = Column(String(64), primary_key=True)
+    set_level = Column(String(16), nullable=False)
+
+    played = Column(Integer, default=0, nullable=False)
+    wins = Column(Integer, default=0, nullable=False)
+    losses = Column(Integer, default=0, nullable=False)
+    points_for = Column(Integer, default=0, nullable=False)
+    points_against = Column(Integer, default=0, nullable=False)
+    deuce_games = Column(Integer, default=0, nullable=False)
+
+    player = relationship("Player")
+
+    __table_args__ = (
+        Index("ix_player_stats_leaderboard", "discipline", "wins"),
+        Index("ix_player_stats_set_leaderboard", "set_level", "discipline", "wins"),
+    )
+
+
+class Rating(Base):
+    """Current rating of a player, or of a doubles pair.
+
+    A player's own rating has `partner_id == player_id`; a pair has `player_id <
+    partner_id`. Ratings outlive archived tournaments, so they seed the next event.
+    """
+
+    __tablename__ = "ratings"
+
+    player_id = Column(Integer, ForeignKey("players.id"), primary_key=True)
+    partner_id = Column(Integer, ForeignKey("players.id"), primary_key=True)
+    rating = Column(Float, nullable=False)
+    games = Column(Integer, default=0, nullable=False)
+
+    __table_args__ = (
+        Index("ix_ratings_rating", "rating"),
+        CheckConstraint("player_id <= partner_id", name="ck_rating_pair_order"),
+    )
+
+
+class RatingGame(Base):
+    """One rated result, in rating order (`id`).
+
+    `match_id` is cleared when the match is archived; the game and its changes stay so
+    ratings can be recomputed over every season.
+    """
+
+    __tablename__ = "rating_games"
+
+    id = Column(Integer, primary_key=True)
+    match_id = Column(Integer, nullable=True, index=True)
+    discipline = Column(String(64), nullable=False)
+    winner_side = Column(SmallInteger, nullable=False)
+
+    __table_args__ = (CheckConstraint("winner_side in (1, 2)", name="ck_rating_game_winner_valid"),)
+
+
+class RatingChange(Base):
+    """Rating history: a player's or pair's rating after each rated game, and the change."""
+
+    __tablename__ = "rating_changes"
+
+    game_id = Column(Integer, ForeignKey("rating_games.id"), primary_key=True)
+    player_id = Column(Integer, ForeignKey("players.id"), primary_key=True)
+    partner_id = Column(Integer, ForeignKey("players.id"), primary_key=True)
+    side = Column(SmallInteger, nullable=False)
+    rating = Column(Float, nullable=False)
+    delta = Column(Float, nullable=False)
+
+    __table_args__ = (
+        Index("ix_rating_changes_history", "player_id", "partner_id", "game_id"),
+        CheckConstraint("side in (1, 2)", name="ck_rating_change_side_valid"),
+    )
+
+
 class FinalMatch(Base):
     __tablename__ = "final_matches"
 
@@ -197,3 +363,37 @@ class FinalGame(Base):
         CheckConstraint("team2_score >= 0", name="ck_final_game_team2_score_nonnegative"),
         CheckConstraint("winner_side in (1, 2) or winner_side is null", name="ck_final_game_winner_side_valid"),
     )
+
+
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+
+    key = Column(String(255), primary_key=True)
+    # sha256 of method, path, query and body: a reused key must describe the same request.
+    request_hash = Column(String(64), nullable=False)
+    # Set in the write's own transaction; a reservation without it never wrote anything.
+    applied = Column(Boolean, default=False, nullable=False)
+    # Both empty while the request that reserved the key is still running.
+    status_code = Column(SmallInteger, nullable=True)
+    response_body = Column(LargeBinary, nullable=True)
+    expires_at = Column(Integer, nullable=False, index=True)
+
+
+class DataVersion(Base):
+    """Single-row counter bumped by every committed data write (see `cache`)."""
+
+    __tablename__ = "data_version"
+
+    id = Column(Integer, primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
+
+
+event.listen(
+    DataVersion.__table__,
+    "after_create",
+    DDL("INSERT INTO data_version (id, version) VALUES (1, 0)"),
+)
+
+
+# Postgres bumps this sequence instead: no row lock shared by concurrent writers.
+data_version_seq = Sequence("data_version_seq", metadata=Base.metadata)
@@ -0,0 +1,296 @@
+"""Opt-in request profiling for admins.
+
+Profiling is off unless `PROFILING_ENABLED` is set. When it is on, a request that
+carries a valid admin token plus `X-Profile: <format>` (or `?profile=<format>`)
+runs under cProfile and its response body is replaced by the profile:
+
+- `prof` (default): binary pstats dump, loadable by snakeviz, flameprof,
+  gprof2dot or `python -m pstats`.
+- `text`: top functions by cumulative time.
+
+While profiling is enabled the middleware runs a profiled request alone: it waits for
+in-flight requests to finish and holds new ones until the profile is taken, so the
+report never mixes in other requests and only one profiler is active at a time.
+Long-lived spectator connections (`/viewer/stream`, `/viewer/version` long-polls) stay
+outside the gate. Requests still running after `PROFILE_DRAIN_SECONDS` (default 5) are
+not waited for: the profile is taken alongside them and says so in `X-Profile-Alone`.
+
+From Python 3.12 cProfile covers every thread, so the middleware's profiler sees the
+whole request: dependencies (`get_db`), the endpoint in the threadpool and response
+serialization. Before 3.12 a profiler only sees its own thread; `ProfiledRoute` then
+adds the endpoint body (crud, ORM, serializers) from its worker thread, but sync
+dependencies and response validation run in other worker threads and are missing from
+the report. Set `PROFILE_DIR` to also keep every profile on disk.
+"""
+
+import asyncio
+import cProfile
+import functools
+import inspect
+import io
+import marshal
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+from collections.abc import Awaitable, Callable
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any
+from urllib.parse import parse_qsl
+
+from fastapi.routing import APIRoute
+
+from .admin import ADMIN_TOKEN_HEADER, is_admin_token
+
+ASGIApp = Callable[[dict[str, Any], Any, Any], Awaitable[None]]
+ASGIReceive = Callable[[], Awaitable[dict[str, Any]]]
+ASGISend = Callable[[dict[str, Any]], Awaitable[None]]
+
+PROFILE_HEADER = "x-profile"
+PROFILE_QUERY_PARAM = "profile"
+PROFILE_FORMATS = {"prof", "text"}
+PROFILE_TEXT_LIMIT = 80
+
+_TRUTHY = {"1", "true", "yes", "on"}
+
+# cProfile uses sys.monitoring from 3.12: one profiler sees all threads, and enabling a
+# second one raises "Another profiling tool is already active".
+_PROFILES_ALL_THREADS = sys.version_info >= (3, 12)
+
+# Connections held open for minutes; a profiled request does not wait for them.
+_UNGATED_PATHS = {"/viewer/stream", "/viewer/version"}
+
+
+def profiling_enabled() -> bool:
+    value = os.getenv("PROFILING_ENABLED", "false").strip().lower()
+    return value in _TRUTHY
+
+
+def get_drain_seconds() -> float:
+    return max(0.0, float(os.getenv("PROFILE_DRAIN_SECONDS", "5")))
+
+
+def get_profile_dir() -> Path | None:
+    value = os.getenv("PROFILE_DIR", "").strip()
+    return Path(value) if value else None
+
+
+class ProfileSession:
+    """Collects the per-thread profilers that took part in one request."""
+
+    def __init__(self) -> None:
+        self._profilers: list[cProfile.Profile] = []
+        self._lock = threading.Lock()
+
+    def new_profiler(self) -> cProfile.Profile:
+        profiler = cProfile.Profile()
+        with self._lock:
+            self._profilers.append(profiler)
+        return profiler
+
+    def stats(self) -> pstats.Stats:
+        with self._lock:
+            profilers = list(self._profilers)
+
+        stats = pstats.Stats(profilers[0])
+        for profiler in profilers[1:]:
+            stats.add(profiler)
+        return stats
+
+
+_active_session: ContextVar[ProfileSession | None] = ContextVar("profile_session", default=None)
+
+
+def _profiled_endpoint(endpoint: Callable[..., Any]) -> Callable[..., Any]:
+    if _PROFILES_ALL_THREADS or inspect.iscoroutinefunction(endpoint):
+        # The middleware's profiler already sees this thread.
+        return endpoint
+
+    @functools.wraps(endpoint)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        session = _active_session.get()
+        if session is None:
+            return endpoint(*args, **kwargs)
+
+        profiler = session.new_profiler()
+        profiler.enable()
+        try:
+            return endpoint(*args, **kwargs)
+        finally:
+            profiler.disable()
+
+    return wrapper
+
+
+class ProfiledRoute(APIRoute):
+    def __init__(self, path: str, endpoint: Callable[..., Any], **kwargs: Any) -> None:
+        super().__init__(path, _profiled_endpoint(endpoint), **kwargs)
+
+
+def _get_header(scope: dict[str, Any], name: str) -> str | None:
+    target = name.lower().encode("latin-1")
+    for key, value in scope.get("headers", []):
+        if key.lower() == target:
+            return value.decode("latin-1")
+    return None
+
+
+def _requested_format(scope: dict[str, Any]) -> str | None:
+    value = _get_header(scope, PROFILE_HEADER)
+    if value is None:
+        query = scope.get("query_string", b"").decode("utf-8", errors="ignore")
+        value = dict(parse_qsl(query, keep_blank_values=True)).get(PROFILE_QUERY_PARAM)
+    if value is None:
+        return None
+
+    value = value.strip().lower()
+    if value in PROFILE_FORMATS:
+        return value
+    if value in _TRUTHY or not value:
+        return "prof"
+    return None
+
+
+def _save_profile(stats: pstats.Stats, scope: dict[str, Any]) -> Path | None:
+    profile_dir = get_profile_dir()
+    if profile_dir is None:
+        return None
+
+    profile_dir.mkdir(parents=True, exist_ok=True)
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", str(scope.get("path", ""))).strip("_") or "root"
+    path = profile_dir / f"{int(time.time() * 1000)}-{scope.get('method', 'GET')}-{slug}.prof"
+    stats.dump_stats(path)
+    return path
+
+
+def _render_profile(stats: pstats.Stats, output_format: str) -> tuple[bytes, str]:
+    if output_format == "text":
+        buffer = io.StringIO()
+        stats.stream = buffer  # type: ignore[attr-defined]
+        stats.sort_stats("cumulative").print_stats(PROFILE_TEXT_LIMIT)
+        return buffer.getvalue().encode("utf-8"), "text/plain; charset=utf-8"
+
+    return marshal.dumps(stats.stats), "application/octet-stream"  # type: ignore[attr-defined]
+
+
+class _RequestGate:
+    """Lets requests run side by side, except a profiled one, which runs alone."""
+
+    def __init__(self) -> None:
+        self._condition = asyncio.Condition()
+        self._active = 0
+        self._profiling = False
+
+    async def enter(self) -> None:
+        async with self._condition:
+            await self._condition.wait_for(lambda: not self._profiling)
+            self._active += 1
+
+    async def leave(self) -> None:
+        async with self._condition:
+            self._active -= 1
+            self._condition.notify_all()
+
+    async def enter_alone(self, drain_seconds: float) -> bool:
+        """Holds new requests; False if in-flight ones outlast `drain_seconds`."""
+        async with self._condition:
+            await self._condition.wait_for(lambda: not self._profiling)
+            self._profiling = True
+            try:
+                await asyncio.wait_for(
+                    self._condition.wait_for(lambda: self._active == 0), drain_seconds
+                )
+            except TimeoutError:
+                return False
+            return True
+
+    async def leave_alone(self) -> None:
+        async with self._condition:
+            self._profiling = False
+            self._condition.notify_all()
+
+
+class ProfilingMiddleware:
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+        self._gates: dict[asyncio.AbstractEventLoop, _RequestGate] = {}
+
+    def _gate(self) -> _RequestGate:
+        # asyncio primitives belong to one loop; test clients start a loop each.
+        loop = asyncio.get_running_loop()
+        gate = self._gates.get(loop)
+        if gate is None:
+            self._gates = {known: g for known, g in self._gates.items() if not known.is_closed()}
+            gate = self._gates[loop] = _RequestGate()
+        return gate
+
+    async def __call__(self, scope: dict[str, Any], receive: ASGIReceive, send: ASGISend) -> None:
+        if scope.get("type") != "http" or not profiling_enabled():
+            await self.app(scope, receive, send)
+            return
+
+        gate = self._gate()
+        output_format = _requested_format(scope)
+        if output_format is None or not is_admin_token(_get_header(scope, ADMIN_TOKEN_HEADER)):
+            if scope.get("path") in _UNGATED_PATHS:
+                await self.app(scope, receive, send)
+                return
+            await gate.enter()
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                await gate.leave()
+            return
+
+        alone = await gate.enter_alone(get_drain_seconds())
+        try:
+            await self._profile(scope, receive, send, output_format, alone)
+        finally:
+            await gate.leave_alone()
+
+    async def _profile(
+        self,
+        scope: dict[str, Any],
+        receive: ASGIReceive,
+        send: ASGISend,
+        output_format: str,
+        alone: bool,
+    ) -> None:
+        session = ProfileSession()
+        response_status = 500
+
+        async def capture(message: dict[str, Any]) -> None:
+            nonlocal response_status
+            if message["type"] == "http.response.start":
+                response_status = int(message["status"])
+
+        token = _active_session.set(session)
+        profiler = session.new_profiler()
+        started = time.perf_counter()
+        profiler.enable()
+        try:
+            await self.app(scope, receive, capture)
+        finally:
+            profiler.disable()
+            _active_session.reset(token)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        stats = session.stats()
+        saved_path = _save_profile(stats, scope)
+        body, media_type = _render_profile(stats, output_format)
+
+        headers = [
+            (b"content-type", media_type.encode("latin-1")),
+            (b"content-length", str(len(body)).encode("latin-1")),
+            (b"x-profiled-status", str(response_status).encode("latin-1")),
+            (b"x-profile-duration-ms", f"{elapsed_ms:.2f}".encode("latin-1")),
+            (b"x-profile-alone", b"true" if alone else b"false"),
+        ]
+        if saved_path is not None:
+            headers.append((b"x-profile-path", str(saved_path).encode("utf-8")))
+
+        await send({"type": "http.response.start", "status": 200, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,442 @@
+"""Monte Carlo projection of the league table and the medals.
+
+Every unplayed league game, tie decider and final game is sampled many times at once
+with NumPy: one row per simulated tournament, one column per game. Game win
+probabilities come from Bradley-Terry odds of the two sides' strengths:
+
+- a player's strength is their smoothed win rate from `player_stats`; a side whose
+  lineup is resolved in `match_players` plays at the mean strength of its players;
+- otherwise a side plays at its team's smoothed games-won rate.
+
+The loser's points are drawn from a binomial that tightens as the sides get closer, so
+the point tie-breakers are meaningful. Each simulated table is ranked with the
+tournament's tie-break rules (`tiebreaks`) as one `lexsort` over all simulations. The
+top two play the final (gold and silver), and third place takes bronze.
+
+`PROJECTION_WORKERS` > 1 splits the simulations over a process pool. With
+`PROJECTION_BACKGROUND` on, `ProjectionService` keeps the default projection
+(`PROJECTION_SIMULATIONS` runs) and recomputes it in a background thread after each
+data change. Readers get the last finished projection meanwhile, so they never wait for
+a fresh run (only the very first one). Ad-hoc runs on the viewer route are capped at
+`MAX_PUBLIC_SIMULATIONS`.
+"""
+
+import logging
+import os
+import threading
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session, selectinload
+
+from . import crud, models, schemas, tiebreaks
+from .cache import data_version
+from .database import env_flag
+
+logger = logging.getLogger(__name__)
+
+FINAL_GAMES = 12
+WINNING_POINTS = 21
+# Beta(2, 2)-style smoothing: a team or player with no games plays at 0.5.
+STRENGTH_PRIOR = 2
+MIN_SIMULATIONS = 100
+MAX_SIMULATIONS = 200_000
+# Runs a spectator can ask for on `/viewer/projection`; larger runs are configured.
+MAX_PUBLIC_SIMULATIONS = 20_000
+
+
+def get_simulations() -> int:
+    value = int(os.getenv("PROJECTION_SIMULATIONS", "20000"))
+    return min(MAX_SIMULATIONS, max(MIN_SIMULATIONS, value))
+
+
+def get_workers() -> int:
+    return max(1, int(os.getenv("PROJECTION_WORKERS", "1")))
+
+
+@dataclass(frozen=True)
+class ProjectionInputs:
+    """Picklable tournament snapshot: current table plus every game still to play."""
+
+    team_ids: np.ndarray
+    names: list[str]
+    team_strength: np.ndarray
+    # Current table per team, as counted by the standings.
+    ties_won: np.ndarray
+    games_won: np.ndarray
+    games_lost: np.ndarray
+    points_for: np.ndarray
+    points_against: np.ndarray
+    # Unplayed league games: tie index, decider flag, side 1 win probability.
+    game_tie: np.ndarray
+    game_decider: np.ndarray
+    game_p1: np.ndarray
+    # Undecided ties: teams (table index) and games already won by each side.
+    tie_team1: np.ndarray
+    tie_team2: np.ndarray
+    tie_wins1: np.ndarray
+    tie_wins2: np.ndarray
+    # The final once it exists: finalists, games and points so far, last game result.
+    final_teams: tuple[int, int] | None
+    final_wins: tuple[int, int]
+    final_points: tuple[int, int]
+    final_games_left: int
+    final_last_winner: int
+    # Tie-break rules of the standings, in order.
+    rules: tuple[str, ...]
+
+
+def _smoothed(wins: int, played: int) -> float:
+    return (wins + STRENGTH_PRIOR) / (played + 2 * STRENGTH_PRIOR)
+
+
+def _win_probability(strength1: np.ndarray, strength2: np.ndarray) -> np.ndarray:
+    odds1 = strength1 / (1 - strength1)
+    odds2 = strength2 / (1 - strength2)
+    return odds1 / (odds1 + odds2)
+
+
+def _tie_decided(tie: models.Tie) -> bool:
+    return tie.status == "completed" and tie.winner_team_id in (tie.team1_id, tie.team2_id)
+
+
+def load_inputs(db: Session) -> ProjectionInputs:
+    teams = crud.get_teams(db)
+    ties = (
+        db.query(models.Tie)
+        .options(selectinload(models.Tie.matches))
+        .order_by(models.Tie.tie_no.asc())
+        .all()
+    )
+    final_match = (
+        db.query(models.FinalMatch).options(selectinload(models.FinalMatch.matches)).first()
+    )
+
+    standings = {row.team_id: row for row in crud.build_standings_from(teams, ties)}
+    index = {team.id: position for position, team in enumerate(teams)}
+    team_strength = np.array(
+        [
+            _smoothed(standings[team.id].games_won, standings[team.id].games_played)
+            for team in teams
+        ]
+    )
+
+    player_strength = {
+        player_id: _smoothed(wins, played)
+        for player_id, wins, played in db.execute(
+            select(models.PlayerStat.player_id, models.PlayerStat.wins, models.PlayerStat.played)
+            .where(models.PlayerStat.discipline == models.PlayerStat.ALL_DISCIPLINES)
+        )
+    }
+    lineups: dict[tuple[int, int], list[int]] = {}
+    for match_id, player_id, side in db.execute(
+        select(models.MatchPlayer.match_id, models.MatchPlayer.player_id, models.MatchPlayer.side)
+    ):
+        lineups.setdefault((match_id, side), []).append(player_id)
+
+    def side_strength(match: models.Match, side: int, team_id: int) -> float:
+        players = lineups.get((match.id, side))
+        if not players:
+            return float(team_strength[index[team_id]])
+        return float(np.mean([player_strength.get(player, 0.5) for player in players]))
+
+    game_tie, game_decider, strengths1, strengths2 = [], [], [], []
+    tie_team1, tie_team2, tie_wins1, tie_wins2 = [], [], [], []
+    for tie in ties:
+        if _tie_decided(tie) or tie.team1_id not in index or tie.team2_id not in index:
+            continue
+        tie_index = len(tie_team1)
+        tie_team1.append(index[tie.team1_id])
+        tie_team2.append(index[tie.team2_id])
+        tie_wins1.append(sum(1 for match in tie.matches if match.winner_side == 1))
+        tie_wins2.append(sum(1 for match in tie.matches if match.winner_side == 2))
+        for match in tie.matches:
+            if match.stage != "tie" or match.winner_side in (1, 2):
+                continue
+            game_tie.append(tie_index)
+            game_decider.append(models.is_decider_match(match))
+            strengths1.append(side_strength(match, 1, tie.team1_id))
+            strengths2.append(side_strength(match, 2, tie.team2_id))
+
+    final_teams = None
+    final_wins = final_points = (0, 0)
+    final_games_left, final_last_winner = FINAL_GAMES, 0
+    if final_match is not None and final_match.team1_id in index and final_match.team2_id in index:
+        games = [game for game in final_match.matches if game.match_no <= FINAL_GAMES]
+        played = [game for game in games if game.winner_side in (1, 2)]
+        final_teams = (index[final_match.team1_id], index[final_match.team2_id])
+        final_wins = (
+            sum(1 for game in played if game.winner_side == 1),
+            sum(1 for game in played if game.winner_side == 2),
+        )
+        final_points = (
+            sum(game.team1_score for game in played),
+            sum(game.team2_score for game in played),
+        )
+        final_games_left = FINAL_GAMES - len(played)
+        last = max(played, key=lambda game: game.match_no, default=None)
+        if last is not None and last.match_no == FINAL_GAMES:
+            final_last_winner = last.winner_side
+
+    rows = [standings[team.id] for team in teams]
+    return ProjectionInputs(
+        team_ids=np.array([team.id for team in teams], dtype=np.int64),
+        names=[team.name for team in teams],
+        team_strength=team_strength,
+        ties_won=np.array([row.ties_won for row in rows], dtype=np.float64),
+        games_won=np.array([row.games_won for row in rows], dtype=np.float64),
+        games_lost=np.array([row.games_lost for row in rows], dtype=np.float64),
+        points_for=np.array([row.points_for for row in rows], dtype=np.float64),
+        points_against=np.array([row.points_against for row in rows], dtype=np.float64),
+        game_tie=np.array(game_tie, dtype=np.int64),
+        game_decider=np.array(game_decider, dtype=bool),
+        game_p1=_win_probability(np.array(strengths1), np.array(strengths2)),
+        tie_team1=np.array(tie_team1, dtype=np.int64),
+        tie_team2=np.array(tie_team2, dtype=np.int64),
+        tie_wins1=np.array(tie_wins1, dtype=np.float64),
+        tie_wins2=np.array(tie_wins2, dtype=np.float64),
+        final_teams=final_teams,
+        final_wins=final_wins,
+        final_points=final_points,
+        final_games_left=final_games_left,
+        final_last_winner=final_last_winner,
+        rules=tiebreaks.get_ruleset().rules,
+    )
+
+
+def _loser_points(rng: np.random.Generator, p1: np.ndarray, shape: tuple[int, int]) -> np.ndarray:
+    closeness = np.minimum(p1, 1 - p1) / np.maximum(p1, 1 - p1)
+    return rng.binomial(WINNING_POINTS - 2, 0.4 + 0.5 * closeness, size=shape)
+
+
+def _one_hot(indices: np.ndarray, size: int) -> np.ndarray:
+    matrix = np.zeros((len(indices), size))
+    matrix[np.arange(len(indices)), indices] = 1.0
+    return matrix
+
+
+def simulate(
+    inputs: ProjectionInputs, simulations: int, seed: np.random.SeedSequence
+) -> np.ndarray:
+    """Counts per team (finalist, bronze, gold, silver, rank sum) over `simulations` runs."""
+    rng = np.random.default_rng(seed)
+    size = len(inputs.team_ids)
+    ties = len(inputs.tie_team1)
+
+    ties_won = np.broadcast_to(inputs.ties_won, (simulations, size)).copy()
+    games_won = np.broadcast_to(inputs.games_won, (simulations, size)).copy()
+    games_lost = np.broadcast_to(inputs.games_lost, (simulations, size)).copy()
+    points_for = np.broadcast_to(inputs.points_for, (simulations, size)).copy()
+    points_against = np.broadcast_to(inputs.points_against, (simulations, size)).copy()
+
+    if len(inputs.game_tie):
+        shape = (simulations, len(inputs.game_tie))
+        side1_won = rng.random(shape) < inputs.game_p1
+        loser_points = _loser_points(rng, inputs.game_p1, shape)
+        points1 = np.where(side1_won, WINNING_POINTS, loser_points)
+        points2 = np.where(side1_won, loser_points, WINNING_POINTS)
+
+        # Regular games all count; a decider only when its tie stands level after them.
+        by_tie = _one_hot(inputs.game_tie, ties)
+        regular = ~inputs.game_decider
+        wins1 = inputs.tie_wins1 + (side1_won & regular) @ by_tie
+        wins2 = inputs.tie_wins2 + (~side1_won & regular) @ by_tie
+        level = wins1 == wins2
+        played = regular | (inputs.game_decider & level[:, inputs.game_tie])
+        wins1 += (side1_won & played & inputs.game_decider) @ by_tie
+        wins2 += (~side1_won & played & inputs.game_decider) @ by_tie
+
+        side1 = _one_hot(inputs.tie_team1[inputs.game_tie], size)
+        side2 = _one_hot(inputs.tie_team2[inputs.game_tie], size)
+        won1, won2 = side1_won & played, ~side1_won & played
+        games_won += won1 @ side1 + won2 @ side2
+        games_lost += won2 @ side1 + won1 @ side2
+        points1, points2 = points1 * played, points2 * played
+        points_for += points1 @ side1 + points2 @ side2
+        points_against += points2 @ side1 + points1 @ side2
+    else:
+        wins1 = np.broadcast_to(inputs.tie_wins1, (simulations, ties))
+        wins2 = np.broadcast_to(inputs.tie_wins2, (simulations, ties))
+
+    if ties:
+        # A tie left level without a decider never completes, as in `crud`.
+        ties_won += (wins1 > wins2) @ _one_hot(inputs.tie_team1, size)
+        ties_won += (wins2 > wins1) @ _one_hot(inputs.tie_team2, size)
+
+    games_played = games_won + games_lost
+    difference = points_for - points_against
+    average_lead = difference / np.maximum(1, games_played)
+    name_order = np.broadcast_to(np.argsort(np.argsort(inputs.names)), (simulations, size))
+    keys = {
+        "ties_won": -ties_won,
+        "tie_points": -2 * ties_won,
+        "games_won": -games_won,
+        "average_lead": -average_lead,
+        "point_difference": -difference,
+        "game_difference": -(games_won - games_lost),
+        "points_for": -points_for,
+    }
+    # `lexsort` sorts on the last key first: the tie-break rules, reversed. Head-to-head
+    # is not simulated; teams level on it fall through to the next rule.
+    ranked_keys = [keys[rule] for rule in inputs.rules if rule in keys]
+    order = np.lexsort((name_order, *reversed(ranked_keys)), axis=-1)
+    ranks = np.empty_like(order)
+    np.put_along_axis(ranks, order, np.arange(1, size + 1), axis=-1)
+
+    counts = np.zeros((size, 5))
+    counts[:, 4] = ranks.sum(axis=0)
+    if size < 2:
+        return counts
+
+    finalist1, finalist2 = order[:, 0], order[:, 1]
+    counts[:, 0] = np.bincount(finalist1, minlength=size) + np.bincount(finalist2, minlength=size)
+    if size > 2:
+        counts[:, 1] = np.bincount(order[:, 2], minlength=size)
+
+    if inputs.final_teams is not None:
+        finalist1 = np.full(simulations, inputs.final_teams[0])
+        finalist2 = np.full(simulations, inputs.final_teams[1])
+    p1 = _win_probability(inputs.team_strength[finalist1], inputs.team_strength[finalist2])
+    shape = (simulations, inputs.final_games_left)
+    side1_won = rng.random(shape) < p1[:, None]
+    loser_points = _loser_points(rng, p1[:, None], shape)
+    wins1 = inputs.final_wins[0] + side1_won.sum(axis=1)
+    wins2 = inputs.final_wins[1] + (~side1_won).sum(axis=1)
+    points1 = inputs.final_points[0] + np.where(side1_won, WINNING_POINTS, loser_points).sum(axis=1)
+    points2 = inputs.final_points[1] + np.where(side1_won, loser_points, WINNING_POINTS).sum(axis=1)
+    # Game 12 is the last column while unplayed.
+    last_side1 = inputs.final_last_winner == 1 if inputs.final_last_winner else side1_won[:, -1]
+    # Games, then points, then the last game: the `crud` final tie-break.
+    final1 = np.where(
+        wins1 != wins2,
+        wins1 > wins2,
+        np.where(points1 != points2, points1 > points2, last_side1),
+    )
+    gold = np.where(final1, finalist1, finalist2)
+    silver = np.where(final1, finalist2, finalist1)
+    counts[:, 2] = np.bincount(gold, minlength=size)
+    counts[:, 3] = np.bincount(silver, minlength=size)
+    return counts
+
+
+def run(
+    inputs: ProjectionInputs,
+    simulations: int,
+    seed: int | None = None,
+    workers: int = 1,
+) -> schemas.Projection:
+    """Run `simulations` tournaments, split over `workers` processes when more than one."""
+    chunks = min(max(1, workers), simulations)
+    sizes = [simulations // chunks + (chunk < simulations % chunks) for chunk in range(chunks)]
+    seeds = np.random.SeedSequence(seed).spawn(chunks)
+    if chunks == 1:
+        counts = simulate(inputs, simulations, seeds[0])
+    else:
+        with ProcessPoolExecutor(max_workers=chunks) as pool:
+            counts = sum(pool.map(simulate, [inputs] * chunks, sizes, seeds))
+
+    rows = [
+        schemas.ProjectionRow(
+            team_id=int(team_id),
+            team=name,
+            expected_rank=round(float(team_counts[4]) / simulations, 3),
+            finalist=round(float(team_counts[0]) / simulations, 4),
+            bronze=round(float(team_counts[1]) / simulations, 4),
+            gold=round(float(team_counts[2]) / simulations, 4),
+            silver=round(float(team_counts[3]) / simulations, 4),
+        )
+        for team_id, name, team_counts in zip(inputs.team_ids, inputs.names, counts, strict=True)
+    ]
+    rows.sort(key=lambda row: (row.expected_rank, row.team))
+    return schemas.Projection(data_version=data_version.value, simulations=simulations, rows=rows)
+
+
+def project(
+    db: Session,
+    simulations: int | None = None,
+    seed: int | None = None,
+    workers: int | None = None,
+) -> schemas.Projection:
+    version = data_version.value
+    projection = run(
+        load_inputs(db),
+        simulations or get_simulations(),
+        seed=seed,
+        workers=workers or get_workers(),
+    )
+    projection.data_version = version
+    return projection
+
+
+class ProjectionService:
+    """The default projection for the current data version, refreshed in the background."""
+
+    def __init__(
+        self, session_factory: Callable[[], Session], simulations: int, workers: int
+    ) -> None:
+        self._session_factory = session_factory
+        self._simulations = simulations
+        self._workers = workers
+        self._latest: schemas.Projection | None = None
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        data_version.on_change(self._wake.set)
+        self._thread = threading.Thread(target=self._run, name="projection", daemon=True)
+        self._thread.start()
+        self._wake.set()
+
+    def latest(self) -> schemas.Projection:
+        """The last finished projection; its `data_version` may trail while the thread reruns."""
+        latest = self._latest
+        if latest is not None:
+            return latest
+        return self._refresh()
+
+    def close(self) -> None:
+        self._stopped.set()
+        self._wake.set()
+        self._thread.join(timeout=5)
+
+    def _refresh(self) -> schemas.Projection:
+        with self._lock:
+            latest = self._latest
+            if latest is not None and latest.data_version == data_version.value:
+                return latest
+            with self._session_factory() as db:
+                latest = project(db, self._simulations, workers=self._workers)
+            self._latest = latest
+            return latest
+
+    def _run(self) -> None:
+        while True:
+            self._wake.wait()
+            if self._stopped.is_set():
+                return
+            self._wake.clear()
+            try:
+                self._refresh()
+            except Exception:
+                logger.exception("Background projection failed.")
+
+
+_service: ProjectionService | None = None
+
+
+def get_projection_service() -> ProjectionService | None:
+    return _service
+
+
+def set_projection_service(service: ProjectionService | None) -> None:
+    global _service
+    _service = service
+
+
+def configure_projection(session_factory: Callable[[], Session]) -> ProjectionService | None:
+    if not env_flag("PROJECTION_BACKGROUND"):
+        return None
+    set_projection_service(ProjectionService(session_factory, get_simulations(), get_workers()))
+    return _service
@@ -0,0 +1,504 @@
+"""Elo ratings for players and doubles pairs.
+
+Every completed match is one rated game. Each side plays at the mean rating of its
+players, and a side's expected score is `1 / (1 + 10 ** ((opponent - own) / 400))`.
+Winning moves each player of the side by `K * (1 - expected)`, and the other side
+by the same amount the other way. In doubles the two pairs also meet as pairs, so
+pairs build their own rating next to their players'.
+
+`rerate` keeps ratings in step as results come in: `crud` calls it when a write
+completes a match, flips its winner or reopens it, and when a completed match's
+players change. A game that is reopened or corrected gives back its own changes and,
+when completed again, is rated as the latest game. Later games keep the changes they
+were rated with; `recompute` replays every game in order for exact values.
+
+`recompute` replays all rated games of archived seasons, then every completed match
+of this season in schedule order (rating those that never were), and rewrites the
+history in that order. It runs as one vectorized pass: games are put into waves in
+which no player or pair plays twice, and each wave is one numpy step, which gives
+the same result as rating the games one by one. Live updates always use `RATING_K`
+and `RATING_INITIAL`, so other `k`/`initial` values are only previewed (`dry_run`).
+"""
+
+import os
+from collections.abc import Iterable
+
+import numpy as np
+from sqlalchemy import ColumnElement, and_, case, delete, func, insert, or_, select
+from sqlalchemy.orm import Session, aliased, joinedload
+
+from . import models, schemas
+
+RATING_SCALE = 400.0
+RATING_INSERT_BATCH_SIZE = 500
+
+# (player_id, partner_id): a player's own rating when both are the same.
+RatingKey = tuple[int, int]
+# (match_id, discipline, winner_side or None, [(player_id, side), ...]).
+RatedMatch = tuple[int, str, int | None, list[tuple[int, int]]]
+# (match_id, None once archived, discipline, winner_side, [(player_id, side), ...]).
+ReplayedGame = tuple[int | None, str, int, list[tuple[int, int]]]
+
+
+def get_k_factor() -> float:
+    return float(os.getenv("RATING_K", "32"))
+
+
+def get_initial_rating() -> float:
+    return float(os.getenv("RATING_INITIAL", "1500"))
+
+
+def expected_score(rating: float | np.ndarray, opponent: float | np.ndarray) -> float | np.ndarray:
+    return 1.0 / (1.0 + 10.0 ** ((opponent - rating) / RATING_SCALE))
+
+
+def _units(
+    participants: Iterable[tuple[int, int]],
+) -> list[tuple[list[RatingKey], list[RatingKey]]]:
+    """Rated pairings of one game: the players, and the pairs when both sides are pairs."""
+    sides: dict[int, list[int]] = {1: [], 2: []}
+    for player_id, side in participants:
+        sides[side].append(player_id)
+    side1, side2 = sorted(sides[1]), sorted(sides[2])
+    if not side1 or not side2:
+        return []
+
+    units = [([(player, player) for player in side1], [(player, player) for player in side2])]
+    if len(side1) == 2 and len(side2) == 2:
+        units.append(([(side1[0], side1[1])], [(side2[0], side2[1])]))
+    return units
+
+
+def _rate_match(
+    db: Session,
+    match_id: int,
+    discipline: str,
+    winner_side: int,
+    participants: list[tuple[int, int]],
+) -> None:
+    units = _units(participants)
+    if not units:
+        return
+
+    game = models.RatingGame(match_id=match_id, discipline=discipline, winner_side=winner_side)
+    db.add(game)
+    player_ids = {player for player, _ in participants}
+    current = {
+        (rating.player_id, rating.partner_id): rating
+        for rating in db.scalars(
+            select(models.Rating).where(models.Rating.player_id.in_(player_ids))
+        )
+    }
+    for side1, side2 in units:
+        for key in side1 + side2:
+            if key not in current:
+                current[key] = models.Rating(
+                    player_id=key[0], partner_id=key[1], rating=get_initial_rating(), games=0
+                )
+                db.add(current[key])
+    db.flush()
+
+    k_factor = get_k_factor()
+    outcome = 1.0 if winner_side == 1 else 0.0
+    deltas = []
+    for side1, side2 in units:
+        rating1 = sum(current[key].rating for key in side1) / len(side1)
+        rating2 = sum(current[key].rating for key in side2) / len(side2)
+        delta = k_factor * (outcome - expected_score(rating1, rating2))
+        deltas += [(key, 1, delta) for key in side1] + [(key, 2, -delta) for key in side2]
+
+    rows = []
+    for key, side, delta in deltas:
+        rating = current[key]
+        rating.rating += delta
+        rating.games += 1
+        rows.append(
+            {
+                "game_id": game.id,
+                "player_id": key[0],
+                "partner_id": key[1],
+                "side": side,
+                "rating": rating.rating,
+                "delta": delta,
+            }
+        )
+    db.execute(insert(models.RatingChange), rows)
+
+
+def _unrate_match(db: Session, match_id: int) -> None:
+    game = db.scalars(
+        select(models.RatingGame)
+        .where(models.RatingGame.match_id == match_id)
+        .order_by(models.RatingGame.id.desc())
+        .limit(1)
+    ).first()
+    if game is None:
+        return
+
+    changes = db.execute(
+        select(
+            models.RatingChange.player_id, models.RatingChange.partner_id, models.RatingChange.delta
+        ).where(models.RatingChange.game_id == game.id)
+    ).all()
+    for player_id, partner_id, delta in changes:
+        rating = db.get(models.Rating, (player_id, partner_id))
+        if rating is not None:
+            rating.rating -= delta
+            rating.games -= 1
+    db.execute(delete(models.RatingChange).where(models.RatingChange.game_id == game.id))
+    db.delete(game)
+    db.flush()
+
+
+def rerate(db: Session, matches: list[RatedMatch]) -> None:
+    """Re-rate matches whose result or players changed; a None winner only unrates."""
+    for match_id, discipline, winner_side, participants in matches:
+        _unrate_match(db, match_id)
+        if winner_side in (1, 2):
+            _rate_match(db, match_id, discipline, winner_side, participants)
+
+
+def replay(
+    side1: np.ndarray,
+    side2: np.ndarray,
+    outcome: np.ndarray,
+    entities: int,
+    k_factor: float,
+    initial: float,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Rate `len(outcome)` pairings in order, one vectorized step per wave.
+
+    `side1`/`side2` hold entity indexes per pairing, padded with `entities`; `outcome`
+    is 1 when side 1 won. Returns final ratings and games per entity, ratings of each
+    side after each pairing, and side 1's change per pairing.
+    """
+    pad = entities
+    count = len(outcome)
+    wave = np.zeros(count, dtype=np.int64)
+    last = [0] * (entities + 1)
+    for index, row in enumerate(np.concatenate([side1, side2], axis=1).tolist()):
+        members = [member for member in row if member != pad]
+        step = max(last[member] for member in members) + 1
+        for member in members:
+            last[member] = step
+        wave[index] = step
+
+    ratings = np.full(entities + 1, initial, dtype=np.float64)
+    ratings[pad] = 0.0
+    size1 = np.count_nonzero(side1 != pad, axis=1)
+    size2 = np.count_nonzero(side2 != pad, axis=1)
+    after1 = np.zeros(side1.shape, dtype=np.float64)
+    after2 = np.zeros(side2.shape, dtype=np.float64)
+    deltas = np.zeros(count, dtype=np.float64)
+
+    order = np.argsort(wave, kind="stable")
+    bounds = np.flatnonzero(np.diff(wave[order])) + 1
+    for rows in np.split(order, bounds):
+        players1, players2 = side1[rows], side2[rows]
+        rating1 = ratings[players1].sum(axis=1) / size1[rows]
+        rating2 = ratings[players2].sum(axis=1) / size2[rows]
+        delta = k_factor * (outcome[rows] - expected_score(rating1, rating2))
+        # Entities are unique within a wave, so only the padding slot repeats.
+        ratings[players1] += delta[:, None]
+        ratings[players2] -= delta[:, None]
+        ratings[pad] = 0.0
+        after1[rows] = ratings[players1]
+        after2[rows] = ratings[players2]
+        deltas[rows] = delta
+
+    played = np.concatenate([side1[side1 != pad], side2[side2 != pad]])
+    return ratings[:entities], np.bincount(played, minlength=entities), after1, after2, deltas
+
+
+def _replay_games(db: Session) -> list[ReplayedGame]:
+    """Every game to rate, in replay order.
+
+    Games whose match was archived come first, in the order they were rated. This
+    season's completed matches follow in schedule order, so a match that was completed
+    late or never rated takes its place in the schedule, not after newer games.
+    """
+    participants: dict[int, list[tuple[int, int]]] = {}
+    for game_id, player_id, side in db.execute(
+        select(
+            models.RatingChange.game_id, models.RatingChange.player_id, models.RatingChange.side
+        ).where(models.RatingChange.player_id == models.RatingChange.partner_id)
+    ):
+        participants.setdefault(game_id, []).append((player_id, side))
+    archived = db.execute(
+        select(models.RatingGame.id, models.RatingGame.discipline, models.RatingGame.winner_side)
+        .where(
+            or_(
+                models.RatingGame.match_id.is_(None),
+                models.RatingGame.match_id.not_in(select(models.Match.id)),
+            )
+        )
+        .order_by(models.RatingGame.id)
+    ).all()
+    games: list[ReplayedGame] = [
+        (None, discipline, winner_side, participants.get(game_id, []))
+        for game_id, discipline, winner_side in archived
+    ]
+
+    matches = db.execute(
+        select(models.Match.id, models.Match.discipline, models.Match.winner_side)
+        .where(models.Match.winner_side.in_((1, 2)))
+        .order_by(models.Match.day.asc(), models.Match.time.asc(), models.Match.id.asc())
+    ).all()
+    players: dict[int, list[tuple[int, int]]] = {}
+    for match_id, player_id, side in db.execute(
+        select(
+            models.MatchPlayer.match_id, models.MatchPlayer.player_id, models.MatchPlayer.side
+        ).where(models.MatchPlayer.match_id.in_([match_id for match_id, _, _ in matches]))
+    ):
+        players.setdefault(match_id, []).append((player_id, side))
+    games += [
+        (match_id, discipline, winner_side, players.get(match_id, []))
+        for match_id, discipline, winner_side in matches
+    ]
+    return [game for game in games if _units(game[3])]
+
+
+def recompute(
+    db: Session,
+    k_factor: float | None = None,
+    initial: float | None = None,
+    dry_run: bool = False,
+) -> schemas.RatingRecomputeResult:
+    """Rebuild every rating and the whole history by replaying all rated games in order.
+
+    Live updates always use `RATING_K` and `RATING_INITIAL`, so other values are only
+    accepted for a `dry_run`, which returns the ratings and writes nothing.
+    """
+    configured = (get_k_factor(), get_initial_rating())
+    k_factor = configured[0] if k_factor is None else k_factor
+    initial = configured[1] if initial is None else initial
+    if not dry_run and (k_factor, initial) != configured:
+        raise ValueError(
+            "Ratings are kept with RATING_K and RATING_INITIAL; preview other values with dry_run."
+        )
+
+    games = _replay_games(db)
+    keys: dict[RatingKey, int] = {}
+    unit_games: list[int] = []
+    sides1: list[list[int]] = []
+    sides2: list[list[int]] = []
+    outcomes: list[float] = []
+    for index, (_, _, winner_side, participants) in enumerate(games):
+        for side1, side2 in _units(participants):
+            unit_games.append(index)
+            sides1.append([keys.setdefault(key, len(keys)) for key in side1])
+            sides2.append([keys.setdefault(key, len(keys)) for key in side2])
+            outcomes.append(1.0 if winner_side == 1 else 0.0)
+
+    pad = len(keys)
+    width = max((len(side) for side in sides1 + sides2), default=1)
+    side1 = np.array(
+        [side + [pad] * (width - len(side)) for side in sides1], dtype=np.int64
+    ).reshape(-1, width)
+    side2 = np.array(
+        [side + [pad] * (width - len(side)) for side in sides2], dtype=np.int64
+    ).reshape(-1, width)
+    ratings, played, after1, after2, deltas = replay(
+        side1, side2, np.array(outcomes, dtype=np.float64), pad, k_factor, initial
+    )
+
+    entity_keys = list(keys)
+    rows = [
+        {
+            "player_id": key[0],
+            "partner_id": key[1],
+            "rating": float(rating),
+            "games": int(games_played),
+        }
+        for key, rating, games_played in zip(
+            entity_keys, ratings.tolist(), played.tolist(), strict=True
+        )
+    ]
+    result = schemas.RatingRecomputeResult(
+        games=len(games),
+        players=sum(1 for player_id, partner_id in entity_keys if player_id == partner_id),
+        pairs=sum(1 for player_id, partner_id in entity_keys if player_id != partner_id),
+        k_factor=k_factor,
+        initial_rating=initial,
+        dry_run=dry_run,
+    )
+    if dry_run:
+        result.ratings = [schemas.RatingValue(**row) for row in rows]
+        return result
+
+    # The history is rewritten in replay order, so game ids follow it again.
+    db.execute(delete(models.RatingChange))
+    db.execute(delete(models.RatingGame))
+    db.execute(delete(models.Rating))
+    game_ids: list[int] = []
+    for start in range(0, len(games), RATING_INSERT_BATCH_SIZE):
+        game_ids += db.scalars(
+            insert(models.RatingGame).returning(
+                models.RatingGame.id, sort_by_parameter_order=True
+            ),
+            [
+                {"match_id": match_id, "discipline": discipline, "winner_side": winner_side}
+                for match_id, discipline, winner_side, _ in games[
+                    start : start + RATING_INSERT_BATCH_SIZE
+                ]
+            ],
+        ).all()
+
+    changes = []
+    for side, members, after, sign in ((1, side1, after1, 1.0), (2, side2, after2, -1.0)):
+        units, slots = np.nonzero(members != pad)
+        for unit, entity, rating in zip(
+            units.tolist(),
+            members[units, slots].tolist(),
+            after[units, slots].tolist(),
+            strict=True,
+        ):
+            player_id, partner_id = entity_keys[entity]
+            changes.append(
+                {
+                    "game_id": game_ids[unit_games[unit]],
+                    "player_id": player_id,
+                    "partner_id": partner_id,
+                    "side": side,
+                    "rating": rating,
+                    "delta": sign * float(deltas[unit]),
+                }
+            )
+    for table, values in ((models.Rating, rows), (models.RatingChange, changes)):
+        for start in range(0, len(values), RATING_INSERT_BATCH_SIZE):
+            db.execute(insert(table), values[start : start + RATING_INSERT_BATCH_SIZE])
+    db.commit()
+    return result
+
+
+def _own_rating() -> ColumnElement[bool]:
+    return and_(
+        models.Rating.player_id == models.Player.id,
+        models.Rating.partner_id == models.Player.id,
+    )
+
+
+def get_player_rating(db: Session, player_id: int) -> schemas.PlayerRatingRead:
+    player = (
+        db.query(models.Player)
+        .options(joinedload(models.Player.team))
+        .filter_by(id=player_id)
+        .first()
+    )
+    if player is None:
+        raise LookupError("Player not found.")
+
+    own = db.get(models.Rating, (player_id, player_id))
+    history = db.execute(
+        select(
+            models.RatingChange.game_id,
+            models.RatingGame.match_id,
+            models.RatingGame.discipline,
+            models.RatingChange.rating,
+            models.RatingChange.delta,
+        )
+        .join(models.RatingGame, models.RatingGame.id == models.RatingChange.game_id)
+        .where(
+            models.RatingChange.player_id == player_id, models.RatingChange.partner_id == player_id
+        )
+        .order_by(models.RatingChange.game_id.asc())
+    ).all()
+
+    partner = aliased(models.Player)
+    pairs = db.execute(
+        select(partner.id, partner.name, models.Rating.rating, models.Rating.games)
+        .join(
+            partner,
+            partner.id
+            == case(
+                (models.Rating.player_id == player_id, models.Rating.partner_id),
+                else_=models.Rating.player_id,
+            ),
+        )
+        .where(
+            or_(models.Rating.player_id == player_id, models.Rating.partner_id == player_id),
+            models.Rating.player_id != models.Rating.partner_id,
+            models.Rating.games > 0,
+        )
+        .order_by(models.Rating.rating.desc(), partner.id.asc())
+    ).all()
+
+    return schemas.PlayerRatingRead(
+        player_id=player.id,
+        player=player.name,
+        team=player.team.name,
+        set_level=player.set_level,
+        rating=own.rating if own is not None else get_initial_rating(),
+        games=own.games if own is not None else 0,
+        history=[
+            schemas.RatingPoint(
+                game_id=game_id,
+                match_id=match_id,
+                discipline=discipline,
+                rating=rating,
+                delta=delta,
+            )
+            for game_id, match_id, discipline, rating, delta in history
+        ],
+        partners=[
+            schemas.PartnerRating(partner_id=partner_id, partner=name, rating=rating, games=games)
+            for partner_id, name, rating, games in pairs
+        ],
+    )
+
+
+def rating_leaderboard(
+    db: Session, set_level: str | None = None, limit: int = 20
+) -> list[schemas.RatingRow]:
+    query = (
+        db.query(models.Rating, models.Player)
+        .join(models.Player, _own_rating())
+        .options(joinedload(models.Player.team))
+        .filter(models.Rating.games > 0)
+    )
+    if set_level is not None:
+        query = query.filter(models.Player.set_level == set_level)
+    rows = query.order_by(models.Rating.rating.desc(), models.Player.id.asc()).limit(limit).all()
+
+    return [
+        schemas.RatingRow(
+            rank=rank,
+            player_id=player.id,
+            player=player.name,
+            team=player.team.name,
+            set_level=player.set_level,
+            rating=rating.rating,
+            games=rating.games,
+        )
+        for rank, (rating, player) in enumerate(rows, start=1)
+    ]
+
+
+def set_level_ratings(db: Session) -> list[schemas.SetLevelRating]:
+    """Rating spread per set level; unrated players count at the initial rating."""
+    rating = func.coalesce(models.Rating.rating, get_initial_rating())
+    rows = db.execute(
+        select(
+            models.Player.set_level,
+            func.count(models.Player.id),
+            func.sum(case((models.Rating.games > 0, 1), else_=0)),
+            func.avg(rating),
+            func.min(rating),
+            func.max(rating),
+        )
+        .outerjoin(models.Rating, _own_rating())
+        .group_by(models.Player.set_level)
+        .order_by(models.Player.set_level.asc())
+    ).all()
+
+    return [
+        schemas.SetLevelRating(
+            set_level=set_level,
+            players=players,
+            rated_players=rated or 0,
+            mean_rating=float(mean),
+            min_rating=float(low),
+            max_rating=float(high),
+        )
+        for set_level, players, rated, mean, low, high in rows
+    ]
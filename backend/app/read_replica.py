@@ -0,0 +1,136 @@
+"""Read-replica routing with read-your-writes pinning.
+
+When `DATABASE_READ_URL` is set, spectator GET routes read through `get_read_db`
+from the replica while every write stays on the primary. A client that just wrote
+(a referee) must not see an older replica state, so `ReadYourWritesMiddleware`
+answers each successful write with a pin cookie:
+
+- Postgres primary: `lsn:<wal lsn>` of the primary after the write. The client is
+  served by the primary until the replica has replayed past that position.
+- other databases: `t:<epoch ms>`, pinning the client to the primary for
+  `READ_YOUR_WRITES_SECONDS`.
+
+Either cookie expires after `READ_YOUR_WRITES_SECONDS`, which bounds how long a
+lagging replica can keep a referee on the primary. The same value is returned in the
+`X-Primary-Pin` header for clients on another site that cannot rely on cookies; they
+send it back in that header on their reads.
+"""
+
+import os
+import threading
+import time
+from collections.abc import Awaitable, Callable, Generator
+from typing import Any
+
+import anyio.to_thread
+from fastapi import Depends, Request
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from . import database
+from .database import get_db
+
+ASGIApp = Callable[[dict[str, Any], Any, Any], Awaitable[None]]
+
+PRIMARY_PIN_COOKIE = "b7g_primary_pin"
+PRIMARY_PIN_HEADER = "X-Primary-Pin"
+REPLICA_LSN_TTL_SECONDS = 0.2
+
+_SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+def get_pin_seconds() -> int:
+    return max(1, int(os.getenv("READ_YOUR_WRITES_SECONDS", "10")))
+
+
+def parse_lsn(value: str) -> int:
+    high, low = value.split("/", maxsplit=1)
+    return (int(high, 16) << 32) + int(low, 16)
+
+
+_replica_lsn: tuple[float, int] | None = None
+_replica_lsn_guard = threading.Lock()
+
+
+def replica_replay_lsn() -> int:
+    """Replay position of the replica, cached briefly so pinned readers share one query."""
+    global _replica_lsn
+    with _replica_lsn_guard:
+        now = time.monotonic()
+        if _replica_lsn is not None and now - _replica_lsn[0] < REPLICA_LSN_TTL_SECONDS:
+            return _replica_lsn[1]
+
+        with database.read_engine.connect() as connection:  # type: ignore[union-attr]
+            value = connection.execute(text("SELECT pg_last_wal_replay_lsn()")).scalar()
+        lsn = parse_lsn(value) if value else 0
+        _replica_lsn = (now, lsn)
+        return lsn
+
+
+def primary_pinned(pin: str | None) -> bool:
+    if not pin:
+        return False
+
+    kind, _, value = pin.partition(":")
+    try:
+        if kind == "t":
+            return time.time() * 1000 < int(value)
+        if kind == "lsn":
+            return replica_replay_lsn() < parse_lsn(value)
+    except Exception:
+        # Unreadable pin or unreachable replica: the primary is always correct.
+        return True
+    return False
+
+
+def primary_pin_value() -> str:
+    if database.engine.dialect.name == "postgresql":
+        with database.engine.connect() as connection:
+            return f"lsn:{connection.execute(text('SELECT pg_current_wal_lsn()')).scalar()}"
+    return f"t:{int((time.time() + get_pin_seconds()) * 1000)}"
+
+
+def get_read_db(request: Request, db: Session = Depends(get_db)) -> Generator[Session, None, None]:
+    """Replica session for spectator reads; the primary session when pinned or unconfigured."""
+    read_session_factory = database.ReadSessionLocal
+    pin = request.headers.get(PRIMARY_PIN_HEADER) or request.cookies.get(PRIMARY_PIN_COOKIE)
+    if read_session_factory is None or primary_pinned(pin):
+        yield db
+        return
+
+    read_db = read_session_factory()
+    try:
+        yield read_db
+    finally:
+        read_db.close()
+
+
+class ReadYourWritesMiddleware:
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: dict[str, Any], receive: Any, send: Any) -> None:
+        if (
+            scope.get("type") != "http"
+            or database.ReadSessionLocal is None
+            or scope.get("method", "GET") in _SAFE_METHODS
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        async def pin_after_write(message: dict[str, Any]) -> None:
+            if message["type"] == "http.response.start" and 200 <= int(message["status"]) < 400:
+                value = await anyio.to_thread.run_sync(primary_pin_value)
+                cookie = (
+        f"{PRIMARY_PIN_COOKIE}={value}; Max-Age={get_pin_seconds()}; "
+        "Path=/; HttpOnly; SameSite=Lax"
+    )
+                headers = [
+                    *message.get("headers", []),
+                    (b"set-cookie", cookie.encode("latin-1")),
+                    (PRIMARY_PIN_HEADER.lower().encode("latin-1"), value.encode("latin-1")),
+                ]
+                message = {**message, "headers": headers}
+            await send(message)
+
+        await self.app(scope, receive, pin_after_write)
@@ -0,0 +1,89 @@
+import json
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy.orm import Session
+
+from .. import crud, importer, ratings, schemas, state_engine
+from ..admin import require_admin
+from ..database import get_db
+from ..profiling import ProfiledRoute
+from ..state_engine import get_write_db
+
+router = APIRouter(tags=["admin"], route_class=ProfiledRoute, dependencies=[Depends(require_admin)])
+
+
+@router.post("/ties/recount", response_model=schemas.TieRecountResult)
+def recount_all_ties(db: Session = Depends(get_write_db)) -> schemas.TieRecountResult:
+    checked, repaired = crud.recount_ties(db)
+    return schemas.TieRecountResult(ties_checked=checked, repaired_tie_ids=repaired)
+
+
+@router.post("/ties/{tie_id}/recount", response_model=schemas.TieRecountResult)
+def recount_tie(tie_id: int, db: Session = Depends(get_write_db)) -> schemas.TieRecountResult:
+    try:
+        checked, repaired = crud.recount_ties(db, tie_id=tie_id)
+    except LookupError as exc:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
+
+    return schemas.TieRecountResult(ties_checked=checked, repaired_tie_ids=repaired)
+
+
+@router.post("/match-players/rebuild", response_model=schemas.MatchPlayersRebuildResult)
+def rebuild_match_players(db: Session = Depends(get_write_db)) -> schemas.MatchPlayersRebuildResult:
+    return schemas.MatchPlayersRebuildResult(rows=crud.rebuild_match_players(db))
+
+
+@router.post("/ratings/recompute", response_model=schemas.RatingRecomputeResult)
+def recompute_ratings(
+    k: float | None = Query(default=None, gt=0, le=200),
+    initial: float | None = Query(default=None, ge=0, le=5000),
+    dry_run: bool = Query(default=False),
+    db: Session = Depends(get_write_db),
+) -> schemas.RatingRecomputeResult:
+    try:
+        return ratings.recompute(db, k_factor=k, initial=initial, dry_run=dry_run)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+
+
+@router.post("/state/reload", status_code=status.HTTP_204_NO_CONTENT)
+def reload_state() -> None:
+    state = state_engine.get_state()
+    if state is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="In-memory state engine is not enabled."
+        )
+    state.reload()
+
+
+async def _import_rows(request: Request) -> importer.RawRows:
+    body = await request.body()
+    try:
+        if "csv" in request.headers.get("content-type", ""):
+            return importer.rows_from_csv(body.decode("utf-8-sig"))
+        return importer.rows_from_json(json.loads(body or b"{}"))
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+
+
+@router.post("/import", response_model=schemas.ImportResult)
+def import_roster(
+    response: Response,
+    rows: importer.RawRows = Depends(_import_rows),
+    db: Session = Depends(get_db),
+) -> schemas.ImportResult:
+    """Import teams, players, ties and match templates (JSON or CSV) in one transaction."""
+    try:
+        result = importer.import_roster(db, rows)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(exc)) from exc
+
+    if not result.imported:
+        response.status_code = status.HTTP_400_BAD_REQUEST
+        return result
+
+    # Bulk inserts bypass the in-memory state's session.
+    state = state_engine.get_state()
+    if state is not None:
+        state.reload()
+    return result
@@ -0,0 +1,30 @@
+from typing import Any, Literal
+
+from fastapi import APIRouter, HTTPException, Query, status
+
+from .. import archive, schemas
+from ..profiling import ProfiledRoute
+
+router = APIRouter(tags=["archives"], route_class=ProfiledRoute)
+
+
+@router.get("/", response_model=list[schemas.ArchiveRead])
+def list_archives() -> list[dict[str, Any]]:
+    return archive.list_archives()
+
+
+@router.get("/{name}/{table}")
+def read_archive_table(
+    name: str,
+    table: Literal["standings", "ties", "matches", "final_games"],
+    columns: str | None = Query(default=None, description="Comma-separated column names."),
+) -> list[dict[str, Any]]:
+    wanted = (
+        [column.strip() for column in columns.split(",") if column.strip()] if columns else None
+    )
+    try:
+        return archive.read_archive_table(name, table, columns=wanted)
+    except LookupError as exc:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
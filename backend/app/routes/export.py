@@ -0,0 +1,22 @@
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+
+from .. import exporter
+from ..profiling import ProfiledRoute
+from ..read_replica import get_read_db
+
+router = APIRouter(tags=["export"], route_class=ProfiledRoute)
+
+
+@router.get("/{dataset}")
+def export_dataset(
+    dataset: exporter.ExportDataset,
+    export_format: exporter.ExportFormat = Query(default="ndjson", alias="format"),
+    db: Session = Depends(get_read_db),
+) -> StreamingResponse:
+    return StreamingResponse(
+        exporter.stream_export(db, dataset, export_format),
+        media_type=exporter.MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{dataset}.{export_format}"'},
+    )
@@ -1,14 +1,22 @@
 from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import Response
 from sqlalchemy.orm import Session
 
-from .. import crud, schemas, serializers
+from .. import crud, schemas, serializers, state_engine
 from ..database import get_db
+from ..idempotency import IdempotentRequest, idempotent_request
+from ..profiling import ProfiledRoute
+from ..state_engine import get_write_db
 
-router = APIRouter(tags=["finals"])
+router = APIRouter(tags=["finals"], route_class=ProfiledRoute)
 
 
 @router.get("/", response_model=schemas.FinalMatchRead | None)
 def get_final_match(db: Session = Depends(get_db)) -> schemas.FinalMatchRead | None:
+    state = state_engine.get_state()
+    if state is not None:
+        return state.final_match()
+
     final_match = crud.get_or_sync_final_match(db)
     if final_match is None:
         return None
@@ -19,8 +27,13 @@ def get_final_match(db: Session = Depends(get_db)) -> schemas.FinalMatchRead | N
 def assign_final_game_referee(
     game_id: int,
     name: str = Query(min_length=1, max_length=100),
-    db: Session = Depends(get_db),
-) -> schemas.FinalMatchRead:
+    db: Session = Depends(get_write_db),
+    idempotency: IdempotentRequest = Depends(idempotent_request),
+) -> schemas.FinalMatchRead | Response:
+    replay = idempotency.replay()
+    if replay is not None:
+        return replay
+
     try:
         final_match = crud.assign_final_game_referee(db, game_id=game_id, name=name)
     except LookupError as exc:
@@ -28,15 +41,20 @@ def assign_final_game_referee(
     except ValueError as exc:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
 
-    return serializers.final_match_to_read(final_match)
+    return idempotency.store(serializers.final_match_to_read(final_match))
 
 
 @router.post("/games/{game_id}/score", response_model=schemas.FinalMatchRead)
 def update_final_game_score(
     game_id: int,
     payload: schemas.ScoreUpdate,
-    db: Session = Depends(get_db),
-) -> schemas.FinalMatchRead:
+    db: Session = Depends(get_write_db),
+    idempotency: IdempotentRequest = Depends(idempotent_request),
+) -> schemas.FinalMatchRead | Response:
+    replay = idempotency.replay()
+    if replay is not None:
+        return replay
+
     try:
         final_match = crud.update_final_game_score(db, game_id=game_id, score1=payload.score1, score2=payload.score2)
     except LookupError as exc:
@@ -44,4 +62,4 @@ def update_final_game_score(
     except ValueError as exc:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
 
-    return serializers.final_match_to_read(final_match)
+    return idempotency.store(serializers.final_match_to_read(final_match))
@@ -10,8 +10,9 @@ from sqlalchemy.orm import Session
 
 from .. import crud, schemas, serializers
 from ..database import get_db
+from ..profiling import ProfiledRoute
 
-router = APIRouter(tags=["matches"])
+router = APIRouter(tags=["matches"], route_class=ProfiledRoute)
 
 
 @router.get("/", response_model=list[schemas.MatchRead])
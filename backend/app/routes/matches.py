@@ -1,12 +1,18 @@
 from typing import Literal
 
 from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import Response
 from sqlalchemy.orm import Session
 
-from .. import crud, schemas, serializers
+from .. import crud, schemas, score_buffer, serializers, state_engine
+from ..cache import cached
 from ..database import get_db
+from ..idempotency import IdempotentRequest, idempotent_request
+from ..profiling import ProfiledRoute
+from ..read_replica import get_read_db
+from ..state_engine import get_write_db
 
-router = APIRouter(tags=["matches"])
+router = APIRouter(tags=["matches"], route_class=ProfiledRoute)
 
 
 @router.get("/", response_model=list[schemas.MatchRead])
@@ -14,77 +20,146 @@ def list_matches(
     stage: Literal["tie"] | None = Query(default=None),
     status_filter: Literal["pending", "live", "completed"] | None = Query(default=None, alias="status"),
     tie_id: int | None = Query(default=None, ge=1),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ) -> list[schemas.MatchRead]:
-    matches = crud.list_matches(db, stage=stage, status=status_filter, tie_id=tie_id)
-    return [serializers.match_to_read(match) for match in matches]
+    key = ("matches", stage, status_filter, tie_id)
+    state = state_engine.get_state()
+    if state is not None:
+        return cached(db, key, lambda: state.matches(status=status_filter, tie_id=tie_id))
+
+    def build() -> list[schemas.MatchRead]:
+        matches = crud.list_matches(db, stage=stage, status=status_filter, tie_id=tie_id)
+        return [serializers.match_to_read(match) for match in matches]
+
+    return cached(db, key, build)
+
+
+@router.post("/batch", response_model=schemas.MatchBatchResult)
+def apply_match_batch(
+    payload: schemas.MatchBatch,
+    db: Session = Depends(get_write_db),
+) -> schemas.MatchBatchResult:
+    with score_buffer.writing_matches({operation.match_id for operation in payload.operations}):
+        return crud.apply_match_batch(db, payload.operations)
+
+
+@router.post("/rallies", response_model=schemas.RallyBatchResult)
+def record_rallies(
+    payload: schemas.RallyBatch,
+    db: Session = Depends(get_write_db),
+) -> schemas.RallyBatchResult:
+    rallies = [(rally.match_id, rally.seq, rally.side) for rally in payload.rallies]
+    try:
+        with score_buffer.writing_matches({match_id for match_id, _, _ in rallies}):
+            return crud.record_rallies(db, rallies)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(exc)) from exc
+
+
+@router.get("/{match_id}/rallies", response_model=list[schemas.RallyRead])
+def list_rallies(match_id: int, db: Session = Depends(get_db)) -> list[schemas.RallyRead]:
+    try:
+        rallies = crud.list_rallies(db, match_id=match_id)
+    except LookupError as exc:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
+
+    return [schemas.RallyRead.model_validate(rally) for rally in rallies]
 
 
 @router.patch("/{match_id}/score", response_model=schemas.MatchRead)
 def update_score_patch(
     match_id: int,
     payload: schemas.ScoreUpdate,
-    db: Session = Depends(get_db),
-) -> schemas.MatchRead:
+    response: Response,
+    db: Session = Depends(get_write_db),
+    idempotency: IdempotentRequest = Depends(idempotent_request),
+) -> schemas.MatchRead | Response:
+    replay = idempotency.replay()
+    if replay is not None:
+        return replay
+
+    buffer = score_buffer.get_score_buffer()
     try:
-        match = crud.update_score(db, match_id, payload.score1, payload.score2)
+        if buffer is not None:
+            match_read, seq = buffer.submit(db, match_id, payload.score1, payload.score2)
+            if seq is not None:
+                response.headers[score_buffer.SCORE_SEQ_HEADER] = str(seq)
+        else:
+            match_read = serializers.match_to_read(
+                crud.update_score(db, match_id, payload.score1, payload.score2)
+            )
     except LookupError as exc:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
     except ValueError as exc:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
 
-    return serializers.match_to_read(match)
+    return idempotency.store(match_read)
 
 
 @router.post("/score/{match_id}", response_model=schemas.MatchRead)
 def update_score_legacy(
     match_id: int,
     payload: schemas.ScoreUpdate,
-    db: Session = Depends(get_db),
-) -> schemas.MatchRead:
-    return update_score_patch(match_id=match_id, payload=payload, db=db)
+    response: Response,
+    db: Session = Depends(get_write_db),
+    idempotency: IdempotentRequest = Depends(idempotent_request),
+) -> schemas.MatchRead | Response:
+    return update_score_patch(
+        match_id=match_id, payload=payload, response=response, db=db, idempotency=idempotency
+    )
 
 
 @router.post("/{match_id}", response_model=schemas.MatchRead)
 def update_score_query(
     match_id: int,
+    response: Response,
     s1: int = Query(ge=0, le=30),
     s2: int = Query(ge=0, le=30),
-    db: Session = Depends(get_db),
-) -> schemas.MatchRead:
+    db: Session = Depends(get_write_db),
+    idempotency: IdempotentRequest = Depends(idempotent_request),
+) -> schemas.MatchRead | Response:
     payload = schemas.ScoreUpdate(score1=s1, score2=s2)
-    return update_score_patch(match_id=match_id, payload=payload, db=db)
+    return update_score_patch(
+        match_id=match_id, payload=payload, response=response, db=db, idempotency=idempotency
+    )
 
 
 @router.patch("/{match_id}/lineup", response_model=schemas.MatchRead)
 def update_lineup_patch(
     match_id: int,
     payload: schemas.LineupUpdate,
-    db: Session = Depends(get_db),
-) -> schemas.MatchRead:
+    db: Session = Depends(get_write_db),
+    idempotency: IdempotentRequest = Depends(idempotent_request),
+) -> schemas.MatchRead | Response:
+    replay = idempotency.replay()
+    if replay is not None:
+        return replay
+
     try:
-        match = crud.update_lineups(
-            db,
-            match_id=match_id,
-            team1_lineup=payload.team1_lineup,
-            team2_lineup=payload.team2_lineup,
-        )
+        with score_buffer.writing_matches([match_id]):
+            match = crud.update_lineups(
+                db,
+                match_id=match_id,
+                team1_lineup=payload.team1_lineup,
+                team2_lineup=payload.team2_lineup,
+            )
     except LookupError as exc:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
     except ValueError as exc:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
 
-    return serializers.match_to_read(match)
+    return idempotency.store(serializers.match_to_read(match))
 
 
 @router.patch("/{match_id}/status", response_model=schemas.MatchRead)
 def update_status_patch(
     match_id: int,
     payload: schemas.MatchStatusUpdate,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_write_db),
 ) -> schemas.MatchRead:
     try:
-        match = crud.update_match_status(db, match_id=match_id, status=payload.status)
+        with score_buffer.writing_matches([match_id]):
+            match = crud.update_match_status(db, match_id=match_id, status=payload.status)
     except LookupError as exc:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
     except ValueError as exc:
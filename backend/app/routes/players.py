@@ -1,17 +1,70 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
 
-from .. import crud, schemas
+from .. import crud, ratings, schemas, serializers
+from ..cache import cached
 from ..database import get_db
+from ..profiling import ProfiledRoute
+from ..read_replica import get_read_db
 
-router = APIRouter(tags=["players"])
+router = APIRouter(tags=["players"], route_class=ProfiledRoute)
 
 
 @router.get("/", response_model=list[schemas.PlayerRead])
-def list_players(db: Session = Depends(get_db)) -> list[schemas.PlayerRead]:
+def list_players(db: Session = Depends(get_read_db)) -> list[schemas.PlayerRead]:
     return crud.get_players(db)
 
 
+@router.get("/leaderboard", response_model=list[schemas.LeaderboardRow])
+def player_leaderboard(
+    discipline: str | None = Query(default=None, max_length=64),
+    set_level: schemas.SetLevel | None = Query(default=None),
+    limit: int = Query(default=20, ge=1, le=200),
+    db: Session = Depends(get_read_db),
+) -> list[schemas.LeaderboardRow]:
+    return cached(
+        db,
+        ("leaderboard", discipline, set_level, limit),
+        lambda: crud.player_leaderboard(
+            db, discipline=discipline, set_level=set_level, limit=limit
+        ),
+    )
+
+
+@router.get("/ratings", response_model=list[schemas.RatingRow])
+def rating_leaderboard(
+    set_level: schemas.SetLevel | None = Query(default=None),
+    limit: int = Query(default=20, ge=1, le=200),
+    db: Session = Depends(get_read_db),
+) -> list[schemas.RatingRow]:
+    return cached(
+        db,
+        ("ratings", set_level, limit),
+        lambda: ratings.rating_leaderboard(db, set_level=set_level, limit=limit),
+    )
+
+
+@router.get("/ratings/set-levels", response_model=list[schemas.SetLevelRating])
+def set_level_ratings(db: Session = Depends(get_read_db)) -> list[schemas.SetLevelRating]:
+    return cached(db, ("ratings", "set-levels"), lambda: ratings.set_level_ratings(db))
+
+
+@router.get("/{player_id}/rating", response_model=schemas.PlayerRatingRead)
+def player_rating(player_id: int, db: Session = Depends(get_read_db)) -> schemas.PlayerRatingRead:
+    try:
+        return ratings.get_player_rating(db, player_id)
+    except LookupError as exc:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
+
+
+@router.get("/{player_id}/stats", response_model=schemas.PlayerStatsRead)
+def player_stats(player_id: int, db: Session = Depends(get_read_db)) -> schemas.PlayerStatsRead:
+    try:
+        return crud.get_player_stats(db, player_id)
+    except LookupError as exc:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
+
+
 @router.post("/", response_model=schemas.PlayerRead, status_code=status.HTTP_201_CREATED)
 def create_player(player: schemas.PlayerCreate, db: Session = Depends(get_db)) -> schemas.PlayerRead:
     try:
@@ -20,3 +73,15 @@ def create_player(player: schemas.PlayerCreate, db: Session = Depends(get_db)) -
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
     except ValueError as exc:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+
+
+@router.get("/{player_id}/matches", response_model=list[schemas.MatchRead])
+def list_player_matches(
+    player_id: int, db: Session = Depends(get_read_db)
+) -> list[schemas.MatchRead]:
+    try:
+        matches = crud.list_player_matches(db, player_id)
+    except LookupError as exc:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
+
+    return [serializers.match_to_read(match) for match in matches]
@@ -1,23 +1,52 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-
-from .. import crud, serializers
-from ..database import get_db
-
-router = APIRouter(tags=["schedule"])
-
+from typing import Literal
 
-@router.get("/")
-def get_schedule(db: Session = Depends(get_db)) -> dict[str, dict[str, list[dict[str, object]]]]:
-    matches = crud.list_matches(db)
+from fastapi import APIRouter, Depends, Query, Response
+from pydantic import TypeAdapter
+from sqlalchemy.orm import Session
 
-    schedule: dict[str, dict[str, list[dict[str, object]]]] = {}
+from .. import crud, schemas, serializers, state_engine
+from ..cache import ResponseCache, cached, data_version
+from ..profiling import ProfiledRoute
+from ..read_replica import get_read_db
+
+router = APIRouter(tags=["schedule"], route_class=ProfiledRoute)
+
+# day -> session -> matches, or day -> session -> court -> matches.
+ScheduleBySession = dict[str, dict[str, list[schemas.MatchRead]]]
+ScheduleByCourt = dict[str, dict[str, dict[str, list[schemas.MatchRead]]]]
+_BY_SESSION = TypeAdapter(ScheduleBySession)
+_BY_COURT = TypeAdapter(ScheduleByCourt)
+
+# Encoded schedules for the current data version, kept even with the response cache off.
+_encoded = ResponseCache()
+data_version.on_change(_encoded.clear)
+
+
+@router.get("/", response_model=ScheduleBySession | ScheduleByCourt)
+def get_schedule(
+    group_by: Literal["session", "court"] = Query(default="session"),
+    db: Session = Depends(get_read_db),
+) -> Response:
+    # The grouped schedule is encoded once per data version and served as bytes.
+    content = cached(db, group_by, lambda: _build_schedule(db, group_by), _encoded)
+    return Response(content=content, media_type="application/json")
+
+
+def _build_schedule(db: Session, group_by: Literal["session", "court"]) -> bytes:
+    state = state_engine.get_state()
+    if state is not None:
+        matches = state.matches()
+    else:
+        matches = [serializers.match_to_read(match) for match in crud.list_matches(db)]
+
+    if group_by == "court":
+        by_court: dict[str, dict[str, dict[str, list[schemas.MatchRead]]]] = {}
+        for match in matches:
+            sessions = by_court.setdefault(str(match.day), {})
+            sessions.setdefault(match.session, {}).setdefault(str(match.court), []).append(match)
+        return _BY_COURT.dump_json(by_court)
+
+    schedule: dict[str, dict[str, list[schemas.MatchRead]]] = {}
     for match in matches:
-        day_key = str(match.day)
-        session_key = match.session
-
-        payload = serializers.model_dump_compat(serializers.match_to_read(match))
-
-        schedule.setdefault(day_key, {}).setdefault(session_key, []).append(payload)
-
-    return schedule
+        schedule.setdefault(str(match.day), {}).setdefault(match.session, []).append(match)
+    return _BY_SESSION.dump_json(schedule)
@@ -1,19 +1,56 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 
-from .. import crud, schemas
-from ..database import get_db
+from .. import crud, schemas, state_engine
+from ..cache import cached
+from ..profiling import ProfiledRoute
+from ..read_replica import get_read_db
+from ..state_engine import get_write_db
 
-router = APIRouter(tags=["teams"])
+router = APIRouter(tags=["teams"], route_class=ProfiledRoute)
 
 
 @router.get("/", response_model=list[schemas.TeamRead])
-def list_teams(db: Session = Depends(get_db)) -> list[schemas.TeamRead]:
+def list_teams(db: Session = Depends(get_read_db)) -> list[schemas.TeamRead]:
+    state = state_engine.get_state()
+    if state is not None:
+        return state.teams()
+
     return crud.get_teams(db)
 
 
+@router.get("/{team_id}/fixtures", response_model=schemas.TeamFixtures)
+def team_fixtures(team_id: int, db: Session = Depends(get_read_db)) -> schemas.TeamFixtures:
+    state = state_engine.get_state()
+    try:
+        if state is not None:
+            return state.team_fixtures(team_id)
+        return cached(db, ("team_fixtures", team_id), lambda: crud.get_team_fixtures(db, team_id))
+    except LookupError as exc:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
+
+
+@router.get("/{team_a_id}/vs/{team_b_id}", response_model=schemas.HeadToHead)
+def head_to_head(
+    team_a_id: int, team_b_id: int, db: Session = Depends(get_read_db)
+) -> schemas.HeadToHead:
+    state = state_engine.get_state()
+    try:
+        if state is not None:
+            return state.head_to_head(team_a_id, team_b_id)
+        return cached(
+            db,
+            ("head_to_head", team_a_id, team_b_id),
+            lambda: crud.get_head_to_head(db, team_a_id, team_b_id),
+        )
+    except LookupError as exc:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+
+
 @router.post("/", response_model=schemas.TeamRead, status_code=status.HTTP_201_CREATED)
-def create_team(team: schemas.TeamCreate, db: Session = Depends(get_db)) -> schemas.TeamRead:
+def create_team(team: schemas.TeamCreate, db: Session = Depends(get_write_db)) -> schemas.TeamRead:
     try:
         return crud.create_team(db, team)
     except ValueError as exc:
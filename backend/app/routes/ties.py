@@ -1,24 +1,35 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 
-from .. import crud, schemas, serializers
-from ..database import get_db
+from .. import crud, schemas, serializers, state_engine
+from ..cache import cached
+from ..profiling import ProfiledRoute
+from ..read_replica import get_read_db
 
-router = APIRouter(tags=["ties"])
+router = APIRouter(tags=["ties"], route_class=ProfiledRoute)
 
 
 @router.get("/", response_model=list[schemas.TieRead])
-def list_ties(db: Session = Depends(get_db)) -> list[schemas.TieRead]:
-    ties = crud.get_ties(db)
-    return [
-        serializers.tie_to_read(tie, sorted(tie.matches, key=lambda match: match.match_no))
-        for tie in ties
-    ]
+def list_ties(db: Session = Depends(get_read_db)) -> list[schemas.TieRead]:
+    state = state_engine.get_state()
+    if state is not None:
+        return cached(db, "ties", state.ties)
+
+    def build() -> list[schemas.TieRead]:
+        return [
+            serializers.tie_to_read(tie, sorted(tie.matches, key=lambda match: match.match_no))
+            for tie in crud.get_ties(db)
+        ]
+
+    return cached(db, "ties", build)
 
 
 @router.get("/{tie_id}/matches", response_model=list[schemas.MatchRead])
-def list_tie_matches(tie_id: int, db: Session = Depends(get_db)) -> list[schemas.MatchRead]:
+def list_tie_matches(tie_id: int, db: Session = Depends(get_read_db)) -> list[schemas.MatchRead]:
+    state = state_engine.get_state()
     try:
+        if state is not None:
+            return state.tie_matches(tie_id)
         matches = crud.list_matches_by_tie(db, tie_id)
     except LookupError as exc:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
@@ -1,17 +1,95 @@
-from fastapi import APIRouter, Depends
+import json
+from collections.abc import AsyncIterator
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
-from .. import crud, schemas
-from ..database import get_db
+from .. import crud, projection, scenarios, schemas, state_engine
+from ..cache import cached, data_version
+from ..profiling import ProfiledRoute
+from ..read_replica import get_read_db
 
-router = APIRouter(tags=["viewer"])
+router = APIRouter(tags=["viewer"], route_class=ProfiledRoute)
 
 
 @router.get("/dashboard", response_model=schemas.ViewerDashboard)
-def viewer_dashboard(db: Session = Depends(get_db)) -> schemas.ViewerDashboard:
-    return crud.build_viewer_dashboard(db)
+def viewer_dashboard(db: Session = Depends(get_read_db)) -> schemas.ViewerDashboard:
+    state = state_engine.get_state()
+    if state is not None:
+        return cached(db, "dashboard", state.dashboard)
+    return cached(db, "dashboard", lambda: crud.build_viewer_dashboard(db))
 
 
 @router.get("/standings", response_model=list[schemas.StandingRow])
-def standings(db: Session = Depends(get_db)) -> list[schemas.StandingRow]:
-    return crud.build_standings(db)
+def standings(db: Session = Depends(get_read_db)) -> list[schemas.StandingRow]:
+    state = state_engine.get_state()
+    if state is not None:
+        return cached(db, "standings", state.standings)
+    return cached(db, "standings", lambda: crud.build_standings(db))
+
+
+@router.get("/scenarios/{team_id}", response_model=schemas.TeamScenarios)
+def team_scenarios(team_id: int, db: Session = Depends(get_read_db)) -> schemas.TeamScenarios:
+    """Whether a team has clinched or lost the final and the top three, and what it still needs."""
+    state = state_engine.get_state()
+    try:
+        if state is not None:
+            return cached(db, ("scenarios", team_id), lambda: state.scenarios(team_id))
+        return cached(db, ("scenarios", team_id), lambda: scenarios.get_team_scenarios(db, team_id))
+    except LookupError as exc:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+
+
+@router.get("/projection", response_model=schemas.Projection)
+def standings_projection(
+    simulations: int | None = Query(
+        default=None, ge=projection.MIN_SIMULATIONS, le=projection.MAX_PUBLIC_SIMULATIONS
+    ),
+    db: Session = Depends(get_read_db),
+) -> schemas.Projection:
+    """Monte Carlo finalist, bronze, gold and silver chances for every team."""
+    service = projection.get_projection_service()
+    if service is not None and simulations is None:
+        return service.latest()
+    return cached(
+        db,
+        ("projection", simulations),
+        lambda: projection.project(db, simulations),
+    )
+
+
+STREAM_KEEPALIVE_SECONDS = 15
+
+
+@router.get("/version", response_model=schemas.DataVersionRead)
+async def viewer_version(
+    since: int | None = Query(default=None),
+    wait: float = Query(default=0, ge=0, le=60),
+) -> schemas.DataVersionRead:
+    """Current data version; with `since`, long-polls up to `wait` seconds for a change."""
+    if since is None or wait == 0:
+        return schemas.DataVersionRead(version=data_version.value)
+    return schemas.DataVersionRead(version=await data_version.wait_for_change(since, wait))
+
+
+@router.get("/stream")
+async def viewer_stream(request: Request) -> StreamingResponse:
+    """Server-sent events: one `version` event now and after every data change."""
+
+    async def events() -> AsyncIterator[str]:
+        version = data_version.value
+        yield f"event: version\ndata: {json.dumps({'version': version})}\n\n"
+        while not await request.is_disconnected():
+            latest = await data_version.wait_for_change(version, STREAM_KEEPALIVE_SECONDS)
+            if latest == version:
+                yield ": keepalive\n\n"
+                continue
+            version = latest
+            yield f"event: version\ndata: {json.dumps({'version': version})}\n\n"
+
+    return StreamingResponse(
+        events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"}
+    )
@@ -0,0 +1,354 @@
+"""Qualification scenarios: what a team still needs for the final or the top three.
+
+Scenarios need a `tiebreaks` ruleset that ranks on ties won (or tie points) first, so
+a team's fate depends on who wins each remaining tie; other rulesets are rejected. For
+every number of its own remaining ties the team could win, `team_scenarios` finds its
+best and worst possible rank over all outcomes of the remaining ties.
+
+Teams level on ties won fall to the ruleset's later rules, which mostly depend on scores
+not played yet. Two level teams are ordered only when the order is already certain:
+only names are left to compare; games won come next and one team has won more games
+than the other can still reach; or neither has a game left to play and no
+`head_to_head` rule follows, so the current standings order is final. Anything else
+counts as possibly ahead. A target is clinched when the team makes it in every outcome,
+and lost when it misses it in every outcome.
+
+The ranks come from yes/no searches ("can at most N rivals finish ahead?"), which stop at
+the first outcome that answers yes. Each step is pruned by counting bounds (each tie
+hands out one win, and a rival can absorb only so many before passing the team), and
+failed states are memoized on (tie index, ties won per team). Ties won are capped
+relative to the team's final total, so a rival that is surely ahead, or that can no
+longer catch up, collapses into one state. Ties are ordered so rivals play out one after
+another, which keeps the number of distinct states small.
+"""
+
+from collections import Counter
+from dataclasses import dataclass
+
+from sqlalchemy.orm import Session, selectinload
+
+from . import crud, models, schemas, tiebreaks
+
+FINALIST_RANK = 2
+TOP_THREE_RANK = 3
+# Rules a ruleset can start with: both rank on ties won.
+LEADING_RULES = ("ties_won", "tie_points")
+
+# Capped "ties won" of a rival, relative to the team's final total.
+_ABOVE = 1 << 30
+_BELOW = -1
+
+_AHEAD, _BEHIND, _OPEN = 1, -1, 0
+
+
+@dataclass(frozen=True)
+class League:
+    """What the search reads, copied out of the teams and ties."""
+
+    standings: list[schemas.StandingRow]
+    # (team1_id, team2_id) of each tie still to be decided, in tie order.
+    remaining: list[tuple[int, int]]
+    # Regular games each team has left in those ties.
+    unplayed: Counter[int]
+    # The tie-break rules the standings were ranked with.
+    rules: tuple[str, ...]
+
+
+def _tie_decided(tie: models.Tie) -> bool:
+    # Same rule as the standings: only completed ties with a winner count.
+    return tie.status == "completed" and tie.winner_team_id in (tie.team1_id, tie.team2_id)
+
+
+def _chance(best_rank: int, worst_rank: int, cutoff: int) -> schemas.ScenarioChance:
+    if worst_rank <= cutoff:
+        return "clinched"
+    if best_rank > cutoff:
+        return "eliminated"
+    return "possible"
+
+
+def _more_wins(count: int) -> str:
+    return f"{count} more tie win" + ("" if count == 1 else "s")
+
+
+def _keep(count: int) -> str:
+    return "keeps" if count == 1 else "keep"
+
+
+def _needs(by_wins: list[schemas.WinsScenario], target: str, label: str) -> str:
+    chances = [getattr(scenario, target) for scenario in by_wins]
+    if all(chance == "clinched" for chance in chances):
+        return f"Already sure of {label}."
+    if all(chance == "eliminated" for chance in chances):
+        return f"Can no longer reach {label}."
+
+    possible_at = next(wins for wins, chance in enumerate(chances) if chance != "eliminated")
+    clinch_at = next((wins for wins, chance in enumerate(chances) if chance == "clinched"), None)
+    with_help = (
+        "other results can still carry it there"
+        if possible_at == 0
+        else f"{_more_wins(possible_at)} {_keep(possible_at)} it possible "
+        "with help from other results"
+    )
+    if clinch_at is None:
+        wins = "" if possible_at == 0 else f"{_more_wins(possible_at)} and "
+        return f"Needs {wins}help from other results to reach {label}."
+    if possible_at == clinch_at:
+        return f"Reaches {label} with {_more_wins(clinch_at)}."
+    return f"Reaches {label} with {_more_wins(clinch_at)}; {with_help}."
+
+
+def _retiring_order(pairs: list[tuple[int, int]]) -> list[tuple[int, int]]:
+    """Ties grouped so rivals play out one after another, which keeps few of them open."""
+    pending = list(pairs)
+    ordered: list[tuple[int, int]] = []
+    while pending:
+        counts = Counter(index for pair in pending for index in pair)
+        team = min(counts, key=lambda index: (counts[index], index))
+        ordered.extend(pair for pair in pending if team in pair)
+        pending = [pair for pair in pending if team not in pair]
+    return ordered
+
+
+def league_from(teams: list[models.Team], ties: list[models.Tie]) -> League:
+    """`ties` carry all their matches, including locked deciders."""
+    standings = crud.build_standings_from(teams, ties)
+    known = {row.team_id for row in standings}
+    remaining: list[tuple[int, int]] = []
+    unplayed: Counter[int] = Counter()
+    for tie in ties:
+        if _tie_decided(tie) or tie.team1_id not in known or tie.team2_id not in known:
+            continue
+        remaining.append((tie.team1_id, tie.team2_id))
+        count = sum(
+            1 for match in tie.matches if match.stage == "tie" and match.winner_side not in (1, 2)
+        )
+        unplayed[tie.team1_id] += count
+        unplayed[tie.team2_id] += count
+    return League(standings, remaining, unplayed, tiebreaks.get_ruleset().rules)
+
+
+def team_scenarios(
+    teams: list[models.Team], ties: list[models.Tie], team_id: int
+) -> schemas.TeamScenarios:
+    """Scenarios for `team_id`; `ties` carry all their matches, including locked deciders."""
+    return league_scenarios(league_from(teams, ties), team_id)
+
+
+def league_scenarios(league: League, team_id: int) -> schemas.TeamScenarios:
+    standings, remaining, unplayed = league.standings, league.remaining, league.unplayed
+    if not league.rules or league.rules[0] not in LEADING_RULES:
+        raise ValueError("Scenarios need tie-break rules that start with ties_won or tie_points.")
+    later = league.rules[1:]
+    games_next = later[:1] == ("games_won",)
+    settled = tiebreaks.HEAD_TO_HEAD not in later
+
+    order = [row.team_id for row in standings]
+    if team_id not in order:
+        raise LookupError("Team not found.")
+
+    position = {row_team_id: index for index, row_team_id in enumerate(order)}
+    target = position[team_id]
+    size = len(order)
+    games_min = [row.games_won for row in standings]
+    games_max = [row.games_won + unplayed[row.team_id] for row in standings]
+
+    # Order of each rival against the team if both end on the same ties won.
+    level = []
+    for index in range(size):
+        if not later:
+            level.append(_AHEAD if standings[index].team < standings[target].team else _BEHIND)
+        elif games_next and games_min[index] > games_max[target]:
+            level.append(_AHEAD)
+        elif games_next and games_max[index] < games_min[target]:
+            level.append(_BEHIND)
+        elif (
+            settled
+            and games_min[index] == games_max[index]
+            and games_min[target] == games_max[target]
+        ):
+            level.append(_AHEAD if index < target else _BEHIND)
+        else:
+            level.append(_OPEN)
+
+    own = [pair for pair in remaining if team_id in pair]
+    sequence = _retiring_order(
+        [(position[team1_id], position[team2_id]) for team1_id, team2_id in remaining]
+    )
+
+    # left[k][i]: ties team i still plays from sequence[k] on.
+    left = [[0] * size for _ in range(len(sequence) + 1)]
+    for k in range(len(sequence) - 1, -1, -1):
+        left[k] = list(left[k + 1])
+        for index in sequence[k]:
+            left[k][index] += 1
+
+    def thresholds(index: int, final: int) -> tuple[int, int]:
+        """Ties won a rival needs to be possibly ahead of the team, and surely ahead."""
+        return final + (level[index] == _BEHIND), final + (level[index] != _AHEAD)
+
+    def capped(wins: list[int] | tuple[int, ...], k: int, final: int) -> tuple[int, ...]:
+        state = []
+        for index, value in enumerate(wins):
+            possibly, surely = thresholds(index, final)
+            if index == target:
+                state.append(final)
+            elif value == _ABOVE or value >= surely:
+                state.append(_ABOVE)
+            elif value == _BELOW or value + left[k][index] < possibly:
+                state.append(_BELOW)
+            else:
+                state.append(value)
+        return tuple(state)
+
+    def branches(
+        k: int, final: int, state: tuple[int, ...], own_wins: int, fewest: bool
+    ) -> list[tuple[tuple[int, ...], int]]:
+        options = []
+        for winner in sequence[k]:
+            if winner == target:
+                if own_wins:
+                    options.append((state, own_wins - 1))
+                continue
+            if target in sequence[k] and own_wins == left[k][target]:
+                # Every remaining own tie must be a win for the team.
+                continue
+            wins = list(state)
+            if wins[winner] not in (_ABOVE, _BELOW):
+                wins[winner] += 1
+            options.append((capped(wins, k + 1, final), own_wins))
+        if len(options) == 2 and options[0] == options[1]:
+            return options[:1]
+        # Try the likelier witness first: fewer rivals ahead, or more.
+        return sorted(options, key=lambda option: option[0].count(_ABOVE), reverse=not fewest)
+
+    def most_possible(k: int, final: int, state: tuple[int, ...], own_wins: int) -> int:
+        """Upper bound on rivals possibly ahead: each remaining tie is one win to hand out."""
+        count, deficits = 0, []
+        for index, value in enumerate(state):
+            if index == target or value == _BELOW:
+                continue
+            deficit = 0 if value == _ABOVE else max(0, thresholds(index, final)[0] - value)
+            if deficit == 0:
+                count += 1
+            else:
+                deficits.append(deficit)
+        budget = len(sequence) - k - own_wins
+        for deficit in sorted(deficits):
+            if deficit > budget:
+                break
+            budget -= deficit
+            count += 1
+        return count
+
+    def fewest_ahead(k: int, final: int, state: tuple[int, ...], own_wins: int) -> int:
+        """Lower bound on rivals ahead: wins the others cannot absorb push some rivals past."""
+        count, absorb, overflow = 0, 0, []
+        for index, value in enumerate(state):
+            if index == target:
+                continue
+            remaining_ties = left[k][index]
+            if value in (_ABOVE, _BELOW):
+                count += value == _ABOVE
+                absorb += remaining_ties
+                continue
+            safe = min(remaining_ties, thresholds(index, final)[1] - 1 - value)
+            absorb += safe
+            overflow.append(remaining_ties - safe)
+        shortfall = len(sequence) - k - own_wins - absorb
+        for extra in sorted(overflow, reverse=True):
+            if shortfall <= 0:
+                break
+            shortfall -= extra
+            count += 1
+        return count
+
+    # Per state: the largest limit of "at most N rivals ahead" known impossible, and the
+    # smallest limit of "at least N rivals possibly ahead" known impossible.
+    fewest_failed: dict[tuple[int, int, tuple[int, ...], int], int] = {}
+    most_failed: dict[tuple[int, int, tuple[int, ...], int], int] = {}
+
+    def reachable(
+        k: int, final: int, state: tuple[int, ...], own_wins: int, limit: int, fewest: bool
+    ) -> bool:
+        """Whether some outcome of sequence[k:], with the team winning `own_wins` more of its
+        ties, leaves at most `limit` rivals ahead of it (`fewest`) or at least `limit`
+        possibly ahead."""
+        if fewest and fewest_ahead(k, final, state, own_wins) > limit:
+            return False
+        if not fewest and most_possible(k, final, state, own_wins) < limit:
+            return False
+        if k == len(sequence):
+            return True
+
+        key = (k, final, state, own_wins)
+        failed = fewest_failed if fewest else most_failed
+        known = failed.get(key)
+        if known is not None and (limit <= known if fewest else limit >= known):
+            return False
+        if any(
+            reachable(k + 1, final, branch, branch_wins, limit, fewest)
+            for branch, branch_wins in branches(k, final, state, own_wins, fewest)
+        ):
+            return True
+        failed[key] = (
+            limit if known is None else (max(known, limit) if fewest else min(known, limit))
+        )
+        return False
+
+    base_wins = [row.ties_won for row in standings]
+    ranges: dict[int, tuple[int, int]] = {}
+    for own_wins in range(len(own) + 1):
+        final = base_wins[target] + own_wins
+        root = (0, final, capped(base_wins, 0, final), own_wins)
+        fewest = fewest_ahead(*root)
+        while not reachable(*root, fewest, True):
+            fewest += 1
+        most = most_possible(*root)
+        while not reachable(*root, most, False):
+            most -= 1
+        ranges[own_wins] = (1 + fewest, 1 + most)
+
+    by_wins = [
+        schemas.WinsScenario(
+            wins=wins,
+            best_rank=best,
+            worst_rank=worst,
+            finalist=_chance(best, worst, FINALIST_RANK),
+            top_three=_chance(best, worst, TOP_THREE_RANK),
+        )
+        for wins, (best, worst) in sorted(ranges.items())
+    ]
+    best_rank = min(scenario.best_rank for scenario in by_wins)
+    worst_rank = max(scenario.worst_rank for scenario in by_wins)
+    finalist = _chance(best_rank, worst_rank, FINALIST_RANK)
+
+    summary = _needs(by_wins, "finalist", "a place in the final")
+    if finalist != "clinched":
+        summary = f"{summary} {_needs(by_wins, 'top_three', 'the top three')}"
+
+    row = standings[target]
+    return schemas.TeamScenarios(
+        team_id=row.team_id,
+        team=row.team,
+        rank=row.rank,
+        ties_won=row.ties_won,
+        remaining_ties=len(own),
+        best_rank=best_rank,
+        worst_rank=worst_rank,
+        finalist=finalist,
+        top_three=_chance(best_rank, worst_rank, TOP_THREE_RANK),
+        summary=summary,
+        by_wins=by_wins,
+    )
+
+
+def get_team_scenarios(db: Session, team_id: int) -> schemas.TeamScenarios:
+    # All matches, not just the visible ones: a locked decider may still be played.
+    ties = (
+        db.query(models.Tie)
+        .options(selectinload(models.Tie.matches))
+        .order_by(models.Tie.tie_no.asc())
+        .all()
+    )
+    return team_scenarios(crud.get_teams(db), ties, team_id)
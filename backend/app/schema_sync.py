@@ -0,0 +1,73 @@
+"""Startup upgrades for tables created by older versions.
+
+`Base.metadata.create_all` only creates missing tables, so columns and indexes added to
+existing tables are brought in here. Each step checks the live schema first and does
+nothing on a current database:
+
+- `name_key` on teams, players and referees: added, backfilled from `name` with
+  `models.name_key`, made NOT NULL (except on SQLite, which cannot alter a column) and
+  given the unique index the name upserts conflict on. Names that already differ only
+  in case or spacing stop the upgrade; rename them and restart.
+- ties: the composite team-pair indexes replace the single-column team indexes.
+"""
+
+from collections import Counter
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection, Engine
+
+from . import models
+
+# Table -> columns of its unique name index (the last one is `name_key`), index name.
+_NAME_KEY_INDEXES = {
+    "teams": (("name_key",), "uq_teams_name_key"),
+    "players": (("team_id", "name_key"), "uq_player_name_key_team"),
+    "referees": (("name_key",), "uq_referees_name_key"),
+}
+
+_TIE_INDEXES = {
+    "ix_ties_team1_team2": "team1_id, team2_id",
+    "ix_ties_team2_team1": "team2_id, team1_id",
+}
+_REPLACED_TIE_INDEXES = ("ix_ties_team1_id", "ix_ties_team2_id")
+
+
+def _add_name_key(connection: Connection, table: str, columns: tuple[str, ...], index: str) -> None:
+    scope = columns[:-1]
+    rows = connection.execute(
+        text(f"SELECT {', '.join(('id', 'name', *scope))} FROM {table}")
+    ).all()
+    keys = {row[0]: (*row[2:], models.name_key(row[1])) for row in rows}
+    duplicates = sorted(key[-1] for key, count in Counter(keys.values()).items() if count > 1)
+    if duplicates:
+        raise RuntimeError(
+            f"Cannot add name_key to {table}: names differ only in case or spacing "
+            f"({', '.join(duplicates)}); rename them first."
+        )
+
+    connection.execute(text(f"ALTER TABLE {table} ADD COLUMN name_key VARCHAR(100)"))
+    if keys:
+        connection.execute(
+            text(f"UPDATE {table} SET name_key = :name_key WHERE id = :id"),
+            [{"id": row_id, "name_key": key[-1]} for row_id, key in keys.items()],
+        )
+    if connection.dialect.name != "sqlite":
+        connection.execute(text(f"ALTER TABLE {table} ALTER COLUMN name_key SET NOT NULL"))
+    connection.execute(text(f"CREATE UNIQUE INDEX {index} ON {table} ({', '.join(columns)})"))
+
+
+def sync_schema(engine: Engine) -> None:
+    with engine.begin() as connection:
+        inspector = inspect(connection)
+        tables = set(inspector.get_table_names())
+        for table, (columns, index) in _NAME_KEY_INDEXES.items():
+            if table not in tables:
+                continue
+            if "name_key" not in {column["name"] for column in inspector.get_columns(table)}:
+                _add_name_key(connection, table, columns, index)
+
+        if "ties" in tables:
+            for index in _REPLACED_TIE_INDEXES:
+                connection.execute(text(f"DROP INDEX IF EXISTS {index}"))
+            for index, columns in _TIE_INDEXES.items():
+                connection.execute(text(f"CREATE INDEX IF NOT EXISTS {index} ON ties ({columns})"))
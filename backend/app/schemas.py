@@ -1,4 +1,5 @@
-from typing import Literal
+from datetime import datetime
+from typing import Annotated, Literal
 
 from pydantic import BaseModel, Field
 
@@ -18,6 +19,7 @@ except ImportError:
 MatchStage = Literal["tie"]
 MatchStatus = Literal["pending", "live", "completed"]
 TieStatus = Literal["pending", "live", "completed"]
+SetLevel = Literal["Set-1", "Set-2", "Set-3", "Set-4", "Set-5"]
 
 
 class TeamCreate(BaseModel):
@@ -31,7 +33,7 @@ class TeamRead(ORMBaseModel):
 
 class PlayerCreate(BaseModel):
     name: str = Field(min_length=1, max_length=100)
-    set_level: Literal["Set-1", "Set-2", "Set-3", "Set-4", "Set-5"]
+    set_level: SetLevel
     team_id: int = Field(gt=0)
 
 
@@ -42,6 +44,139 @@ class PlayerRead(ORMBaseModel):
     team_id: int
 
 
+class PlayerImport(BaseModel):
+    name: str = Field(min_length=1, max_length=100)
+    set_level: SetLevel
+    team: str = Field(min_length=2, max_length=100)
+
+
+class TieImport(BaseModel):
+    tie_no: int = Field(ge=1)
+    day: int = Field(ge=1)
+    session: str = Field(min_length=1, max_length=32)
+    court: int = Field(ge=1)
+    team1: str = Field(min_length=2, max_length=100)
+    team2: str = Field(min_length=2, max_length=100)
+    start_time: str = Field(default="09:30", pattern=r"^([01][0-9]|2[0-3]):[0-5][0-9]$")
+
+
+class MatchTemplateImport(BaseModel):
+    match_no: int = Field(ge=1, le=13)
+    discipline: str = Field(min_length=1, max_length=64)
+    team1_lineup: str = Field(default="TBD", min_length=1, max_length=255)
+    team2_lineup: str = Field(default="TBD", min_length=1, max_length=255)
+    # Minutes after the tie's start_time; defaults to 15 minutes per match number.
+    offset_minutes: int | None = Field(default=None, ge=0)
+
+
+class ImportRowError(BaseModel):
+    section: str
+    index: int
+    line: int | None = None
+    error: str
+
+
+class ImportResult(BaseModel):
+    imported: bool
+    teams: int = 0
+    players: int = 0
+    ties: int = 0
+    matches: int = 0
+    errors: list[ImportRowError] = Field(default_factory=list)
+
+
+class PlayerStatLine(BaseModel):
+    discipline: str
+    played: int = 0
+    wins: int = 0
+    losses: int = 0
+    win_rate: float = 0.0
+    points_for: int = 0
+    points_against: int = 0
+    deuce_games: int = 0
+
+
+class PlayerStatsRead(BaseModel):
+    player_id: int
+    player: str
+    team: str
+    set_level: str
+    totals: PlayerStatLine
+    disciplines: list[PlayerStatLine] = Field(default_factory=list)
+
+
+class LeaderboardRow(PlayerStatLine):
+    rank: int
+    player_id: int
+    player: str
+    team: str
+    set_level: str
+
+
+class RatingPoint(BaseModel):
+    game_id: int
+    match_id: int | None = None
+    discipline: str
+    rating: float
+    delta: float
+
+
+class PartnerRating(BaseModel):
+    partner_id: int
+    partner: str
+    rating: float
+    games: int
+
+
+class PlayerRatingRead(BaseModel):
+    player_id: int
+    player: str
+    team: str
+    set_level: str
+    rating: float
+    games: int = 0
+    history: list[RatingPoint] = Field(default_factory=list)
+    partners: list[PartnerRating] = Field(default_factory=list)
+
+
+class RatingRow(BaseModel):
+    rank: int
+    player_id: int
+    player: str
+    team: str
+    set_level: str
+    rating: float
+    games: int
+
+
+class SetLevelRating(BaseModel):
+    set_level: str
+    players: int
+    rated_players: int
+    mean_rating: float
+    min_rating: float
+    max_rating: float
+
+
+class RatingValue(BaseModel):
+    player_id: int
+    # Equal to `player_id` for a player's own rating.
+    partner_id: int
+    rating: float
+    games: int
+
+
+class RatingRecomputeResult(BaseModel):
+    games: int
+    players: int
+    pairs: int
+    k_factor: float
+    initial_rating: float
+    dry_run: bool = False
+    # Only filled by a dry run, which writes nothing.
+    ratings: list[RatingValue] = Field(default_factory=list)
+
+
 class ScoreUpdate(BaseModel):
     score1: int = Field(ge=0, le=30)
     score2: int = Field(ge=0, le=30)
@@ -56,6 +191,47 @@ class MatchStatusUpdate(BaseModel):
     status: Literal["pending", "live"]
 
 
+class RallyIn(BaseModel):
+    match_id: int = Field(gt=0)
+    seq: int = Field(ge=1)
+    side: Literal[1, 2]
+
+
+class RallyBatch(BaseModel):
+    rallies: list[RallyIn] = Field(min_length=1, max_length=1000)
+
+
+class RallyRead(ORMBaseModel):
+    seq: int
+    side: int
+    created_at: datetime
+
+
+class ScoreOperation(ScoreUpdate):
+    op: Literal["score"]
+    match_id: int = Field(gt=0)
+
+
+class LineupOperation(LineupUpdate):
+    op: Literal["lineup"]
+    match_id: int = Field(gt=0)
+
+
+class StatusOperation(MatchStatusUpdate):
+    op: Literal["status"]
+    match_id: int = Field(gt=0)
+
+
+MatchOperation = Annotated[
+    ScoreOperation | LineupOperation | StatusOperation,
+    Field(discriminator="op"),
+]
+
+
+class MatchBatch(BaseModel):
+    operations: list[MatchOperation] = Field(min_length=1, max_length=500)
+
+
 class RefereeRead(ORMBaseModel):
     id: int
     name: str
@@ -94,6 +270,34 @@ class MatchRead(BaseModel):
     referee_name: str | None = None
 
     winner_side: int | None = None
+    team1_win_probability: float | None = None
+
+
+class RallyBatchItemResult(BaseModel):
+    match_id: int
+    accepted: int = 0
+    duplicates: int = 0
+    last_seq: int = 0
+    match: MatchRead | None = None
+    error: str | None = None
+
+
+class RallyBatchResult(BaseModel):
+    results: list[RallyBatchItemResult]
+
+
+class MatchBatchItemResult(BaseModel):
+    index: int
+    op: Literal["score", "lineup", "status"]
+    match_id: int
+    match: MatchRead | None = None
+    error: str | None = None
+
+
+class MatchBatchResult(BaseModel):
+    applied: int
+    failed: int
+    results: list[MatchBatchItemResult]
 
 
 class TieRead(BaseModel):
@@ -116,10 +320,20 @@ class TieRead(BaseModel):
     status: TieStatus
     winner_team_id: int | None = None
     winner_team: str | None = None
+    team1_win_probability: float | None = None
 
     matches: list[MatchRead] = Field(default_factory=list)
 
 
+class TieRecountResult(BaseModel):
+    ties_checked: int
+    repaired_tie_ids: list[int] = Field(default_factory=list)
+
+
+class MatchPlayersRebuildResult(BaseModel):
+    rows: int
+
+
 class RefereeAssignmentResponse(BaseModel):
     referee: RefereeRead
     match: MatchRead
@@ -160,6 +374,27 @@ class FinalMatchRead(BaseModel):
     matches: list[FinalGameRead] = Field(default_factory=list)
 
 
+class TeamFixtures(BaseModel):
+    team: TeamRead
+    ties: list[TieRead] = Field(default_factory=list)
+
+
+class HeadToHead(BaseModel):
+    team_a: TeamRead
+    team_b: TeamRead
+
+    ties_played: int = 0
+    team_a_ties_won: int = 0
+    team_b_ties_won: int = 0
+
+    team_a_games_won: int = 0
+    team_b_games_won: int = 0
+    team_a_points: int = 0
+    team_b_points: int = 0
+
+    ties: list[TieRead] = Field(default_factory=list)
+
+
 class StandingRow(BaseModel):
     rank: int
     team_id: int
@@ -181,6 +416,48 @@ class StandingRow(BaseModel):
     qualification: Literal["none", "finalist", "bronze"] = "none"
 
 
+ScenarioChance = Literal["clinched", "possible", "eliminated"]
+
+
+class WinsScenario(BaseModel):
+    wins: int
+    best_rank: int
+    worst_rank: int
+    finalist: ScenarioChance
+    top_three: ScenarioChance
+
+
+class TeamScenarios(BaseModel):
+    team_id: int
+    team: str
+    rank: int
+    ties_won: int
+    remaining_ties: int
+
+    best_rank: int
+    worst_rank: int
+    finalist: ScenarioChance
+    top_three: ScenarioChance
+    summary: str
+    by_wins: list[WinsScenario] = Field(default_factory=list)
+
+
+class ProjectionRow(BaseModel):
+    team_id: int
+    team: str
+    expected_rank: float
+    finalist: float
+    bronze: float
+    gold: float
+    silver: float
+
+
+class Projection(BaseModel):
+    data_version: int
+    simulations: int
+    rows: list[ProjectionRow] = Field(default_factory=list)
+
+
 class DashboardSummary(BaseModel):
     total_games: int
     pending_games: int
@@ -207,3 +484,20 @@ class ViewerDashboard(BaseModel):
     medals: MedalSummary
 
     rule_highlights: list[str]
+
+
+class DataVersionRead(BaseModel):
+    version: int
+
+
+class ArchiveTableRead(BaseModel):
+    file: str
+    rows: int
+
+
+class ArchiveRead(BaseModel):
+    name: str
+    archived_at: int
+    completed: bool
+    champion: str | None = None
+    tables: dict[str, ArchiveTableRead]
@@ -0,0 +1,341 @@
+"""Optional write-behind buffer for rapid score taps.
+
+Enabled with `SCORE_BUFFER_WINDOW_MS` > 0. A tap that only moves the score of a match
+that is already live (no winner before or after) is validated with the `update_score`
+rules, appended to a write-ahead log, acknowledged with a sequence number and held for
+up to the window. When the window closes only the latest score per match is written,
+through `crud.update_score`. Taps that start or decide a game change the tie aggregates,
+so they are written through immediately and ties never lag behind.
+
+Readers see buffered scores: `serializers.match_to_read` overlays them on every match
+payload. The buffer lives in one worker process, so only that worker's readers see a
+score before it is written: run a single worker, or keep the window short enough that
+other workers lagging by one window is acceptable. Any other write to a match (lineup,
+status, referee, batches, rallies) runs inside `writing_matches`, which flushes its
+buffered score first and holds off new taps until the write commits, so writes to one
+match stay in order.
+
+The WAL (`SCORE_BUFFER_WAL`) holds one JSON line per acknowledged tap plus a marker
+once the score is committed. At startup, scores acknowledged but never committed are
+replayed; the file is truncated whenever the buffer drains.
+"""
+
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+
+from sqlalchemy.orm import Session
+
+from . import crud, schemas, serializers, win_probability
+from .database import env_flag
+
+logger = logging.getLogger(__name__)
+
+SCORE_SEQ_HEADER = "X-Score-Seq"
+
+
+def get_window_seconds() -> float:
+    return max(0, int(os.getenv("SCORE_BUFFER_WINDOW_MS", "0"))) / 1000
+
+
+def get_wal_path() -> Path:
+    return Path(os.getenv("SCORE_BUFFER_WAL", "").strip() or "score-buffer.wal")
+
+
+@dataclass(frozen=True)
+class _Pending:
+    score1: int
+    score2: int
+    seq: int
+    deadline: float
+    base: schemas.MatchRead
+
+
+class ScoreBuffer:
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        window_seconds: float,
+        wal_path: Path,
+        fsync: bool = True,
+    ) -> None:
+        self._session_factory = session_factory
+        self._window = window_seconds
+        self._wal_path = wal_path
+        self._fsync = fsync
+        self._pending: dict[int, _Pending] = {}
+        # Millisecond clock start keeps acknowledgements increasing across restarts.
+        self._seq = int(time.time() * 1000)
+        # `_state` guards `_pending` and the WAL; `_io_lock` orders database writes so a
+        # flush of an older score can never land after a newer write to the same match.
+        self._state = threading.Condition()
+        self._io_lock = threading.Lock()
+        # Matches with a database write in progress: their taps wait for `_io_lock`.
+        self._writing: Counter[int] = Counter()
+        self._closed = False
+
+        self._replay_wal()
+        self._wal = self._wal_path.open("a", encoding="utf-8")
+        self._thread = threading.Thread(target=self._run, name="score-buffer", daemon=True)
+        self._thread.start()
+
+    def buffered_score(self, match_id: int) -> tuple[int, int] | None:
+        entry = self._pending.get(match_id)
+        return (entry.score1, entry.score2) if entry is not None else None
+
+    def submit(
+        self, db: Session, match_id: int, score1: int, score2: int
+    ) -> tuple[schemas.MatchRead, int | None]:
+        """Record a score tap; returns the match as readers now see it and the ack sequence.
+
+        The sequence is None when the score was written through instead of buffered.
+        """
+        with self._state:
+            entry = self._pending.get(match_id)
+            if (
+                entry is not None
+                and match_id not in self._writing
+                and crud.validate_score(score1, score2) is None
+            ):
+                # Referee, lineup and decider state cannot change while a score is buffered.
+                return self._buffer(match_id, score1, score2, entry)
+
+        with self._io_lock:
+            with self._state:
+                entry = self._pending.get(match_id)
+                self._writing[match_id] += 1
+            try:
+                if entry is None:
+                    match = crud.get_match_or_raise(db, match_id)
+                    if crud.score_can_be_deferred(match, score1, score2):
+                        base = serializers.match_to_read(match)
+                        with self._state:
+                            return self._buffer(match_id, score1, score2, None, base)
+
+                match = crud.update_score(db, match_id, score1, score2)
+                with self._state:
+                    if entry is not None:
+                        # The game is decided: this write superseded the buffered score.
+                        del self._pending[match_id]
+                        self._log({"match_id": match_id, "seq": entry.seq, "flushed": True})
+                    self._truncate_if_drained()
+                return serializers.match_to_read(match), None
+            finally:
+                with self._state:
+                    self._writing -= Counter([match_id])
+
+    def flush(self, match_ids: Iterable[int] | None = None) -> int:
+        """Write buffered scores now (all, or only `match_ids`); returns the number written."""
+        with self._io_lock:
+            return self._flush(match_ids)
+
+    @contextmanager
+    def exclusive(self, match_ids: Iterable[int]) -> Iterator[None]:
+        """Flush `match_ids` and keep new taps out until the block's own write is done.
+
+        A tap buffered between the flush and the write would be flushed later on top of
+        it, undoing the status, lineup or referee change the write made.
+        """
+        with self._io_lock:
+            self._flush(match_ids)
+            yield
+
+    def _flush(self, match_ids: Iterable[int] | None) -> int:
+        # Caller holds `_io_lock`.
+        with self._state:
+            wanted = list(self._pending) if match_ids is None else match_ids
+            entries = {
+                match_id: self._pending[match_id]
+                for match_id in wanted
+                if match_id in self._pending
+            }
+            # A tap replacing an entry mid-write would be flushed later, on top of whatever
+            # the caller writes next; those taps wait for `_io_lock` instead.
+            self._writing.update(entries.keys())
+        if not entries:
+            return 0
+
+        written = 0
+        db = self._session_factory()
+        try:
+            for match_id, entry in entries.items():
+                try:
+                    crud.update_score(db, match_id, entry.score1, entry.score2)
+                    written += 1
+                except (LookupError, ValueError) as exc:
+                    logger.warning("Dropped buffered score for match %s: %s", match_id, exc)
+
+                with self._state:
+                    del self._pending[match_id]
+                    self._log({"match_id": match_id, "seq": entry.seq, "flushed": True})
+        finally:
+            db.close()
+            with self._state:
+                self._writing -= Counter(entries.keys())
+
+        with self._state:
+            self._truncate_if_drained()
+        return written
+
+    def close(self) -> None:
+        with self._state:
+            self._closed = True
+            self._state.notify_all()
+        self._thread.join()
+        self.flush()
+        self._wal.close()
+
+    def _buffer(
+        self,
+        match_id: int,
+        score1: int,
+        score2: int,
+        previous: _Pending | None,
+        base: schemas.MatchRead | None = None,
+    ) -> tuple[schemas.MatchRead, int]:
+        # Caller holds `_state`.
+        self._seq += 1
+        entry = _Pending(
+            score1=score1,
+            score2=score2,
+            seq=self._seq,
+            deadline=previous.deadline if previous else time.monotonic() + self._window,
+            base=previous.base if previous else base,  # type: ignore[arg-type]
+        )
+        self._log({"match_id": match_id, "seq": entry.seq, "score1": score1, "score2": score2})
+        self._pending[match_id] = entry
+        if previous is None:
+            self._state.notify_all()
+
+        payload = serializers.model_dump_compat(entry.base)
+        payload.update(
+            team1_score=score1,
+            team2_score=score2,
+            team1_win_probability=win_probability.game_win_probability(score1, score2),
+        )
+        return schemas.MatchRead(**payload), entry.seq
+
+    def _log(self, record: dict[str, object]) -> None:
+        # Caller holds `_state`.
+        self._wal.write(json.dumps(record, separators=(",", ":")) + "\n")
+        self._wal.flush()
+        if self._fsync:
+            os.fsync(self._wal.fileno())
+
+    def _truncate_if_drained(self) -> None:
+        # Caller holds `_state`.
+        if not self._pending:
+            self._wal.truncate(0)
+
+    def _replay_wal(self) -> None:
+        if not self._wal_path.exists():
+            return
+
+        latest: dict[int, dict[str, int]] = {}
+        flushed: dict[int, int] = {}
+        for line in self._wal_path.read_text(encoding="utf-8").splitlines():
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # A torn final line from a crash mid-write was never acknowledged.
+                continue
+            match_id = record["match_id"]
+            self._seq = max(self._seq, record["seq"])
+            if record.get("flushed"):
+                flushed[match_id] = max(flushed.get(match_id, 0), record["seq"])
+            else:
+                latest[match_id] = record
+
+        db = self._session_factory()
+        try:
+            for match_id, record in latest.items():
+                if record["seq"] <= flushed.get(match_id, 0):
+                    continue
+                try:
+                    match = crud.get_match_or_raise(db, match_id)
+                    if crud.score_can_be_deferred(match, record["score1"], record["score2"]):
+                        crud.update_score(db, match_id, record["score1"], record["score2"])
+                except (LookupError, ValueError) as exc:
+                    logger.warning("Skipped replayed score for match %s: %s", match_id, exc)
+        finally:
+            db.close()
+
+        self._wal_path.write_text("", encoding="utf-8")
+
+    def _run(self) -> None:
+        while True:
+            with self._state:
+                while not self._closed:
+                    now = time.monotonic()
+                    next_deadline = min(
+                        (entry.deadline for entry in self._pending.values()), default=None
+                    )
+                    if next_deadline is not None and next_deadline <= now:
+                        break
+                    self._state.wait(None if next_deadline is None else next_deadline - now)
+                if self._closed:
+                    return
+                due = [
+                    match_id
+                    for match_id, entry in self._pending.items()
+                    if entry.deadline <= time.monotonic()
+                ]
+
+            try:
+                self.flush(due)
+            except Exception:
+                logger.exception("Score buffer flush failed; retrying after the next window.")
+                time.sleep(self._window)
+
+
+_buffer: ScoreBuffer | None = None
+
+
+def get_score_buffer() -> ScoreBuffer | None:
+    return _buffer
+
+
+def set_score_buffer(buffer: ScoreBuffer | None) -> None:
+    global _buffer
+    _buffer = buffer
+
+
+def configure_score_buffer(session_factory: Callable[[], Session]) -> ScoreBuffer | None:
+    window = get_window_seconds()
+    if window <= 0:
+        return None
+
+    buffer = ScoreBuffer(
+        session_factory,
+        window,
+        get_wal_path(),
+        fsync=env_flag("SCORE_BUFFER_FSYNC", "true"),
+    )
+    set_score_buffer(buffer)
+    atexit.register(buffer.close)
+    return buffer
+
+
+def buffered_score(match_id: int) -> tuple[int, int] | None:
+    buffer = _buffer
+    return buffer.buffered_score(match_id) if buffer is not None else None
+
+
+@contextmanager
+def writing_matches(match_ids: Iterable[int]) -> Iterator[None]:
+    """Commit buffered scores for `match_ids`, then run another write to those matches."""
+    buffer = _buffer
+    if buffer is None:
+        yield
+        return
+
+    with buffer.exclusive(match_ids):
+        yield
@@ -1,4 +1,4 @@
-from . import models, schemas
+from . import models, schemas, score_buffer, win_probability
 
 
 def model_dump_compat(value: object) -> dict[str, object]:
@@ -26,6 +26,8 @@ def match_to_read(match: models.Match) -> schemas.MatchRead:
 
     tie_no = match.tie.tie_no if match.tie else None
     referee_name = match.referee.name if match.referee else None
+    buffered = score_buffer.buffered_score(match.id)
+    team1_score, team2_score = buffered or (match.team1_score, match.team2_score)
 
     return schemas.MatchRead(
         id=match.id,
@@ -47,11 +49,14 @@ def match_to_read(match: models.Match) -> schemas.MatchRead:
         session=match.session,
         court=match.court,
         time=match.time,
-        team1_score=match.team1_score,
-        team2_score=match.team2_score,
+        team1_score=team1_score,
+        team2_score=team2_score,
         referee_id=match.referee_id,
         referee_name=referee_name,
         winner_side=match.winner_side,
+        team1_win_probability=win_probability.match_win_probability(
+            match, team1_score, team2_score
+        ),
     )
 
 
@@ -59,6 +64,8 @@ def tie_to_read(tie: models.Tie, matches: list[models.Match]) -> schemas.TieRead
     team1_name = tie.team1.name if tie.team1 else "TBD"
     team2_name = tie.team2.name if tie.team2 else "TBD"
     winner_team = tie.winner_team.name if tie.winner_team else None
+    match_reads = [match_to_read(match) for match in matches]
+    chances = [read.team1_win_probability or 0.0 for read in match_reads]
 
     return schemas.TieRead(
         id=tie.id,
@@ -75,7 +82,8 @@ def tie_to_read(tie: models.Tie, matches: list[models.Match]) -> schemas.TieRead
         status=tie.status,
         winner_team_id=tie.winner_team_id,
         winner_team=winner_team,
-        matches=[match_to_read(match) for match in matches],
+        team1_win_probability=win_probability.tie_probability_from(tie, matches, chances),
+        matches=match_reads,
     )
 
 
@@ -0,0 +1,282 @@
+"""Optional in-memory tournament state for single-node deployments.
+
+With `STATE_ENGINE=memory` the whole tournament (teams, ties, matches, referees and
+the final) is loaded at startup into one long-lived session whose identity map is the
+authoritative in-process state. Read routes are answered from those objects without
+touching the database. Writes go through `get_write_db`, which hands the same session
+to the unchanged `crud` write paths: the rules run against the in-memory objects and
+each commit writes them through to the database.
+
+One lock serializes readers and writers, so this is only for a single worker process;
+anything that writes behind its back (seed scripts, other workers, the score buffer)
+needs `POST /admin/state/reload`. Built payloads (standings, dashboard, lists) are kept
+until the data version moves or the state reloads, so repeated reads only pay for the
+lock.
+"""
+
+import os
+import threading
+from collections.abc import Callable, Generator, Hashable
+from typing import Any, TypeVar
+
+from fastapi import Depends, HTTPException
+from sqlalchemy import event
+from sqlalchemy.orm import Session, selectinload
+
+from . import cache, crud, models, scenarios, schemas, score_buffer, serializers
+from .database import get_db
+
+T = TypeVar("T")
+
+# Rejected requests: crud checks its rules before writing and leaves the objects loaded.
+_EXPECTED_ERRORS = (HTTPException, LookupError, ValueError)
+
+
+def get_state_engine_name() -> str:
+    value = os.getenv("STATE_ENGINE", "db").strip().lower()
+    if value not in {"db", "memory"}:
+        raise ValueError("STATE_ENGINE must be 'db' or 'memory'.")
+    return value
+
+
+class TournamentState:
+    def __init__(self, session_factory: Callable[[], Session]) -> None:
+        self._session_factory = session_factory
+        # A plain Lock: FastAPI may enter and exit `get_write_db` on different threads.
+        self._lock = threading.Lock()
+        self._db = session_factory()
+        self._teams: list[models.Team] = []
+        self._ties: list[models.Tie] = []
+        self._final_match: models.FinalMatch | None = None
+        # Payloads built for `_payloads_version`; dropped whenever the objects change.
+        self._payloads: dict[Hashable, Any] = {}
+        self._payloads_version: int | None = None
+        # A rollback expires every loaded object, so the next write reloads them.
+        self._rolled_back = False
+        event.listen(self._db, "after_rollback", self._mark_rolled_back)
+        self.reload()
+
+    def _mark_rolled_back(self, db: Session) -> None:
+        self._rolled_back = True
+
+    def reload(self) -> None:
+        with self._lock:
+            self._load()
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    def _load(self) -> None:
+        # Caller holds `_lock`. Re-running the queries repopulates the same identity map.
+        db = self._db
+        db.rollback()
+        self._rolled_back = False
+        self._payloads.clear()
+        db.query(models.Referee).all()
+        self._teams = db.query(models.Team).order_by(models.Team.name.asc()).all()
+        self._ties = (
+            db.query(models.Tie)
+            .options(
+                selectinload(models.Tie.team1),
+                selectinload(models.Tie.team2),
+                selectinload(models.Tie.winner_team),
+                selectinload(models.Tie.matches).selectinload(models.Match.team1),
+                selectinload(models.Tie.matches).selectinload(models.Match.team2),
+                selectinload(models.Tie.matches).selectinload(models.Match.referee),
+            )
+            .order_by(models.Tie.tie_no.asc())
+            .all()
+        )
+        self._final_match = self._load_final_match()
+
+    def _load_final_match(self) -> models.FinalMatch | None:
+        return (
+            self._db.query(models.FinalMatch)
+            .options(
+                selectinload(models.FinalMatch.team1),
+                selectinload(models.FinalMatch.team2),
+                selectinload(models.FinalMatch.winner_team),
+                selectinload(models.FinalMatch.matches).selectinload(models.FinalGame.referee),
+            )
+            .first()
+        )
+
+    def _memo(self, key: Hashable, build: Callable[[], T]) -> T:
+        # Caller holds `_lock`.
+        version = cache.data_version.value
+        if version != self._payloads_version:
+            self._payloads.clear()
+            self._payloads_version = version
+        if key not in self._payloads:
+            self._payloads[key] = build()
+        return self._payloads[key]
+
+    def _after_write(self) -> None:
+        # Caller holds `_lock`. crud sets tie winners by id; drop the stale relationship so
+        # it resolves again from the identity map (no SQL for an already loaded team).
+        self._teams = sorted(
+            (obj for obj in self._db.identity_map.values() if isinstance(obj, models.Team)),
+            key=lambda team: team.name,
+        )
+        for tie in self._ties:
+            self._db.expire(tie, ["winner_team"])
+
+        _, _, league_complete = crud.league_completion_from(self._ties)
+        if league_complete:
+            # Same lazy finals sync the dashboard route performs against the database.
+            standings = crud.build_standings_from(self._teams, self._ties)
+            self._final_match = crud.get_or_sync_final_match(self._db, standings)
+        elif self._final_match is not None:
+            self._final_match = self._load_final_match()
+
+    def write_session(self) -> Generator[Session, None, None]:
+        with self._lock:
+            try:
+                yield self._db
+            except BaseException as exc:
+                if self._rolled_back or not isinstance(exc, _EXPECTED_ERRORS):
+                    # The objects were expired or may be half-written: reload them in bulk.
+                    self._load()
+                raise
+            else:
+                self._payloads.clear()
+                self._after_write()
+
+    def _visible_ties(self) -> list[tuple[models.Tie, list[models.Match]]]:
+        return [
+            (tie, sorted(crud.visible_matches(tie.matches), key=lambda match: match.match_no))
+            for tie in self._ties
+        ]
+
+    def teams(self) -> list[schemas.TeamRead]:
+        with self._lock:
+            return self._memo(
+                "teams",
+                lambda: [schemas.TeamRead(id=team.id, name=team.name) for team in self._teams],
+            )
+
+    def ties(self) -> list[schemas.TieRead]:
+        with self._lock:
+            return self._memo(
+                "ties",
+                lambda: [
+                    serializers.tie_to_read(tie, matches) for tie, matches in self._visible_ties()
+                ],
+            )
+
+    def matches(
+        self,
+        status: crud.MatchStatus | None = None,
+        tie_id: int | None = None,
+    ) -> list[schemas.MatchRead]:
+        def build() -> list[schemas.MatchRead]:
+            matches = [
+                match
+                for tie in self._ties
+                if tie_id is None or tie.id == tie_id
+                for match in tie.matches
+                if status is None or match.status == status
+            ]
+            return [serializers.match_to_read(match) for match in crud.visible_matches(matches)]
+
+        with self._lock:
+            return self._memo(("matches", status, tie_id), build)
+
+    def tie_matches(self, tie_id: int) -> list[schemas.MatchRead]:
+        with self._lock:
+            if not any(tie.id == tie_id for tie in self._ties):
+                raise LookupError("Tie not found.")
+        return self.matches(tie_id=tie_id)
+
+    def _team(self, team_id: int) -> models.Team:
+        # Caller holds `_lock`.
+        team = next((team for team in self._teams if team.id == team_id), None)
+        if team is None:
+            raise LookupError("Team not found.")
+        return team
+
+    def team_fixtures(self, team_id: int) -> schemas.TeamFixtures:
+        with self._lock:
+            team = self._team(team_id)
+            return self._memo(
+                ("fixtures", team_id),
+                lambda: crud.build_team_fixtures_from(team, self._visible_ties()),
+            )
+
+    def head_to_head(self, team_a_id: int, team_b_id: int) -> schemas.HeadToHead:
+        if team_a_id == team_b_id:
+            raise ValueError("Head-to-head needs two different teams.")
+        with self._lock:
+            team_a, team_b = self._team(team_a_id), self._team(team_b_id)
+            return self._memo(
+                ("head_to_head", team_a_id, team_b_id),
+                lambda: crud.build_head_to_head_from(team_a, team_b, self._visible_ties()),
+            )
+
+    def standings(self) -> list[schemas.StandingRow]:
+        with self._lock:
+            return self._standings()
+
+    def _standings(self) -> list[schemas.StandingRow]:
+        # Caller holds `_lock`.
+        return self._memo("standings", lambda: crud.build_standings_from(self._teams, self._ties))
+
+    def scenarios(self, team_id: int) -> schemas.TeamScenarios:
+        with self._lock:
+            league = self._memo("league", lambda: scenarios.league_from(self._teams, self._ties))
+        # The search only reads the copied league, so writers need not wait for it.
+        return scenarios.league_scenarios(league, team_id)
+
+    def final_match(self) -> schemas.FinalMatchRead | None:
+        with self._lock:
+            final_match = self._final_match
+            if final_match is None:
+                return None
+            return self._memo("final_match", lambda: serializers.final_match_to_read(final_match))
+
+    def dashboard(self) -> schemas.ViewerDashboard:
+        def build() -> schemas.ViewerDashboard:
+            return crud.build_viewer_dashboard_from(
+                self._visible_ties(),
+                crud.visible_matches([match for tie in self._ties for match in tie.matches]),
+                self._standings(),
+                self._final_match,
+                crud.league_completion_from(self._ties),
+            )
+
+        with self._lock:
+            return self._memo("dashboard", build)
+
+
+_state: TournamentState | None = None
+
+
+def get_state() -> TournamentState | None:
+    return _state
+
+
+def set_state(state: TournamentState | None) -> None:
+    global _state
+    _state = state
+
+
+def configure_state_engine(session_factory: Callable[[], Session]) -> TournamentState | None:
+    if get_state_engine_name() != "memory":
+        return None
+    if score_buffer.get_score_buffer() is not None:
+        raise ValueError("STATE_ENGINE=memory cannot be combined with SCORE_BUFFER_WINDOW_MS.")
+
+    state = TournamentState(session_factory)
+    set_state(state)
+    return state
+
+
+def get_write_db(db: Session = Depends(get_db)) -> Generator[Session, None, None]:
+    """Session for write routes: the in-memory state's session when the engine is on."""
+    state = _state
+    if state is None:
+        yield db
+        return
+
+    yield from state.write_session()
@@ -0,0 +1,170 @@
+"""Database-side maintenance of tie aggregates.
+
+With `TIE_AGGREGATE_ENGINE=trigger` the `ties` aggregate columns (scores, counters,
+status and winner) are recounted by triggers on `matches` instead of by
+`crud._apply_match_delta`. The SQL mirrors `crud._recount_tie_from_matches`.
+"""
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+TRIGGER_NAME = "trg_matches_tie_aggregates"
+
+_DECIDER = "(m.match_no = 13 OR LOWER(m.discipline) LIKE '%decider%')"
+
+_TIE_COMPLETE = (
+    "(regular_total > 0 AND regular_completed = regular_total "
+    "AND (score1 <> score2 OR decider_winner_side IN (1, 2)))"
+)
+
+
+def _recount_statements(tie_id: str) -> list[str]:
+    # Only tie-stage matches count, as in `crud._recount_tie_from_matches`.
+    in_tie = f"m.tie_id = {tie_id} AND m.stage = 'tie'"
+    return [
+        f"""
+        UPDATE ties SET
+            score1 = (SELECT COUNT(*) FROM matches m WHERE {in_tie} AND m.winner_side = 1),
+            score2 = (SELECT COUNT(*) FROM matches m WHERE {in_tie} AND m.winner_side = 2),
+            regular_total = (SELECT COUNT(*) FROM matches m WHERE {in_tie} AND NOT {_DECIDER}),
+            regular_completed = (
+                SELECT COUNT(*) FROM matches m
+                WHERE {in_tie} AND NOT {_DECIDER} AND m.winner_side IN (1, 2)
+            ),
+            started_matches = (
+                SELECT COUNT(*) FROM matches m
+                WHERE {in_tie}
+                  AND (m.status = 'live' OR m.team1_score > 0 OR m.team2_score > 0)
+            ),
+            decider_winner_side = (
+                SELECT m.winner_side FROM matches m
+                WHERE {in_tie} AND {_DECIDER}
+                ORDER BY m.match_no LIMIT 1
+            )
+        WHERE id = {tie_id}
+        """,
+        f"""
+        UPDATE ties SET
+            winner_team_id = CASE
+                WHEN {_TIE_COMPLETE} THEN CASE WHEN score1 > score2 THEN team1_id ELSE team2_id END
+                ELSE NULL
+            END,
+            status = CASE
+                WHEN {_TIE_COMPLETE} THEN 'completed'
+                WHEN started_matches > 0 THEN 'live'
+                ELSE 'pending'
+            END
+        WHERE id = {tie_id}
+        """,
+    ]
+
+
+_WATCHED_COLUMNS = "winner_side, status, team1_score, team2_score, stage"
+
+
+def _sqlite_statements() -> list[str]:
+    def body(tie_id: str) -> str:
+        return ";\n".join(statement.strip() for statement in _recount_statements(tie_id)) + ";"
+
+    return [
+        f"""
+        CREATE TRIGGER {TRIGGER_NAME}_update
+        AFTER UPDATE OF {_WATCHED_COLUMNS} ON matches
+        FOR EACH ROW WHEN NEW.tie_id IS NOT NULL
+        BEGIN
+        {body("NEW.tie_id")}
+        END
+        """,
+        f"""
+        CREATE TRIGGER {TRIGGER_NAME}_insert
+        AFTER INSERT ON matches
+        FOR EACH ROW WHEN NEW.tie_id IS NOT NULL
+        BEGIN
+        {body("NEW.tie_id")}
+        END
+        """,
+        f"""
+        CREATE TRIGGER {TRIGGER_NAME}_delete
+        AFTER DELETE ON matches
+        FOR EACH ROW WHEN OLD.tie_id IS NOT NULL
+        BEGIN
+        {body("OLD.tie_id")}
+        END
+        """,
+    ]
+
+
+def _postgres_statements() -> list[str]:
+    body = ";\n".join(statement.strip() for statement in _recount_statements("target_tie_id")) + ";"
+    return [
+        f"""
+        CREATE OR REPLACE FUNCTION b7g_recount_tie(target_tie_id integer) RETURNS void AS $$
+        BEGIN
+        {body}
+        END;
+        $$ LANGUAGE plpgsql
+        """,
+        """
+        CREATE OR REPLACE FUNCTION b7g_matches_tie_aggregates() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                IF OLD.tie_id IS NOT NULL THEN
+                    PERFORM b7g_recount_tie(OLD.tie_id);
+                END IF;
+                RETURN OLD;
+            END IF;
+            IF NEW.tie_id IS NOT NULL THEN
+                PERFORM b7g_recount_tie(NEW.tie_id);
+            END IF;
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+        """,
+        f"""
+        CREATE TRIGGER {TRIGGER_NAME}
+        AFTER INSERT OR DELETE OR UPDATE OF {_WATCHED_COLUMNS} ON matches
+        FOR EACH ROW EXECUTE FUNCTION b7g_matches_tie_aggregates()
+        """,
+    ]
+
+
+def _drop_statements(dialect: str) -> list[str]:
+    if dialect == "sqlite":
+        return [
+            f"DROP TRIGGER IF EXISTS {TRIGGER_NAME}_{suffix}"
+            for suffix in ("update", "insert", "delete")
+        ]
+    if dialect == "postgresql":
+        return [
+            f"DROP TRIGGER IF EXISTS {TRIGGER_NAME} ON matches",
+            "DROP FUNCTION IF EXISTS b7g_matches_tie_aggregates()",
+            "DROP FUNCTION IF EXISTS b7g_recount_tie(integer)",
+        ]
+    return []
+
+
+def install_tie_triggers(engine: Engine) -> None:
+    dialect = engine.dialect.name
+    if dialect == "sqlite":
+        statements = _sqlite_statements()
+    elif dialect == "postgresql":
+        statements = _postgres_statements()
+    else:
+        raise ValueError(f"Tie aggregate triggers are not available for {dialect}.")
+
+    with engine.begin() as connection:
+        for statement in _drop_statements(dialect) + statements:
+            connection.execute(text(statement))
+
+
+def drop_tie_triggers(engine: Engine) -> None:
+    with engine.begin() as connection:
+        for statement in _drop_statements(engine.dialect.name):
+            connection.execute(text(statement))
+
+
+def sync_tie_triggers(engine: Engine, tie_aggregate_engine: str) -> None:
+    if tie_aggregate_engine == "trigger":
+        install_tie_triggers(engine)
+    else:
+        drop_tie_triggers(engine)
@@ -0,0 +1,196 @@
+"""Tie-break rulesets for the league table.
+
+A ruleset is an ordered list of rule names; teams level on one rule go to the next, and
+teams level on every rule stay in name order. `TIEBREAK_RULES` picks the tournament's
+ruleset as comma-separated names, e.g. `head_to_head,ties_won,games_won`. The default
+is the original order: ties won, games won, average lead, point and game difference.
+
+Rules:
+
+- `ties_won`, `tie_points` (2 per tie won), `games_won`, `points_for`;
+- `average_lead`: point difference per game played;
+- `point_difference`, `game_difference`;
+- `head_to_head`: ties won in the ties between the teams still level, as a mini-league.
+
+A ruleset is compiled once. Each run of rules between `head_to_head` entries becomes
+one key function, a tuple of the rules' small sort-value functions, so ranking costs
+one sort per run. Without `head_to_head` the whole ruleset (and the name) is one key
+and one sort.
+"""
+
+import os
+from collections.abc import Callable, Iterable
+from itertools import groupby
+from operator import attrgetter
+from typing import Any
+
+TIEBREAK_RULES = (
+    "ties_won",
+    "tie_points",
+    "games_won",
+    "average_lead",
+    "point_difference",
+    "game_difference",
+    "points_for",
+    "head_to_head",
+)
+DEFAULT_RULES = ("ties_won", "games_won", "average_lead", "point_difference", "game_difference")
+HEAD_TO_HEAD = "head_to_head"
+
+# How each rule reads on the viewer dashboard.
+_LABELS = {
+    "ties_won": "tie wins",
+    "tie_points": "tie points",
+    "games_won": "games won",
+    "average_lead": "average lead per game",
+    "point_difference": "point difference",
+    "game_difference": "game difference",
+    "points_for": "points scored",
+    "head_to_head": "head-to-head results",
+}
+
+# (winner team id, loser team id) of a completed tie.
+Meeting = tuple[int, int]
+
+
+class TeamRecord:
+    """A team's league totals, as counted by `crud.build_standings_from`."""
+
+    __slots__ = (
+        "team_id",
+        "team",
+        "ties_played",
+        "ties_won",
+        "ties_lost",
+        "tie_points",
+        "games_played",
+        "games_won",
+        "games_lost",
+        "points_for",
+        "points_against",
+    )
+
+    def __init__(self, team_id: int, team: str) -> None:
+        self.team_id = team_id
+        self.team = team
+        self.ties_played = 0
+        self.ties_won = 0
+        self.ties_lost = 0
+        self.tie_points = 0
+        self.games_played = 0
+        self.games_won = 0
+        self.games_lost = 0
+        self.points_for = 0
+        self.points_against = 0
+
+
+# Sort value of each rule (smaller ranks higher).
+_SORT_VALUES: dict[str, Callable[[TeamRecord], Any]] = {
+    "ties_won": lambda r: -r.ties_won,
+    "tie_points": lambda r: -r.tie_points,
+    "games_won": lambda r: -r.games_won,
+    "average_lead": lambda r: (r.points_against - r.points_for) / (r.games_played or 1),
+    "point_difference": lambda r: r.points_against - r.points_for,
+    "game_difference": lambda r: r.games_lost - r.games_won,
+    "points_for": lambda r: -r.points_for,
+}
+
+
+def _compile(rules: Iterable[str], with_name: bool) -> Callable[[TeamRecord], tuple[Any, ...]]:
+    values = [_SORT_VALUES[rule] for rule in rules]
+    if with_name:
+        values.append(attrgetter("team"))
+    return lambda record: tuple([value(record) for value in values])
+
+
+def _head_to_head_key(
+    group: list[TeamRecord], beaten: dict[int, list[int]]
+) -> Callable[[TeamRecord], int]:
+    members = {record.team_id for record in group}
+    wins = {
+        record.team_id: sum(1 for loser in beaten.get(record.team_id, ()) if loser in members)
+        for record in group
+    }
+    return lambda record: -wins[record.team_id]
+
+
+class Ruleset:
+    def __init__(self, rules: Iterable[str]) -> None:
+        self.rules = tuple(rules)
+        unknown = [rule for rule in self.rules if rule not in TIEBREAK_RULES]
+        if unknown:
+            raise ValueError(
+                f"Unknown tie-break rule '{unknown[0]}'; use {', '.join(TIEBREAK_RULES)}."
+            )
+        if len(set(self.rules)) != len(self.rules):
+            raise ValueError("Each tie-break rule can appear only once.")
+
+        # One key per run of rules between head-to-head steps (None).
+        self._stages: list[Callable[[TeamRecord], tuple[Any, ...]] | None] = []
+        run: list[str] = []
+        for rule in self.rules:
+            if rule == HEAD_TO_HEAD:
+                if run:
+                    self._stages.append(_compile(run, with_name=False))
+                    run = []
+                self._stages.append(None)
+            else:
+                run.append(rule)
+        if run:
+            self._stages.append(_compile(run, with_name=False))
+        self._key = _compile(self.rules, with_name=True) if HEAD_TO_HEAD not in self.rules else None
+
+    @property
+    def description(self) -> str:
+        """The ranking order in words, e.g. "tie wins, then games won"."""
+        return ", then ".join(_LABELS[rule] for rule in self.rules) or "team name"
+
+    @property
+    def uses_head_to_head(self) -> bool:
+        return self._key is None
+
+    def rank(
+        self, records: Iterable[TeamRecord], meetings: Iterable[Meeting] = ()
+    ) -> list[TeamRecord]:
+        """`records` best first; `meetings` are only read by `head_to_head`."""
+        if self._key is not None:
+            return sorted(records, key=self._key)
+
+        beaten: dict[int, list[int]] = {}
+        for winner, loser in meetings:
+            beaten.setdefault(winner, []).append(loser)
+
+        groups = [sorted(records, key=lambda record: record.team)]
+        for stage in self._stages:
+            split: list[list[TeamRecord]] = []
+            for group in groups:
+                if len(group) == 1:
+                    split.append(group)
+                    continue
+                key = stage if stage is not None else _head_to_head_key(group, beaten)
+                group.sort(key=key)
+                split.extend(list(level) for _, level in groupby(group, key=key))
+            groups = split
+        return [record for group in groups for record in group]
+
+
+def parse_rules(value: str) -> Ruleset:
+    return Ruleset(rule.strip() for rule in value.split(",") if rule.strip())
+
+
+_ruleset = Ruleset(DEFAULT_RULES)
+
+
+def get_ruleset() -> Ruleset:
+    return _ruleset
+
+
+def set_ruleset(ruleset: Ruleset) -> None:
+    global _ruleset
+    _ruleset = ruleset
+
+
+def configure_tiebreaks() -> Ruleset:
+    value = os.getenv("TIEBREAK_RULES", "").strip()
+    set_ruleset(parse_rules(value) if value else Ruleset(DEFAULT_RULES))
+    return _ruleset
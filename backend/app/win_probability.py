@@ -0,0 +1,122 @@
+"""Live win probabilities for games and ties.
+
+A game goes to 21 with deuce: from 20-all a side needs a two-point lead, and 30 wins
+outright (`crud._is_finished` uses `game_finished`, so both share one rule). With each
+rally won by side 1 at rate `r`, the chance that side 1 wins from `a`-`b` is
+
+    P[a][b] = r * P[a + 1][b] + (1 - r) * P[a][b + 1]
+
+with P = 1 or 0 on finished scores. `game_table` fills the 31x31 table once per rate, so
+reading a probability off a live score is one lookup.
+
+A tie is won on games: the side with more games after the regular games wins, and at
+6-6 Game 13 decides. `tie_win_probability` convolves the remaining regular games into the
+distribution of final game counts and adds the level share times the decider's chance.
+
+Payloads use an even rally rate: the probabilities follow the score, not team strength.
+"""
+
+from functools import lru_cache
+
+from . import models
+
+WINNING_POINTS = 21
+SCORE_CAP = 30
+EVEN_RALLY_RATE = 0.5
+
+GameTable = tuple[tuple[float, ...], ...]
+
+
+def game_finished(score1: int, score2: int) -> bool:
+    high = max(score1, score2)
+    low = min(score1, score2)
+
+    return (high >= WINNING_POINTS and (high - low) >= 2) or high == SCORE_CAP
+
+
+@lru_cache(maxsize=32)
+def game_table(rally_rate: float = EVEN_RALLY_RATE) -> GameTable:
+    """P[a][b]: chance side 1 wins the game from `a`-`b`, for every score up to the cap."""
+    if not 0.0 <= rally_rate <= 1.0:
+        raise ValueError("Rally rate must be between 0 and 1.")
+
+    size = SCORE_CAP + 1
+    table = [[0.0] * size for _ in range(size)]
+    for a in range(SCORE_CAP, -1, -1):
+        for b in range(SCORE_CAP, -1, -1):
+            if game_finished(a, b):
+                table[a][b] = 1.0 if a > b else 0.0
+            else:
+                # Unfinished scores are below the cap on both sides.
+                table[a][b] = rally_rate * table[a + 1][b] + (1.0 - rally_rate) * table[a][b + 1]
+    return tuple(tuple(row) for row in table)
+
+
+def game_win_probability(score1: int, score2: int, rally_rate: float = EVEN_RALLY_RATE) -> float:
+    if not (0 <= score1 <= SCORE_CAP and 0 <= score2 <= SCORE_CAP):
+        raise ValueError(f"Scores must be between 0 and {SCORE_CAP}.")
+    return game_table(rally_rate)[score1][score2]
+
+
+def match_win_probability(match: models.Match, score1: int, score2: int) -> float:
+    """Side 1's chance in `match` at `score1`-`score2` (the live, possibly buffered, score)."""
+    if match.winner_side in (1, 2):
+        return 1.0 if match.winner_side == 1 else 0.0
+    return game_win_probability(score1, score2)
+
+
+def tie_win_probability(
+    games1: int,
+    games2: int,
+    remaining: list[float],
+    decider: float | None = None,
+) -> float:
+    """Side 1's chance of the tie from `games1`-`games2` regular games won.
+
+    `remaining` holds side 1's chance in each regular game still to finish, and `decider`
+    its chance in Game 13 (a fresh game when None), played only if the games end level.
+    """
+    # distribution[k]: chance side 1 wins k of the remaining games.
+    distribution = [1.0]
+    for chance in remaining:
+        step = [0.0] * (len(distribution) + 1)
+        for won, weight in enumerate(distribution):
+            step[won] += weight * (1.0 - chance)
+            step[won + 1] += weight * chance
+        distribution = step
+
+    total = len(remaining)
+    ahead = level = 0.0
+    for won, weight in enumerate(distribution):
+        final1, final2 = games1 + won, games2 + total - won
+        if final1 > final2:
+            ahead += weight
+        elif final1 == final2:
+            level += weight
+    if level:
+        ahead += level * (game_win_probability(0, 0) if decider is None else decider)
+    return ahead
+
+
+def tie_probability_from(
+    tie: models.Tie, matches: list[models.Match], chances: list[float]
+) -> float | None:
+    """Side 1's chance of `tie`, given its chance in each of `matches` (in order)."""
+    if tie.status == "completed" and tie.winner_team_id in (tie.team1_id, tie.team2_id):
+        return 1.0 if tie.winner_team_id == tie.team1_id else 0.0
+    if not matches:
+        return None
+
+    games1 = games2 = 0
+    remaining: list[float] = []
+    decider: float | None = None
+    for match, chance in zip(matches, chances, strict=True):
+        if models.is_decider_match(match):
+            decider = chance
+        elif match.winner_side == 1:
+            games1 += 1
+        elif match.winner_side == 2:
+            games2 += 1
+        else:
+            remaining.append(chance)
+    return tie_win_probability(games1, games2, remaining, decider)
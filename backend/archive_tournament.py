@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+import argparse
+
+try:
+    from app.archive import archive_tournament
+    from app.database import SessionLocal
+except ModuleNotFoundError:
+    from backend.app.archive import archive_tournament
+    from backend.app.database import SessionLocal
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Archive the completed tournament and clear it from the hot tables."
+    )
+    parser.add_argument("name", help="Archive name, e.g. b7g-2025.")
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Archive even if the league or the final is not completed.",
+    )
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        meta = archive_tournament(db, args.name, force=args.force)
+    finally:
+        db.close()
+
+    tables = ", ".join(f"{table}={entry['rows']}" for table, entry in meta["tables"].items())
+    print(f"Archived {args.name} ({tables})")
@@ -0,0 +1,119 @@
+"""Benchmark: rank a 10k-team league table with the compiled tie-break rulesets.
+
+Compares the old dict-and-`int()` sort key of `build_standings_from` with compiled
+rulesets, including one that breaks ties head-to-head first.
+
+    cd backend && python -m benchmarks.rank_standings --teams 10000
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import time
+from collections.abc import Callable
+
+try:
+    from app import tiebreaks
+except ModuleNotFoundError:
+    from backend.app import tiebreaks
+
+
+def legacy_rank(table: dict[int, dict[str, int | str]]) -> list[tuple[int, dict[str, int | str]]]:
+    return sorted(
+        table.items(),
+        key=lambda item: (
+            -int(item[1]["ties_won"]),
+            -int(item[1]["games_won"]),
+            -(
+                (int(item[1]["points_for"]) - int(item[1]["points_against"]))
+                / max(1, int(item[1]["games_played"]))
+            ),
+            -(int(item[1]["points_for"]) - int(item[1]["points_against"])),
+            -(int(item[1]["games_won"]) - int(item[1]["games_lost"])),
+            str(item[1]["team"]),
+        ),
+    )
+
+
+def synthetic_league(
+    teams: int, rounds: int, seed: int
+) -> tuple[list[tiebreaks.TeamRecord], list[tiebreaks.Meeting]]:
+    rng = random.Random(seed)
+    records = [
+        tiebreaks.TeamRecord(team_id, f"Team {team_id:05d}") for team_id in range(1, teams + 1)
+    ]
+    meetings: list[tiebreaks.Meeting] = []
+    for _ in range(rounds):
+        order = list(records)
+        rng.shuffle(order)
+        # With an odd number of teams, the last one sits the round out.
+        for team1, team2 in zip(order[::2], order[1::2], strict=False):
+            games1 = rng.randint(0, 12)
+            games2 = 12 - games1
+            winner, loser = (
+                (team1, team2)
+                if games1 > games2 or (games1 == games2 and rng.random() < 0.5)
+                else (team2, team1)
+            )
+            winner.ties_won += 1
+            winner.tie_points += 2
+            loser.ties_lost += 1
+            meetings.append((winner.team_id, loser.team_id))
+            for record, won, lost in ((team1, games1, games2), (team2, games2, games1)):
+                record.ties_played += 1
+                record.games_played += 12
+                record.games_won += won
+                record.games_lost += lost
+                record.points_for += won * 21 + lost * rng.randint(8, 19)
+                record.points_against += lost * 21 + won * rng.randint(8, 19)
+    return records, meetings
+
+
+def best_of(repeat: int, run: Callable[[], object]) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time league table ranking per tie-break ruleset.")
+    parser.add_argument(
+        "--teams", type=int, default=10_000, help="Teams in the league (default: 10000)."
+    )
+    parser.add_argument("--rounds", type=int, default=9, help="Ties played per team (default: 9).")
+    parser.add_argument(
+        "--repeat", type=int, default=5, help="Runs per case; the best is reported (default: 5)."
+    )
+    parser.add_argument("--seed", type=int, default=7, help="Random seed for the synthetic league.")
+    args = parser.parse_args()
+
+    records, meetings = synthetic_league(args.teams, args.rounds, args.seed)
+    table = {
+        record.team_id: {
+            slot: getattr(record, slot)
+            for slot in tiebreaks.TeamRecord.__slots__
+            if slot != "team_id"
+        }
+        for record in records
+    }
+
+    default = tiebreaks.Ruleset(tiebreaks.DEFAULT_RULES)
+    legacy_order = [team_id for team_id, _ in legacy_rank(table)]
+    assert [record.team_id for record in default.rank(records)] == legacy_order
+
+    tie_points = tiebreaks.parse_rules("tie_points,point_difference")
+    head_to_head = tiebreaks.parse_rules("ties_won,head_to_head,games_won")
+    cases = {
+        "legacy dict key": lambda: legacy_rank(table),
+        "compiled default": lambda: default.rank(records),
+        "compiled tie points first": lambda: tie_points.rank(records),
+        "compiled head-to-head": lambda: head_to_head.rank(records, meetings),
+        "compile ruleset": lambda: tiebreaks.Ruleset(tiebreaks.DEFAULT_RULES),
+    }
+    print(f"{args.teams} teams, {len(meetings)} ties, best of {args.repeat}")
+    for name, run in cases.items():
+        print(f"{name:<28} {best_of(args.repeat, run) * 1000:>9.2f} ms")
@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+import argparse
+
+try:
+    from app.database import SessionLocal
+    from app.projection import get_simulations, project
+except ModuleNotFoundError:
+    from backend.app.database import SessionLocal
+    from backend.app.projection import get_simulations, project
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Simulate the rest of the tournament and print medal chances."
+    )
+    parser.add_argument(
+        "--simulations",
+        type=int,
+        default=get_simulations(),
+        help="Number of simulated tournaments (default: PROJECTION_SIMULATIONS).",
+    )
+    parser.add_argument(
+        "--seed", type=int, default=None, help="Random seed for a reproducible run."
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Processes to split the simulations over (default: PROJECTION_WORKERS).",
+    )
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        result = project(db, args.simulations, seed=args.seed, workers=args.workers)
+    finally:
+        db.close()
+
+    print(f"{result.simulations} simulations")
+    print(f"{'Team':<24} {'Rank':>6} {'Final':>7} {'Gold':>7} {'Silver':>7} {'Bronze':>7}")
+    for row in result.rows:
+        print(
+            f"{row.team:<24} {row.expected_rank:>6.2f} {row.finalist:>7.1%} "
+            f"{row.gold:>7.1%} {row.silver:>7.1%} {row.bronze:>7.1%}"
+        )
@@ -5,10 +5,12 @@ from datetime import datetime, timedelta
 
 try:
     from app import models
-    from app.database import Base, SessionLocal, engine
+    from app.database import TIE_AGGREGATE_ENGINE, Base, SessionLocal, engine
+    from app.tie_triggers import sync_tie_triggers
 except ModuleNotFoundError:
     from backend.app import models
-    from backend.app.database import Base, SessionLocal, engine
+    from backend.app.database import TIE_AGGREGATE_ENGINE, Base, SessionLocal, engine
+    from backend.app.tie_triggers import sync_tie_triggers
 
 TEAM_ROSTERS = {
     "Golden Monks": {
@@ -165,6 +167,7 @@ SESSION_START_TIME = {
 def reset_database() -> None:
     Base.metadata.drop_all(bind=engine)
     Base.metadata.create_all(bind=engine)
+    sync_tie_triggers(engine, TIE_AGGREGATE_ENGINE)
 
 
 def plus_minutes(time_value: str, minutes: int) -> str:
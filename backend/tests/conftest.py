@@ -0,0 +1,73 @@
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("AUTO_SEED_ON_EMPTY", "false")
+
+from app.database import Base, get_db
+from app.main import app
+from app.tie_triggers import sync_tie_triggers
+
+
+@pytest.fixture(params=["python", "trigger"])
+def tie_aggregate_engine(request):
+    # Every scenario runs against both tie aggregate engines to keep them in parity.
+    return request.param
+
+
+@pytest.fixture()
+def make_session_factory():
+    """Builds session factories for any tie aggregate engine and database URL.
+
+    The default is a shared in-memory database; a file URL gets a real pool, so every
+    thread gets its own connection.
+    """
+    engines = []
+
+    def make(tie_aggregate_engine, url="sqlite://"):
+        if url == "sqlite://":
+            engine = create_engine(
+                url, connect_args={"check_same_thread": False}, poolclass=StaticPool
+            )
+        else:
+            engine = create_engine(url, connect_args={"check_same_thread": False, "timeout": 30})
+        engines.append(engine)
+        factory = sessionmaker(
+            bind=engine,
+            autoflush=False,
+            autocommit=False,
+            expire_on_commit=False,
+            info={"tie_aggregates": tie_aggregate_engine, "tie_aggregate_verify": True},
+        )
+        Base.metadata.create_all(bind=engine)
+        sync_tie_triggers(engine, tie_aggregate_engine)
+        return factory
+
+    yield make
+    for engine in engines:
+        engine.dispose()
+
+
+@pytest.fixture()
+def session_factory(make_session_factory, tie_aggregate_engine):
+    return make_session_factory(tie_aggregate_engine)
+
+
+@pytest.fixture()
+def client(session_factory):
+    def override_get_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    with TestClient(app) as test_client:
+        yield test_client
+    app.dependency_overrides.clear()
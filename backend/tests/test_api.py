@@ -1,49 +1,33 @@
-import os
+import asyncio
+import csv
+import io
+import json
+import marshal
+import threading
+import time
 
 import pytest
-from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from fastapi import HTTPException
+from sqlalchemy import create_engine, event, inspect, text
 from sqlalchemy.pool import StaticPool
 
-os.environ.setdefault("DATABASE_URL", "sqlite://")
-os.environ.setdefault("AUTO_SEED_ON_EMPTY", "false")
-
-from app import models
-from app.database import Base, get_db
-from app.main import app
-
-
-@pytest.fixture()
-def session_factory():
-    engine = create_engine(
-        "sqlite://",
-        connect_args={"check_same_thread": False},
-        poolclass=StaticPool,
-    )
-    session_factory = sessionmaker(
-        bind=engine,
-        autoflush=False,
-        autocommit=False,
-        expire_on_commit=False,
-    )
-    Base.metadata.create_all(bind=engine)
-    return session_factory
-
-
-@pytest.fixture()
-def client(session_factory):
-    def override_get_db():
-        db = session_factory()
-        try:
-            yield db
-        finally:
-            db.close()
-
-    app.dependency_overrides[get_db] = override_get_db
-    with TestClient(app) as test_client:
-        yield test_client
-    app.dependency_overrides.clear()
+from app import (
+    archive,
+    cache,
+    database,
+    idempotency,
+    models,
+    profiling,
+    projection,
+    ratings,
+    read_replica,
+    scenarios,
+    schema_sync,
+    score_buffer,
+    state_engine,
+    tiebreaks,
+    win_probability,
+)
 
 
 def seed_match_data(session_factory):
@@ -97,6 +81,54 @@ def seed_match_data(session_factory):
         return tie_match.id
 
 
+def seed_full_tie(session_factory) -> list[int]:
+    """One pending tie with 12 regular singles matches plus the Game 13 decider."""
+    with session_factory() as db:
+        team_a = models.Team(name="Alpha")
+        team_b = models.Team(name="Bravo")
+        db.add_all([team_a, team_b])
+        db.flush()
+
+        tie = models.Tie(
+            tie_no=1,
+            day=1,
+            session="morning",
+            court=1,
+            team1_id=team_a.id,
+            team2_id=team_b.id,
+            status="pending",
+        )
+        db.add(tie)
+        db.flush()
+
+        matches = [
+            models.Match(
+                stage="tie",
+                status="pending",
+                tie_id=tie.id,
+                match_no=match_no,
+                discipline=(
+                    "Advance (Decider if tie is 6-6)"
+                    if match_no == 13
+                    else f"Game {match_no} Singles"
+                ),
+                team1_id=team_a.id,
+                team2_id=team_b.id,
+                team1_lineup=f"A{match_no}",
+                team2_lineup=f"B{match_no}",
+                day=1,
+                session="morning",
+                court=1,
+                time="09:00",
+            )
+            for match_no in range(1, 14)
+        ]
+        db.add_all(matches)
+        db.commit()
+
+        return [match.id for match in matches]
+
+
 def seed_completed_league_for_tiebreak(session_factory):
     with session_factory() as db:
         alpha = models.Team(name="Alpha")
@@ -223,6 +255,38 @@ def test_score_update_requires_referee_assignment(client, session_factory):
 
 
 
+def test_score_write_uses_single_transaction(client, session_factory):
+    tie_match_id = seed_match_data(session_factory)
+    client.post(f"/referee/assign?match_id={tie_match_id}&name=Main Umpire")
+
+    # Count the production path only; the verification recount adds its own reads.
+    session_factory.kw["info"] = {**session_factory.kw["info"], "tie_aggregate_verify": False}
+    engine = session_factory.kw["bind"]
+    statements: list[str] = []
+    commits: list[bool] = []
+
+    def record_statement(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    def record_commit(conn):
+        commits.append(True)
+
+    event.listen(engine, "before_cursor_execute", record_statement)
+    event.listen(engine, "commit", record_commit)
+    try:
+        updated = client.post(f"/matches/score/{tie_match_id}", json={"score1": 11, "score2": 9})
+    finally:
+        event.remove(engine, "before_cursor_execute", record_statement)
+        event.remove(engine, "commit", record_commit)
+
+    assert updated.status_code == 200
+    assert updated.json()["team1"] == "Alpha"
+    assert updated.json()["referee_name"] == "Main Umpire"
+    assert len(commits) == 1
+    # Tie lookup, tie row lock, the data version bump and the match update.
+    assert len(statements) <= 4
+
+
 def test_viewer_dashboard_returns_ties_only(client, session_factory):
     tie_match_id = seed_match_data(session_factory)
 
@@ -266,6 +330,12 @@ def test_final_tie_creation_and_medals(client, session_factory):
     dashboard = client.get("/viewer/dashboard")
     assert dashboard.status_code == 200
     payload = dashboard.json()
+    # Creating the final is a change; syncing it again on later reads is not.
+    version = cache.data_version.value
+    assert client.get("/viewer/dashboard").json() == payload
+    assert client.get("/finals/").status_code == 200
+    assert client.get("/viewer/dashboard").json() == payload
+    assert cache.data_version.value == version
 
     assert payload["summary"]["completed_ties"] == payload["summary"]["total_ties"] == 10
     assert payload["final_match"] is not None
@@ -333,3 +403,1253 @@ def test_final_games_counted_only_after_all_ties_completed(client, session_facto
     assert incomplete_payload["final_match"] is None
     assert incomplete_payload["summary"]["total_games"] == league_games
 
+
+
+def test_profiling_requires_flag_and_admin_token(client, session_factory, monkeypatch, tmp_path):
+    seed_completed_league_for_tiebreak(session_factory)
+
+    # Disabled by default: the flag is ignored and the normal payload is returned.
+    plain = client.get("/viewer/dashboard?profile=text", headers={"X-Admin-Token": "secret"})
+    assert plain.status_code == 200
+    assert "standings" in plain.json()
+
+    monkeypatch.setenv("PROFILING_ENABLED", "true")
+    monkeypatch.setenv("ADMIN_TOKEN", "secret")
+    monkeypatch.setenv("PROFILE_DIR", str(tmp_path))
+
+    forbidden = client.get("/viewer/dashboard?profile=text", headers={"X-Admin-Token": "wrong"})
+    assert forbidden.status_code == 200
+    assert "standings" in forbidden.json()
+
+    profiled = client.get(
+        "/viewer/dashboard", headers={"X-Admin-Token": "secret", "X-Profile": "text"}
+    )
+    assert profiled.status_code == 200
+    assert profiled.headers["x-profiled-status"] == "200"
+    assert "build_viewer_dashboard" in profiled.text
+    assert list(tmp_path.glob("*.prof"))
+
+    binary = client.get("/viewer/dashboard?profile=prof", headers={"X-Admin-Token": "secret"})
+    assert binary.status_code == 200
+    functions = {name for (_, _, name) in marshal.loads(binary.content)}
+    assert {"build_viewer_dashboard", "match_to_read", "viewer_dashboard"} <= functions
+
+
+def test_profiled_request_runs_alone():
+    events = []
+
+    async def request(gate, name, alone):
+        await (gate.enter_alone(5) if alone else gate.enter())
+        events.append(f"{name} start")
+        await asyncio.sleep(0.01)
+        events.append(f"{name} end")
+        await (gate.leave_alone() if alone else gate.leave())
+
+    async def scenario():
+        gate = profiling._RequestGate()
+        first = asyncio.create_task(request(gate, "plain", alone=False))
+        await asyncio.sleep(0)
+        profiled = asyncio.create_task(request(gate, "profiled", alone=True))
+        await asyncio.sleep(0)
+        late = asyncio.create_task(request(gate, "late", alone=False))
+        await asyncio.gather(first, profiled, late)
+
+    asyncio.run(scenario())
+    assert events == [
+        "plain start",
+        "plain end",
+        "profiled start",
+        "profiled end",
+        "late start",
+        "late end",
+    ]
+
+
+def test_profiled_request_does_not_wait_for_streams(monkeypatch):
+    monkeypatch.setenv("PROFILING_ENABLED", "true")
+    monkeypatch.setenv("ADMIN_TOKEN", "secret")
+    monkeypatch.setenv("PROFILE_DRAIN_SECONDS", "0.05")
+
+    async def app(scope, receive, send):
+        if scope["path"] != "/viewer/dashboard":
+            await release.wait()
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"{}"})
+
+    def http(path, headers=()):
+        return {
+            "type": "http",
+            "path": path,
+            "method": "GET",
+            "query_string": b"",
+            "headers": list(headers),
+        }
+
+    async def call(scope):
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        await middleware(scope, None, send)
+        return dict(sent[0]["headers"])
+
+    async def profile():
+        return await call(
+            http("/viewer/dashboard", [(b"x-profile", b"text"), (b"x-admin-token", b"secret")])
+        )
+
+    async def scenario():
+        nonlocal release
+        release = asyncio.Event()
+        # An open stream is not in the gate, so the profile runs alone right away.
+        stream = asyncio.create_task(call(http("/viewer/stream")))
+        await asyncio.sleep(0)
+        assert (await asyncio.wait_for(profile(), 2))[b"x-profile-alone"] == b"true"
+        # A slow gated request is waited for only up to the drain timeout.
+        slow = asyncio.create_task(call(http("/matches/")))
+        await asyncio.sleep(0)
+        assert (await asyncio.wait_for(profile(), 2))[b"x-profile-alone"] == b"false"
+        release.set()
+        await asyncio.gather(stream, slow)
+
+    release = None
+    middleware = profiling.ProfilingMiddleware(app)
+    asyncio.run(scenario())
+
+
+def test_tie_aggregates_follow_decider_flow_and_admin_recount(client, session_factory, monkeypatch):
+    match_ids = seed_full_tie(session_factory)
+    regular_ids, decider_id = match_ids[:12], match_ids[12]
+
+    for index, match_id in enumerate(regular_ids):
+        assert client.post(f"/referee/assign?match_id={match_id}&name=Umpire").status_code == 200
+        score = (21, 15) if index % 2 == 0 else (15, 21)
+        assert (
+            client.post(
+                f"/matches/score/{match_id}", json={"score1": score[0], "score2": score[1]}
+            ).status_code
+            == 200
+        )
+
+    # A corrected score moves the aggregates back and forth without a recount.
+    assert (
+        client.post(
+            f"/matches/score/{regular_ids[0]}", json={"score1": 10, "score2": 8}
+        ).status_code
+        == 200
+    )
+    assert client.get("/ties/").json()[0]["score1"] == 5
+    assert (
+        client.post(
+            f"/matches/score/{regular_ids[0]}", json={"score1": 21, "score2": 8}
+        ).status_code
+        == 200
+    )
+
+    tie = client.get("/ties/").json()[0]
+    assert (tie["score1"], tie["score2"], tie["status"]) == (6, 6, "live")
+    assert tie["winner_team_id"] is None
+
+    assert client.post(f"/referee/assign?match_id={decider_id}&name=Umpire").status_code == 200
+    assert (
+        client.post(f"/matches/score/{decider_id}", json={"score1": 19, "score2": 21}).status_code
+        == 200
+    )
+
+    tie = client.get("/ties/").json()[0]
+    assert (tie["score1"], tie["score2"], tie["status"]) == (6, 7, "completed")
+    assert tie["winner_team"] == "Bravo"
+
+    with session_factory() as db:
+        stored = db.query(models.Tie).one()
+        stored.score1 = 0
+        stored.status = "pending"
+        db.commit()
+        tie_id = stored.id
+
+    assert client.post("/admin/ties/recount").status_code == 403
+
+    monkeypatch.setenv("ADMIN_TOKEN", "secret")
+    repaired = client.post(f"/admin/ties/{tie_id}/recount", headers={"X-Admin-Token": "secret"})
+    assert repaired.status_code == 200
+    assert repaired.json() == {"ties_checked": 1, "repaired_tie_ids": [tie_id]}
+
+    tie = client.get("/ties/").json()[0]
+    assert (tie["score1"], tie["score2"], tie["status"]) == (6, 7, "completed")
+
+
+def test_rally_batches_fold_into_score_and_skip_replays(client, session_factory):
+    tie_match_id = seed_match_data(session_factory)
+    assert (
+        client.post(f"/referee/assign?match_id={tie_match_id}&name=Main Umpire").status_code == 200
+    )
+
+    first = [
+        {"match_id": tie_match_id, "seq": seq, "side": 1 if seq % 3 else 2} for seq in range(1, 31)
+    ]
+    response = client.post(
+        "/matches/rallies", json={"rallies": first + [{"match_id": 999, "seq": 1, "side": 1}]}
+    )
+    assert response.status_code == 200
+    results = {item["match_id"]: item for item in response.json()["results"]}
+    assert results[999]["error"] == "Match not found."
+    assert results[tie_match_id]["accepted"] == 30
+    assert results[tie_match_id]["match"]["team1_score"] == 20
+    assert results[tie_match_id]["match"]["team2_score"] == 10
+    assert results[tie_match_id]["match"]["status"] == "live"
+
+    gap = client.post(
+        "/matches/rallies", json={"rallies": [{"match_id": tie_match_id, "seq": 32, "side": 1}]}
+    )
+    assert "Rally 31 is missing" in gap.json()["results"][0]["error"]
+
+    replay = [
+        {"match_id": tie_match_id, "seq": 30, "side": 2},
+        {"match_id": tie_match_id, "seq": 31, "side": 1},
+    ]
+    finished = client.post("/matches/rallies", json={"rallies": replay}).json()["results"][0]
+    assert finished["accepted"] == 1
+    assert finished["duplicates"] == 1
+    assert finished["last_seq"] == 31
+    assert finished["match"]["status"] == "completed"
+    assert finished["match"]["winner_side"] == 1
+
+    after_game = client.post(
+        "/matches/rallies", json={"rallies": [{"match_id": tie_match_id, "seq": 32, "side": 2}]}
+    )
+    assert "already finished" in after_game.json()["results"][0]["error"]
+
+    # A retry must name the side it was recorded for, and the log owns the score.
+    conflict = client.post(
+        "/matches/rallies", json={"rallies": [{"match_id": tie_match_id, "seq": 31, "side": 2}]}
+    )
+    assert conflict.status_code == 409
+    assert "recorded for side 1" in conflict.json()["detail"]
+    both_sides = [{"match_id": tie_match_id, "seq": 32, "side": side} for side in (1, 2)]
+    assert client.post("/matches/rallies", json={"rallies": both_sides}).status_code == 409
+    absolute = client.post(f"/matches/score/{tie_match_id}", json={"score1": 21, "score2": 5})
+    assert absolute.status_code == 400
+    assert "rally log" in absolute.json()["detail"]
+
+    log = client.get(f"/matches/{tie_match_id}/rallies")
+    assert log.status_code == 200
+    assert [event["seq"] for event in log.json()] == list(range(1, 32))
+    assert client.get("/ties/").json()[0]["score1"] == 1
+
+
+def test_match_batch_applies_operations_in_order_with_per_item_results(client, session_factory):
+    match_ids = seed_full_tie(session_factory)
+    regular_ids, decider_id = match_ids[:12], match_ids[12]
+    for match_id in regular_ids:
+        assert client.post(f"/referee/assign?match_id={match_id}&name=Umpire").status_code == 200
+
+    operations = [{"op": "status", "match_id": decider_id, "status": "live"}]
+    operations += [
+        {"op": "status", "match_id": match_id, "status": "live"} for match_id in regular_ids[:2]
+    ]
+    operations += [
+        {"op": "score", "match_id": match_id, "score1": 21, "score2": 15}
+        if index % 2 == 0
+        else {"op": "score", "match_id": match_id, "score1": 15, "score2": 21}
+        for index, match_id in enumerate(regular_ids)
+    ]
+    operations += [
+        {"op": "score", "match_id": regular_ids[0], "score1": 25, "score2": 10},
+        {"op": "lineup", "match_id": regular_ids[1], "team1_lineup": " A2 ", "team2_lineup": "B2"},
+        {"op": "status", "match_id": decider_id, "status": "live"},
+        {"op": "status", "match_id": 999, "status": "live"},
+    ]
+
+    response = client.post("/matches/batch", json={"operations": operations})
+    assert response.status_code == 200
+    payload = response.json()
+    errors = {item["index"]: item["error"] for item in payload["results"] if item["error"]}
+
+    assert errors == {
+        0: "Game 13 can start only when the tie score is 6-6.",
+        15: "Score cannot go beyond 21 unless both sides have reached 20 (deuce/advantage).",
+        17: "Assign referee before setting match live.",
+        18: "Match not found.",
+    }
+    assert (payload["applied"], payload["failed"]) == (15, 4)
+    # Each item reports the match right after its own operation.
+    assert payload["results"][1]["match"]["status"] == "live"
+    assert payload["results"][3]["match"]["status"] == "completed"
+    assert payload["results"][16]["match"]["team1_lineup"] == "A2"
+
+    tie = client.get("/ties/").json()[0]
+    assert (tie["score1"], tie["score2"], tie["status"]) == (6, 6, "live")
+
+    invalid = client.post("/matches/batch", json={"operations": [{"op": "delete", "match_id": 1}]})
+    assert invalid.status_code == 422
+
+
+def test_idempotency_key_replays_stored_response_without_rewriting(client, session_factory):
+    tie_match_id = seed_match_data(session_factory)
+    headers = {"Idempotency-Key": "tap-1"}
+
+    assigned = client.post(
+        f"/referee/assign?match_id={tie_match_id}&name=Main Umpire", headers=headers
+    )
+    retried = client.post(
+        f"/referee/assign?match_id={tie_match_id}&name=Main Umpire", headers=headers
+    )
+    assert retried.status_code == 200
+    assert retried.headers["Idempotent-Replayed"] == "true"
+    assert retried.json() == assigned.json()
+
+    score_headers = {"Idempotency-Key": "tap-2"}
+    first = client.patch(
+        f"/matches/{tie_match_id}/score", json={"score1": 11, "score2": 9}, headers=score_headers
+    )
+    assert first.status_code == 200
+    assert "Idempotent-Replayed" not in first.headers
+
+    # A later correction must not be undone by a late retry of the earlier tap.
+    assert (
+        client.patch(f"/matches/{tie_match_id}/score", json={"score1": 12, "score2": 9}).status_code
+        == 200
+    )
+    replayed = client.patch(
+        f"/matches/{tie_match_id}/score", json={"score1": 11, "score2": 9}, headers=score_headers
+    )
+    assert replayed.json() == first.json()
+    assert client.get("/matches/").json()[0]["team1_score"] == 12
+
+    reused = client.patch(
+        f"/matches/{tie_match_id}/score", json={"score1": 13, "score2": 9}, headers=score_headers
+    )
+    assert reused.status_code == 409
+
+    with session_factory() as db:
+        assert db.query(models.IdempotencyKey).count() == 2
+        assert idempotency.purge_expired_keys(db, now=2**31) == 2
+
+    # The key is reserved before the write: a concurrent retry cannot run it again.
+    with session_factory() as db:
+        running = idempotency.IdempotentRequest(db, "tap-3", "same request")
+        assert running.replay() is None
+        with pytest.raises(HTTPException, match="still in progress") as in_flight:
+            idempotency.IdempotentRequest(db, "tap-3", "same request").replay()
+        assert in_flight.value.status_code == 409
+
+        # A failed request gives the key back; one whose write committed keeps it.
+        running.release()
+        retry = idempotency.IdempotentRequest(db, "tap-3", "same request")
+        assert retry.replay() is None
+        db.get(models.Match, tie_match_id).court = 2
+        db.commit()
+        retry.release()
+        assert db.get(models.IdempotencyKey, "tap-3", populate_existing=True).applied
+        with pytest.raises(HTTPException, match="was applied"):
+            idempotency.IdempotentRequest(db, "tap-3", "same request").replay()
+
+
+def test_score_buffer_coalesces_mid_game_taps_and_replays_wal(
+    client, session_factory, monkeypatch, tmp_path
+):
+    tie_match_id = seed_match_data(session_factory)
+    client.post(f"/referee/assign?match_id={tie_match_id}&name=Main Umpire")
+    client.patch(f"/matches/{tie_match_id}/status", json={"status": "live"})
+
+    wal_path = tmp_path / "score-buffer.wal"
+    buffer = score_buffer.ScoreBuffer(
+        session_factory, window_seconds=60, wal_path=wal_path, fsync=False
+    )
+    monkeypatch.setattr(score_buffer, "_buffer", buffer)
+
+    def stored_score():
+        with session_factory() as db:
+            match = db.get(models.Match, tie_match_id)
+            return match.team1_score, match.team2_score
+
+    seqs = []
+    for score1, score2 in [(18, 18), (19, 18), (19, 19), (20, 19), (20, 20), (21, 20)]:
+        response = client.patch(
+            f"/matches/{tie_match_id}/score", json={"score1": score1, "score2": score2}
+        )
+        assert response.status_code == 200
+        assert response.json()["team1_score"] == score1
+        seqs.append(int(response.headers["X-Score-Seq"]))
+
+    assert seqs == sorted(seqs)
+    assert stored_score() == (0, 0)
+    assert client.get("/matches/").json()[0]["team1_score"] == 21
+
+    # A restart after a crash replays the acknowledged score from the WAL.
+    restarted = score_buffer.ScoreBuffer(
+        session_factory, window_seconds=60, wal_path=wal_path, fsync=False
+    )
+    assert stored_score() == (21, 20)
+    buffer.close()
+    restarted.close()
+    assert wal_path.read_text() == ""
+
+    buffer = score_buffer.ScoreBuffer(
+        session_factory, window_seconds=60, wal_path=wal_path, fsync=False
+    )
+    monkeypatch.setattr(score_buffer, "_buffer", buffer)
+    assert (
+        "X-Score-Seq"
+        in client.patch(f"/matches/{tie_match_id}/score", json={"score1": 21, "score2": 21}).headers
+    )
+
+    # Another write to the match flushes it and keeps new taps out until it is done.
+    def tap():
+        with session_factory() as db:
+            buffer.submit(db, tie_match_id, 22, 21)
+
+    with score_buffer.writing_matches([tie_match_id]):
+        assert stored_score() == (21, 21)
+        tapping = threading.Thread(target=tap)
+        tapping.start()
+        tapping.join(timeout=0.1)
+        assert tapping.is_alive()
+    tapping.join(timeout=5)
+    assert buffer.buffered_score(tie_match_id) == (22, 21)
+
+    # So does a tap that lands while the flush itself is writing the buffered score.
+    update_score = score_buffer.crud.update_score
+    late_taps = []
+
+    def late_tap():
+        with session_factory() as db:
+            buffer.submit(db, tie_match_id, 22, 22)
+
+    def update_with_late_tap(db, match_id, score1, score2):
+        late = threading.Thread(target=late_tap)
+        late.start()
+        late.join(timeout=0.1)
+        late_taps.append(late)
+        return update_score(db, match_id, score1, score2)
+
+    monkeypatch.setattr(score_buffer.crud, "update_score", update_with_late_tap)
+    with score_buffer.writing_matches([tie_match_id]):
+        monkeypatch.setattr(score_buffer.crud, "update_score", update_score)
+        assert late_taps[0].is_alive()
+    late_taps[0].join(timeout=5)
+    assert stored_score() == (22, 21)
+    assert buffer.buffered_score(tie_match_id) == (22, 22)
+
+    # A decided score that fails to write keeps the buffered one, in memory and in the WAL.
+    def failing_update(db, match_id, score1, score2):
+        raise ValueError("Match is locked.")
+
+    monkeypatch.setattr(score_buffer.crud, "update_score", failing_update)
+    assert (
+        client.patch(
+            f"/matches/{tie_match_id}/score", json={"score1": 24, "score2": 22}
+        ).status_code
+        == 400
+    )
+    monkeypatch.setattr(score_buffer.crud, "update_score", update_score)
+    assert buffer.buffered_score(tie_match_id) == (22, 22)
+    assert '"flushed"' not in wal_path.read_text().splitlines()[-1]
+
+    decided = client.patch(f"/matches/{tie_match_id}/score", json={"score1": 23, "score2": 21})
+    assert "X-Score-Seq" not in decided.headers
+    assert decided.json()["status"] == "completed"
+    assert stored_score() == (23, 21)
+    assert client.get("/ties/").json()[0]["score1"] == 1
+    buffer.close()
+
+
+def test_memory_state_engine_serves_reads_without_sql(client, session_factory, monkeypatch):
+    match_ids = seed_full_tie(session_factory)
+    state = state_engine.TournamentState(session_factory)
+    monkeypatch.setattr(state_engine, "_state", state)
+
+    for index, match_id in enumerate(match_ids[:12]):
+        assert client.post(f"/referee/assign?match_id={match_id}&name=Umpire").status_code == 200
+        score = (21, 15) if index % 2 == 0 else (15, 21)
+        assert (
+            client.patch(
+                f"/matches/{match_id}/score", json={"score1": score[0], "score2": score[1]}
+            ).status_code
+            == 200
+        )
+    # A rejected write leaves the loaded objects alone instead of reloading them.
+    reloads = []
+    load = state._load
+    monkeypatch.setattr(state, "_load", lambda: (reloads.append(1), load()))
+    assert (
+        client.patch(
+            f"/matches/{match_ids[0]}/score", json={"score1": 25, "score2": 10}
+        ).status_code
+        == 400
+    )
+    assert (
+        client.patch(f"/matches/{match_ids[1]}/status", json={"status": "pending"}).status_code
+        == 400
+    )
+    assert reloads == []
+    assert state.standings() is state.standings()
+    assert (
+        client.patch(
+            f"/matches/{match_ids[0]}/score", json={"score1": 19, "score2": 21}
+        ).status_code
+        == 200
+    )
+
+    paths = [
+        "/ties/",
+        "/matches/",
+        "/matches/?status=completed",
+        "/viewer/dashboard",
+        "/viewer/standings",
+        "/schedule/",
+    ]
+    statements = []
+    bind = session_factory.kw["bind"]
+    listener = lambda *args: statements.append(args[2])  # noqa: E731
+    event.listen(bind, "before_cursor_execute", listener)
+    try:
+        from_memory = {path: client.get(path).json() for path in paths}
+    finally:
+        event.remove(bind, "before_cursor_execute", listener)
+    assert statements == []
+    assert from_memory["/ties/"][0]["score1"] == 5
+
+    monkeypatch.setattr(state_engine, "_state", None)
+    assert {path: client.get(path).json() for path in paths} == from_memory
+    state.close()
+
+
+def test_spectator_reads_use_replica_until_a_write_pins_the_client(
+    client, session_factory, monkeypatch
+):
+    tie_match_id = seed_match_data(session_factory)
+    replica_sessions = []
+
+    def replica_factory():
+        db = session_factory(info={"read_only": True})
+        replica_sessions.append(db)
+        return db
+
+    monkeypatch.setattr(database, "ReadSessionLocal", replica_factory)
+
+    assert client.get("/ties/").status_code == 200
+    assert client.get("/viewer/dashboard").status_code == 200
+    assert len(replica_sessions) == 2
+
+    assigned = client.post(f"/referee/assign?match_id={tie_match_id}&name=Main Umpire")
+    pin = assigned.headers["X-Primary-Pin"]
+    assert pin.startswith("t:")
+    assert read_replica.PRIMARY_PIN_COOKIE in assigned.cookies
+
+    # The cookie pins this client to the primary; a client without it still reads the replica.
+    assert client.get("/matches/").json()[0]["referee_name"] == "Main Umpire"
+    assert len(replica_sessions) == 2
+
+    client.cookies.clear()
+    assert client.get("/matches/").status_code == 200
+    assert len(replica_sessions) == 3
+    assert client.get("/matches/", headers={"X-Primary-Pin": pin}).status_code == 200
+    assert len(replica_sessions) == 3
+    assert not read_replica.primary_pinned("t:0")
+
+
+def test_response_cache_follows_data_version_from_other_writers(
+    client, session_factory, monkeypatch
+):
+    tie_match_id = seed_match_data(session_factory)
+    engine = session_factory.kw["bind"]
+    monkeypatch.setattr(cache, "_cache", cache.ResponseCache())
+    cache.data_version.advance(cache.read_data_version(engine))
+
+    statements: list[str] = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    assert client.get("/matches/").json()[0]["team1_score"] == 0
+    reads = len(statements)
+    assert client.get("/matches/").json()[0]["team1_score"] == 0
+    assert len(statements) == reads
+
+    # A write in this worker moves the version at commit and drops the cached payload.
+    version = client.get("/viewer/version").json()["version"]
+    client.post(f"/referee/assign?match_id={tie_match_id}&name=Main Umpire")
+    assert client.get("/viewer/version").json()["version"] != version
+    assert client.get("/matches/").json()[0]["referee_name"] == "Main Umpire"
+
+    # Another worker's commit is only seen through the listener, which wakes long-pollers.
+    version = client.get("/viewer/version").json()["version"]
+    with engine.begin() as connection:
+        connection.execute(
+            text("UPDATE matches SET team1_score = 5, status = 'live' WHERE id = :id"),
+            {"id": tie_match_id},
+        )
+        connection.execute(text("UPDATE data_version SET version = version + 1"))
+    assert client.get("/matches/").json()[0]["team1_score"] == 0
+
+    listener = cache.DataVersionListener(engine, poll_seconds=0.05)
+    try:
+        polled = client.get(f"/viewer/version?since={version}&wait=5").json()["version"]
+    finally:
+        listener.close()
+    assert polled != version
+    assert client.get("/matches/").json()[0]["team1_score"] == 5
+
+
+def test_name_keys_reject_case_and_spacing_duplicates_and_reuse_referees(client, session_factory):
+    tie_match_id = seed_match_data(session_factory)
+
+    created = client.post("/teams/", json={"name": "Delta  Squad"})
+    assert created.status_code == 201
+    assert created.json()["name"] == "Delta Squad"
+    assert client.post("/teams/", json={"name": " delta squad "}).status_code == 409
+
+    team_id = created.json()["id"]
+    player = {"name": "Dee One", "set_level": "Set-1", "team_id": team_id}
+    assert client.post("/players/", json=player).status_code == 201
+    assert client.post("/players/", json={**player, "name": "DEE  one"}).status_code == 400
+    assert client.post("/players/", json={**player, "team_id": 1}).status_code == 201
+
+    client.post(f"/referee/assign?match_id={tie_match_id}&name=Main Umpire")
+    client.post(f"/referee/assign?match_id={tie_match_id}&name=main  UMPIRE")
+    with session_factory() as db:
+        referees = db.query(models.Referee).all()
+    assert [(referee.name, referee.name_key) for referee in referees] == [
+        ("Main Umpire", "main umpire")
+    ]
+
+
+def test_schema_sync_upgrades_tables_from_older_versions():
+    def old_database(*rows):
+        engine = create_engine("sqlite://", poolclass=StaticPool)
+        with engine.begin() as connection:
+            for statement in (
+                "CREATE TABLE teams (id INTEGER PRIMARY KEY, name VARCHAR(100) NOT NULL UNIQUE)",
+                "CREATE TABLE players (id INTEGER PRIMARY KEY, name VARCHAR(100) NOT NULL,"
+                " team_id INTEGER NOT NULL)",
+                "CREATE TABLE referees (id INTEGER PRIMARY KEY, name VARCHAR(100) NOT NULL UNIQUE)",
+                "CREATE TABLE ties (id INTEGER PRIMARY KEY, team1_id INTEGER NOT NULL,"
+                " team2_id INTEGER NOT NULL)",
+                "CREATE INDEX ix_ties_team1_id ON ties (team1_id)",
+                "CREATE INDEX ix_ties_team2_id ON ties (team2_id)",
+                *rows,
+            ):
+                connection.execute(text(statement))
+        return engine
+
+    engine = old_database(
+        "INSERT INTO teams VALUES (1, 'Golden  Monks'), (2, 'Alpha')",
+        "INSERT INTO players VALUES (1, 'Ana', 1), (2, 'ANA', 2)",
+        "INSERT INTO referees VALUES (1, 'Main Umpire')",
+    )
+    schema_sync.sync_schema(engine)
+    schema_sync.sync_schema(engine)
+    with engine.connect() as connection:
+        assert connection.execute(
+            text("SELECT name_key FROM teams ORDER BY id")
+        ).scalars().all() == ["golden monks", "alpha"]
+        assert connection.execute(
+            text("SELECT name_key FROM players ORDER BY id")
+        ).scalars().all() == ["ana", "ana"]
+        assert (
+            connection.execute(text("SELECT name_key FROM referees")).scalar_one() == "main umpire"
+        )
+    assert {index["name"] for index in inspect(engine).get_indexes("ties")} == {
+        "ix_ties_team1_team2",
+        "ix_ties_team2_team1",
+    }
+    assert {
+        index["name"] for index in inspect(engine).get_indexes("players") if index["unique"]
+    } == {"uq_player_name_key_team"}
+
+    clashing = old_database("INSERT INTO referees VALUES (1, 'Main Umpire'), (2, 'main  umpire')")
+    with pytest.raises(RuntimeError, match="referees.*main umpire"):
+        schema_sync.sync_schema(clashing)
+    assert "name_key" not in {
+        column["name"] for column in inspect(clashing).get_columns("referees")
+    }
+
+
+def test_bulk_import_validates_every_row_then_inserts_in_one_transaction(
+    client, session_factory, monkeypatch
+):
+    seed_match_data(session_factory)
+    monkeypatch.setenv("ADMIN_TOKEN", "secret")
+    headers = {"X-Admin-Token": "secret"}
+
+    rejected = client.post(
+        "/admin/import",
+        headers=headers,
+        json={
+            "teams": [{"name": "Echo"}, {"name": "alpha"}],
+            "players": [{"name": "E1", "set_level": "Set-9", "team": "Echo"}],
+            "ties": [
+                {
+                    "tie_no": 7,
+                    "day": 2,
+                    "session": "morning",
+                    "court": 1,
+                    "team1": "Echo",
+                    "team2": "Zulu",
+                }
+            ],
+        },
+    )
+    assert rejected.status_code == 400
+    assert [(error["section"], error["index"]) for error in rejected.json()["errors"]] == [
+        ("teams", 1),
+        ("players", 0),
+        ("ties", 0),
+    ]
+    assert all(team["name"] != "Echo" for team in client.get("/teams/").json())
+
+    sheet = "\n".join(
+        [
+            "section,name,team,set_level,tie_no,day,session,court,team1,team2,match_no,discipline",
+            "teams,Echo,,,,,,,,,,",
+            "teams,Foxtrot,,,,,,,,,,",
+            "players,E1,Echo,Set-1,,,,,,,,",
+            "players,F1,foxtrot,Set-2,,,,,,,,",
+            "ties,,,,7,2,morning,1,Echo,Foxtrot,,",
+            "ties,,,,8,2,morning,2,Alpha,echo,,",
+            "match_templates,,,,,,,,,,1,Set 1 / Set 1",
+            "match_templates,,,,,,,,,,13,Decider",
+        ]
+    )
+    imported = client.post(
+        "/admin/import", headers={**headers, "Content-Type": "text/csv"}, content=sheet
+    )
+    assert imported.status_code == 200
+    assert imported.json() == {
+        "imported": True,
+        "teams": 2,
+        "players": 2,
+        "ties": 2,
+        "matches": 4,
+        "errors": [],
+    }
+
+    ties = {tie["tie_no"]: tie for tie in client.get("/ties/").json()}
+    assert (ties[8]["team1"], ties[8]["team2"], ties[8]["status"]) == ("Alpha", "Echo", "pending")
+    matches = client.get(f"/ties/{ties[7]['id']}/matches").json()
+    assert [(match["match_no"], match["time"]) for match in matches] == [(1, "09:30")]
+    assert client.post("/admin/import", json={"teams": [{"name": "Echo"}]}).status_code == 403
+
+
+def test_exports_stream_matches_ties_and_standings(client, session_factory):
+    tie_match_id = seed_match_data(session_factory)
+    client.post(f"/referee/assign?match_id={tie_match_id}&name=Main Umpire")
+    client.post(f"/matches/score/{tie_match_id}", json={"score1": 21, "score2": 17})
+
+    exported = client.get("/export/matches")
+    assert exported.headers["content-type"] == "application/x-ndjson"
+    rows = [json.loads(line) for line in exported.text.splitlines()]
+    assert len(rows) == len(client.get("/matches/").json())
+    assert rows[0]["team1"] == "Alpha"
+    assert (rows[0]["team1_score"], rows[0]["winner_side"], rows[0]["referee"]) == (
+        21,
+        1,
+        "Main Umpire",
+    )
+
+    ties = list(csv.DictReader(io.StringIO(client.get("/export/ties?format=csv").text)))
+    assert ties[0]["tie_no"] == "1"
+    assert (ties[0]["score1"], ties[0]["score2"]) == ("1", "0")
+
+    standings = [json.loads(line) for line in client.get("/export/standings").text.splitlines()]
+    assert [row["team"] for row in standings] == [
+        row["team"] for row in client.get("/viewer/standings").json()
+    ]
+    assert client.get("/export/final_games?format=csv").text.startswith("id,match_no,")
+    assert client.get("/export/players").status_code == 422
+
+
+def test_archive_moves_tournament_to_columnar_files(client, session_factory, monkeypatch, tmp_path):
+    tie_match_id = seed_match_data(session_factory)
+    client.post(f"/referee/assign?match_id={tie_match_id}&name=Main Umpire")
+    client.post(f"/matches/score/{tie_match_id}", json={"score1": 21, "score2": 17})
+    expected_matches = [
+        json.loads(line) for line in client.get("/export/matches").text.splitlines()
+    ]
+    monkeypatch.setenv("ARCHIVE_DIR", str(tmp_path))
+
+    (tmp_path / ".league-2025.tmp").mkdir()
+    with session_factory() as db:
+        with pytest.raises(ValueError, match="completed tournament"):
+            archive.archive_tournament(db, "league-2025")
+        meta = archive.archive_tournament(db, "league-2025", force=True)
+    assert meta["tables"]["matches"]["rows"] == len(expected_matches)
+
+    assert client.get("/ties/").json() == []
+    assert client.get("/matches/").json() == []
+    assert [entry["name"] for entry in client.get("/archives/").json()] == ["league-2025"]
+    assert client.get("/archives/league-2025/matches").json() == expected_matches
+    scores = client.get("/archives/league-2025/matches?columns=match_no,team1_score").json()
+    assert scores[0] == {"match_no": 1, "team1_score": 21}
+    assert client.get("/archives/league-2024/matches").status_code == 404
+
+
+def test_confirmed_lineups_resolve_to_match_players(client, session_factory, monkeypatch):
+    tie_match_id = seed_match_data(session_factory)
+    with session_factory() as db:
+        players = {player.name: player.id for player in db.query(models.Player).all()}
+
+    client.post(f"/referee/assign?match_id={tie_match_id}&name=Main Umpire")
+    played = client.get(f"/players/{players['A1']}/matches").json()
+    assert [match["id"] for match in played] == [tie_match_id]
+
+    client.patch(
+        f"/matches/{tie_match_id}/lineup", json={"team1_lineup": "a2", "team2_lineup": "Guest"}
+    )
+    with session_factory() as db:
+        rows = [(row.player_id, row.side) for row in db.query(models.MatchPlayer).all()]
+    assert rows == [(players["A2"], 1)]
+    assert client.get(f"/players/{players['A1']}/matches").json() == []
+    assert client.get("/players/999/matches").status_code == 404
+
+    with session_factory() as db:
+        db.query(models.MatchPlayer).delete()
+        db.commit()
+    monkeypatch.setenv("ADMIN_TOKEN", "secret")
+    rebuilt = client.post("/admin/match-players/rebuild", headers={"X-Admin-Token": "secret"})
+    assert rebuilt.json() == {"rows": 1}
+
+
+def test_player_stats_and_leaderboard_follow_completed_matches(
+    client, session_factory, monkeypatch
+):
+    tie_match_id = seed_match_data(session_factory)
+    with session_factory() as db:
+        players = {player.name: player.id for player in db.query(models.Player).all()}
+
+    client.post(f"/referee/assign?match_id={tie_match_id}&name=Main Umpire")
+    client.post(f"/matches/score/{tie_match_id}", json={"score1": 22, "score2": 20})
+
+    stats = client.get(f"/players/{players['A1']}/stats").json()
+    assert stats["totals"] == {
+        "discipline": "all",
+        "played": 1,
+        "wins": 1,
+        "losses": 0,
+        "win_rate": 1.0,
+        "points_for": 22,
+        "points_against": 20,
+        "deuce_games": 1,
+    }
+    assert [line["discipline"] for line in stats["disciplines"]] == ["Set-1 Singles"]
+    assert client.get(f"/players/{players['B1']}/stats").json()["totals"]["losses"] == 1
+    assert client.get(f"/players/{players['A2']}/stats").json()["totals"]["played"] == 0
+    assert client.get("/players/999/stats").status_code == 404
+
+    leaderboard = client.get("/players/leaderboard").json()
+    assert [(row["rank"], row["player"], row["wins"]) for row in leaderboard] == [
+        (1, "A1", 1),
+        (2, "B1", 0),
+    ]
+    assert client.get("/players/leaderboard?set_level=Set-2").json() == []
+
+    # Correcting the score flips the result and the aggregates follow.
+    client.post(f"/matches/score/{tie_match_id}", json={"score1": 15, "score2": 21})
+    leaderboard = client.get("/players/leaderboard?discipline=Set-1 Singles").json()
+    assert [(row["player"], row["wins"], row["losses"]) for row in leaderboard] == [
+        ("B1", 1, 0),
+        ("A1", 0, 1),
+    ]
+
+    with session_factory() as db:
+        db.query(models.PlayerStat).delete()
+        db.commit()
+    monkeypatch.setenv("ADMIN_TOKEN", "secret")
+    client.post("/admin/match-players/rebuild", headers={"X-Admin-Token": "secret"})
+    assert client.get("/players/leaderboard?discipline=Set-1 Singles").json() == leaderboard
+
+
+def test_team_fixtures_and_head_to_head(client, session_factory, monkeypatch):
+    match_ids = seed_full_tie(session_factory)
+    with session_factory() as db:
+        teams = {team.name: team.id for team in db.query(models.Team).all()}
+        db.add(models.Team(name="Charlie"))
+        db.commit()
+        teams["Charlie"] = db.query(models.Team).filter(models.Team.name == "Charlie").one().id
+
+    for index, match_id in enumerate(match_ids):
+        client.post(f"/referee/assign?match_id={match_id}&name=Umpire")
+        score = (21, 15) if index % 2 == 0 else (15, 21)
+        if match_id == match_ids[-1]:
+            score = (21, 18)
+        assert (
+            client.patch(
+                f"/matches/{match_id}/score", json={"score1": score[0], "score2": score[1]}
+            ).status_code
+            == 200
+        )
+
+    fixtures = client.get(f"/teams/{teams['Bravo']}/fixtures").json()
+    assert fixtures["team"] == {"id": teams["Bravo"], "name": "Bravo"}
+    assert [(tie["tie_no"], len(tie["matches"])) for tie in fixtures["ties"]] == [(1, 13)]
+    assert client.get(f"/teams/{teams['Charlie']}/fixtures").json()["ties"] == []
+    assert client.get("/teams/999/fixtures").status_code == 404
+
+    record = client.get(f"/teams/{teams['Bravo']}/vs/{teams['Alpha']}").json()
+    assert {
+        key: value for key, value in record.items() if key not in {"team_a", "team_b", "ties"}
+    } == {
+        "ties_played": 1,
+        "team_a_ties_won": 0,
+        "team_b_ties_won": 1,
+        "team_a_games_won": 6,
+        "team_b_games_won": 7,
+        "team_a_points": 234,
+        "team_b_points": 237,
+    }
+    assert [tie["tie_no"] for tie in record["ties"]] == [1]
+    assert client.get(f"/teams/{teams['Alpha']}/vs/{teams['Charlie']}").json()["ties"] == []
+    assert client.get(f"/teams/{teams['Alpha']}/vs/{teams['Alpha']}").status_code == 400
+    assert client.get(f"/teams/{teams['Alpha']}/vs/999").status_code == 404
+
+    state = state_engine.TournamentState(session_factory)
+    monkeypatch.setattr(state_engine, "_state", state)
+    assert client.get(f"/teams/{teams['Bravo']}/fixtures").json() == fixtures
+    assert client.get(f"/teams/{teams['Bravo']}/vs/{teams['Alpha']}").json() == record
+    state.close()
+
+
+def test_scenarios_report_clinched_and_open_qualification(client, session_factory, monkeypatch):
+    with session_factory() as db:
+        teams = {name: models.Team(name=name) for name in ("Alpha", "Bravo", "Charlie", "Delta")}
+        db.add_all(teams.values())
+        db.flush()
+        fixtures = [
+            ("Alpha", "Bravo", "Alpha"),
+            ("Alpha", "Charlie", "Alpha"),
+            ("Bravo", "Charlie", "Bravo"),
+            ("Alpha", "Delta", None),
+            ("Bravo", "Delta", None),
+            ("Charlie", "Delta", None),
+        ]
+        for tie_no, (team1, team2, winner) in enumerate(fixtures, start=1):
+            tie = models.Tie(
+                tie_no=tie_no,
+                day=1,
+                session="morning",
+                court=1,
+                team1_id=teams[team1].id,
+                team2_id=teams[team2].id,
+                status="completed" if winner else "pending",
+                winner_team_id=teams[winner].id if winner else None,
+            )
+            db.add(tie)
+            db.flush()
+            if winner is None:
+                db.add(
+                    models.Match(
+                        tie_id=tie.id,
+                        match_no=1,
+                        discipline="Game 1 Singles",
+                        team1_id=tie.team1_id,
+                        team2_id=tie.team2_id,
+                        team1_lineup="TBD",
+                        team2_lineup="TBD",
+                        day=1,
+                        session="morning",
+                        court=1,
+                        time="09:00",
+                    )
+                )
+        db.commit()
+        ids = {name: team.id for name, team in teams.items()}
+
+    alpha = client.get(f"/viewer/scenarios/{ids['Alpha']}").json()
+    assert (alpha["rank"], alpha["remaining_ties"], alpha["finalist"], alpha["top_three"]) == (
+        1,
+        1,
+        "possible",
+        "clinched",
+    )
+    assert [
+        (row["wins"], row["best_rank"], row["worst_rank"], row["finalist"])
+        for row in alpha["by_wins"]
+    ] == [
+        (0, 1, 3, "possible"),
+        (1, 1, 1, "clinched"),
+    ]
+    assert alpha["summary"] == (
+        "Reaches a place in the final with 1 more tie win; other results can still carry it there. "
+        "Already sure of the top three."
+    )
+
+    charlie = client.get(f"/viewer/scenarios/{ids['Charlie']}").json()
+    assert [(row["wins"], row["finalist"]) for row in charlie["by_wins"]] == [
+        (0, "eliminated"),
+        (1, "possible"),
+    ]
+    assert charlie["summary"].startswith(
+        "Needs 1 more tie win and help from other results to reach a place"
+    )
+    assert client.get("/viewer/scenarios/999").status_code == 404
+    # Scenarios search over tie wins; a ruleset that ranks on something else first is refused.
+    monkeypatch.setattr(tiebreaks, "_ruleset", tiebreaks.parse_rules("points_for,ties_won"))
+    assert client.get(f"/viewer/scenarios/{ids['Alpha']}").status_code == 400
+    monkeypatch.setattr(tiebreaks, "_ruleset", tiebreaks.parse_rules("tie_points"))
+    by_name = client.get(f"/viewer/scenarios/{ids['Alpha']}").json()
+    assert by_name["rank"] == 1
+    monkeypatch.setattr(tiebreaks, "_ruleset", tiebreaks.Ruleset(tiebreaks.DEFAULT_RULES))
+
+    state = state_engine.TournamentState(session_factory)
+    monkeypatch.setattr(state_engine, "_state", state)
+    search = scenarios.league_scenarios
+
+    def unlocked_search(league, team_id):
+        # The search runs after the state lock is released.
+        assert state._lock.acquire(blocking=False)
+        state._lock.release()
+        return search(league, team_id)
+
+    monkeypatch.setattr(scenarios, "league_scenarios", unlocked_search)
+    assert client.get(f"/viewer/scenarios/{ids['Alpha']}").json() == alpha
+    state.close()
+
+
+def test_projection_simulates_remaining_games_and_medals(client, session_factory, monkeypatch):
+    tie_match_id = seed_match_data(session_factory)
+    client.post(f"/referee/assign?match_id={tie_match_id}&name=Main Umpire")
+    client.post(f"/matches/score/{tie_match_id}", json={"score1": 21, "score2": 17})
+
+    result = client.get("/viewer/projection?simulations=2000").json()
+    assert result["simulations"] == 2000
+    rows = {row["team"]: row for row in result["rows"]}
+    # The league is over: the table is fixed and only the final is left to chance.
+    assert [row["team"] for row in result["rows"]] == ["Alpha", "Charlie", "Bravo"]
+    assert [row["team"] for row in client.get("/viewer/standings").json()] == [
+        "Alpha",
+        "Charlie",
+        "Bravo",
+    ]
+    assert (rows["Alpha"]["finalist"], rows["Charlie"]["finalist"], rows["Bravo"]["bronze"]) == (
+        1.0,
+        1.0,
+        1.0,
+    )
+    assert round(rows["Alpha"]["gold"] + rows["Charlie"]["gold"], 4) == 1.0
+    assert rows["Alpha"]["gold"] > rows["Charlie"]["gold"]
+    assert rows["Alpha"]["gold"] == rows["Charlie"]["silver"]
+    with session_factory() as db:
+        assert projection.project(db, 2000, seed=7) == projection.project(db, 2000, seed=7)
+    assert client.get("/viewer/projection?simulations=10").status_code == 422
+    too_many = projection.MAX_PUBLIC_SIMULATIONS + 1
+    assert client.get(f"/viewer/projection?simulations={too_many}").status_code == 422
+
+    service = projection.ProjectionService(session_factory, simulations=500, workers=1)
+    monkeypatch.setattr(projection, "_service", service)
+    try:
+        latest = client.get("/viewer/projection").json()
+        assert latest["simulations"] == 500
+        assert latest["data_version"] == cache.data_version.value
+        client.post(f"/matches/score/{tie_match_id}", json={"score1": 17, "score2": 21})
+        # Readers keep the last projection until the background thread has rerun it.
+        deadline = time.monotonic() + 10
+        updated = client.get("/viewer/projection").json()
+        while updated["data_version"] != cache.data_version.value and time.monotonic() < deadline:
+            time.sleep(0.01)
+            updated = client.get("/viewer/projection").json()
+        assert updated["data_version"] == cache.data_version.value != latest["data_version"]
+        assert updated["rows"][0]["team"] == "Bravo"
+    finally:
+        service.close()
+
+
+def test_win_probability_follows_scores_through_the_decider(client, session_factory):
+    assert win_probability.game_win_probability(0, 0) == 0.5
+    assert win_probability.game_win_probability(20, 20) == 0.5
+    assert win_probability.game_win_probability(29, 28) == 0.75
+    assert win_probability.game_win_probability(20, 0) == 1.0 - 0.5**21
+    strong, weak = (win_probability.game_win_probability(0, 0, rate) for rate in (0.6, 0.4))
+    assert strong > 0.9 and round(strong + weak, 9) == 1.0
+    # Level after the regular games: the decider settles it.
+    assert win_probability.tie_win_probability(6, 5, [0.5]) == 0.75
+    assert win_probability.tie_win_probability(6, 6, [], decider=0.25) == 0.25
+
+    match_ids = seed_full_tie(session_factory)
+    for index, match_id in enumerate(match_ids[:12]):
+        client.post(f"/referee/assign?match_id={match_id}&name=Umpire")
+        score = (20, 20) if index == 11 else (21, 15) if index % 2 == 0 else (15, 21)
+        client.post(f"/matches/score/{match_id}", json={"score1": score[0], "score2": score[1]})
+
+    tie = client.get("/ties/").json()[0]
+    assert (tie["score1"], tie["score2"]) == (6, 5)
+    assert [match["team1_win_probability"] for match in tie["matches"][:2]] == [1.0, 0.0]
+    assert tie["matches"][11]["team1_win_probability"] == 0.5
+    assert tie["team1_win_probability"] == 0.75
+
+    client.post(f"/matches/score/{match_ids[11]}", json={"score1": 21, "score2": 23})
+    tie = client.get("/ties/").json()[0]
+    assert tie["team1_win_probability"] == 0.5
+    decider_id = match_ids[12]
+    client.post(f"/referee/assign?match_id={decider_id}&name=Umpire")
+    client.post(f"/matches/score/{decider_id}", json={"score1": 21, "score2": 19})
+    tie = client.get("/ties/").json()[0]
+    assert (tie["status"], tie["team1_win_probability"]) == ("completed", 1.0)
+
+
+def test_ratings_update_incrementally_and_recompute_in_one_pass(
+    client, session_factory, monkeypatch
+):
+    singles_id = seed_match_data(session_factory)
+    with session_factory() as db:
+        players = {player.name: player.id for player in db.query(models.Player).all()}
+        singles = db.get(models.Match, singles_id)
+        doubles = models.Match(
+            stage="tie",
+            status="pending",
+            tie_id=singles.tie_id,
+            match_no=2,
+            discipline="Set-1 Doubles",
+            team1_id=singles.team1_id,
+            team2_id=singles.team2_id,
+            team1_lineup="A1/A2",
+            team2_lineup="B1/B2",
+            day=1,
+            session="morning",
+            court=1,
+            time="09:15",
+        )
+        db.add(doubles)
+        db.commit()
+        doubles_id = doubles.id
+
+    for match_id in (singles_id, doubles_id):
+        client.post(f"/referee/assign?match_id={match_id}&name=Umpire")
+    client.post(f"/matches/score/{singles_id}", json={"score1": 21, "score2": 15})
+    a1 = client.get(f"/players/{players['A1']}/rating").json()
+    assert (a1["rating"], a1["games"], [point["delta"] for point in a1["history"]]) == (
+        1516.0,
+        1,
+        [16.0],
+    )
+
+    client.post(f"/matches/score/{doubles_id}", json={"score1": 18, "score2": 21})
+    a1 = client.get(f"/players/{players['A1']}/rating").json()
+    # Side 1 plays at (1516 + 1500) / 2 against (1484 + 1500) / 2.
+    loss = 32 * ratings.expected_score(1508, 1492)
+    assert round(a1["rating"], 6) == round(1516 - loss, 6)
+    assert [(pair["partner"], pair["rating"]) for pair in a1["partners"]] == [("A2", 1484.0)]
+    board = client.get("/players/ratings").json()
+    assert [row["player"] for row in board] == ["B2", "B1", "A1", "A2"]
+    assert client.get("/players/ratings?set_level=Set-2").json() == []
+    levels = client.get("/players/ratings/set-levels").json()
+    assert [(level["set_level"], level["players"], level["rated_players"]) for level in levels] == [
+        ("Set-1", 4, 4)
+    ]
+    assert round(levels[0]["mean_rating"], 6) == 1500.0
+    assert client.get("/players/999/rating").status_code == 404
+
+    # The vectorized replay matches the match-by-match updates.
+    incremental = {
+        name: client.get(f"/players/{player_id}/rating").json()
+        for name, player_id in players.items()
+    }
+    monkeypatch.setenv("ADMIN_TOKEN", "secret")
+    result = client.post("/admin/ratings/recompute", headers={"X-Admin-Token": "secret"}).json()
+    assert (result["games"], result["players"], result["pairs"]) == (2, 4, 2)
+    for name, player_id in players.items():
+        replayed = client.get(f"/players/{player_id}/rating").json()
+        assert round(replayed["rating"], 9) == round(incremental[name]["rating"], 9)
+        assert replayed["history"] == incremental[name]["history"]
+
+    # Flipping a result gives back its changes and rates it again as the latest game.
+    client.post(f"/matches/score/{singles_id}", json={"score1": 15, "score2": 21})
+    history = client.get(f"/players/{players['B1']}/rating").json()["history"]
+    assert [(point["match_id"], point["delta"] > 0) for point in history] == [
+        (doubles_id, True),
+        (singles_id, True),
+    ]
+
+    # A replay puts games back in schedule order.
+    client.post("/admin/ratings/recompute", headers={"X-Admin-Token": "secret"})
+    history = client.get(f"/players/{players['B1']}/rating").json()["history"]
+    assert [point["match_id"] for point in history] == [singles_id, doubles_id]
+
+    # Other parameters are only previewed: live updates keep using RATING_K.
+    assert (
+        client.post(
+            "/admin/ratings/recompute?k=16", headers={"X-Admin-Token": "secret"}
+        ).status_code
+        == 400
+    )
+    preview = client.post(
+        "/admin/ratings/recompute?k=16&dry_run=true", headers={"X-Admin-Token": "secret"}
+    ).json()
+    assert (preview["dry_run"], preview["k_factor"], len(preview["ratings"])) == (True, 16.0, 6)
+    previewed = {(row["player_id"], row["partner_id"]): row["rating"] for row in preview["ratings"]}
+    b1 = client.get(f"/players/{players['B1']}/rating").json()
+    # B1 won both games, so a smaller K gains less; nothing was written.
+    assert 1500 < previewed[(players["B1"], players["B1"])] < b1["rating"]
+    assert b1["history"] == history
+
+
+def test_tiebreak_rulesets_reorder_standings(client, session_factory, monkeypatch):
+    seed_completed_league_for_tiebreak(session_factory)
+    default = [row["team"] for row in client.get("/viewer/standings").json()]
+    assert default == ["Alpha", "Bravo", "Charlie", "Delta", "Echo"]
+
+    monkeypatch.setattr(tiebreaks, "_ruleset", tiebreaks.parse_rules("points_for, ties_won"))
+    highlights = client.get("/viewer/dashboard").json()["rule_highlights"]
+    assert "Ranking order: points scored, then tie wins." in highlights
+    rows = client.get("/viewer/standings").json()
+    assert [(row["team"], row["points_for"]) for row in rows] == [
+        ("Alpha", 243),
+        ("Bravo", 242),
+        ("Echo", 218),
+        ("Charlie", 212),
+        ("Delta", 196),
+    ]
+
+    # Level on ties won, Bravo won the meeting but Alpha won more games.
+    alpha, bravo = tiebreaks.TeamRecord(1, "Alpha"), tiebreaks.TeamRecord(2, "Bravo")
+    alpha.ties_won = bravo.ties_won = 1
+    alpha.games_won = 5
+    head_to_head = tiebreaks.Ruleset(["ties_won", "head_to_head", "games_won"])
+    assert [record.team for record in head_to_head.rank([alpha, bravo], [(2, 1)])] == [
+        "Bravo",
+        "Alpha",
+    ]
+    assert [record.team for record in head_to_head.rank([alpha, bravo])] == ["Alpha", "Bravo"]
+    assert [record.team for record in tiebreaks.Ruleset([]).rank([bravo, alpha])] == [
+        "Alpha",
+        "Bravo",
+    ]
+
+    with pytest.raises(ValueError, match="Unknown tie-break rule 'coin_toss'"):
+        tiebreaks.parse_rules("ties_won,coin_toss")
+    with pytest.raises(ValueError, match="only once"):
+        tiebreaks.parse_rules("ties_won,ties_won")
+
+
+def test_schedule_is_grouped_once_per_data_version(client, session_factory, monkeypatch):
+    tie_match_id = seed_match_data(session_factory)
+    engine = session_factory.kw["bind"]
+    # The schedule keeps its encoded bytes without the opt-in response cache.
+    monkeypatch.setattr(cache, "_cache", None)
+    cache.data_version.advance(cache.read_data_version(engine))
+
+    statements: list[str] = []
+
+    def record(*args):
+        statements.append(args[2])
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        response = client.get("/schedule/")
+        assert response.headers["content-type"] == "application/json"
+        assert [match["id"] for match in response.json()["1"]["morning"]] == [tie_match_id]
+        reads = len(statements)
+        assert client.get("/schedule/").content == response.content
+        assert len(statements) == reads
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+    by_court = client.get("/schedule/?group_by=court").json()
+    assert list(by_court["1"]["morning"]) == ["1"]
+    assert by_court["1"]["morning"]["1"] == response.json()["1"]["morning"]
+    assert client.get("/schedule/?group_by=referee").status_code == 422
+    documented = client.get("/openapi.json").json()["paths"]["/schedule/"]["get"]["responses"][
+        "200"
+    ]
+    assert "MatchRead" in json.dumps(documented["content"]["application/json"]["schema"])
+
+    client.post(f"/referee/assign?match_id={tie_match_id}&name=Main Umpire")
+    assert client.get("/schedule/").json()["1"]["morning"][0]["referee_name"] == "Main Umpire"
@@ -0,0 +1,140 @@
+import threading
+
+import pytest
+
+from app import crud, models
+
+MATCHES_PER_TIE = 12
+
+
+@pytest.fixture()
+def file_session_factory(make_session_factory, tmp_path, tie_aggregate_engine):
+    # A file database with a real pool, so every thread gets its own connection.
+    return make_session_factory(tie_aggregate_engine, f"sqlite:///{tmp_path / 'courts.db'}")
+
+
+def seed_courts(factory, courts: int) -> dict[int, list[int]]:
+    """One tie per court, each with 12 regular singles matches and a referee assigned."""
+    with factory() as db:
+        referee = models.Referee(name="Court Umpire")
+        db.add(referee)
+        ties: dict[int, list[models.Match]] = {}
+        for court in range(1, courts + 1):
+            home = models.Team(name=f"Home {court}")
+            away = models.Team(name=f"Away {court}")
+            db.add_all([home, away])
+            db.flush()
+
+            tie = models.Tie(
+                tie_no=court,
+                day=1,
+                session="morning",
+                court=court,
+                team1_id=home.id,
+                team2_id=away.id,
+                status="pending",
+            )
+            db.add(tie)
+            db.flush()
+
+            ties[tie.id] = [
+                models.Match(
+                    stage="tie",
+                    status="pending",
+                    tie_id=tie.id,
+                    match_no=match_no,
+                    discipline=f"Game {match_no} Singles",
+                    team1_id=home.id,
+                    team2_id=away.id,
+                    team1_lineup=f"H{match_no}",
+                    team2_lineup=f"A{match_no}",
+                    lineup_confirmed=True,
+                    day=1,
+                    session="morning",
+                    court=court,
+                    time="09:00",
+                    referee_id=referee.id,
+                )
+                for match_no in range(1, MATCHES_PER_TIE + 1)
+            ]
+            db.add_all(ties[tie.id])
+        db.commit()
+        return {tie_id: [match.id for match in matches] for tie_id, matches in ties.items()}
+
+
+def run_in_threads(targets) -> None:
+    errors: list[BaseException] = []
+
+    def guarded(target):
+        try:
+            target()
+        except BaseException as exc:  # noqa: BLE001 - surfaced to the test below
+            errors.append(exc)
+
+    threads = [threading.Thread(target=guarded, args=(target,)) for target in targets]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if errors:
+        raise errors[0]
+
+
+def test_parallel_writes_keep_tie_scores_exact(file_session_factory):
+    ties = seed_courts(file_session_factory, courts=3)
+
+    def score_rallies(match_ids: list[int]) -> None:
+        for match_id in match_ids:
+            team1_wins = match_id % 3 != 0
+            for rally in range(1, 22):
+                score = (rally, rally // 2) if team1_wins else (rally // 2, rally)
+                with file_session_factory() as db:
+                    crud.update_score(db, match_id, *score)
+
+    # Three writers per tie interleave rallies on different matches of the same tie.
+    targets = []
+    for match_ids in ties.values():
+        for offset in range(3):
+            targets.append(lambda ids=match_ids[offset::3]: score_rallies(ids))
+    run_in_threads(targets)
+
+    with file_session_factory() as db:
+        for tie_id, match_ids in ties.items():
+            tie = db.get(models.Tie, tie_id)
+            expected_team2 = sum(1 for match_id in match_ids if match_id % 3 == 0)
+            assert (tie.score1, tie.score2) == (MATCHES_PER_TIE - expected_team2, expected_team2)
+            assert tie.regular_completed == MATCHES_PER_TIE
+            assert tie.status == "completed"
+
+        checked, repaired = crud.recount_ties(db)
+        assert checked == 3
+        assert repaired == []
+
+
+def test_courts_do_not_serialize_on_each_other(file_session_factory, monkeypatch):
+    ties = seed_courts(file_session_factory, courts=4)
+    load_for_write = crud._get_match_for_write
+    # Every court's first write waits here while holding its tie lock; a lock shared
+    # across ties would keep the other courts out and the barrier would time out.
+    all_courts_writing = threading.Barrier(len(ties), timeout=10)
+    first_write = threading.local()
+
+    def gated_load_for_write(*args, **kwargs):
+        match = load_for_write(*args, **kwargs)
+        if not getattr(first_write, "done", False):
+            first_write.done = True
+            all_courts_writing.wait()
+        return match
+
+    monkeypatch.setattr(crud, "_get_match_for_write", gated_load_for_write)
+
+    def score_court(match_ids: list[int]) -> None:
+        for rally, match_id in enumerate(match_ids[:8], start=1):
+            with file_session_factory() as db:
+                crud.update_score(db, match_id, rally, 0)
+
+    run_in_threads([lambda ids=ids: score_court(ids) for ids in ties.values()])
+
+    with file_session_factory() as db:
+        for tie in db.query(models.Tie).all():
+            assert tie.started_matches == 8
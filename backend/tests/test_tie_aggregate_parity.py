@@ -0,0 +1,63 @@
+import random
+
+from test_api import seed_full_tie
+
+from app import crud, models
+
+
+def random_score(rng: random.Random) -> tuple[int, int]:
+    kind = rng.random()
+    if kind < 0.4:
+        return rng.randint(0, 20), rng.randint(0, 20)
+    if kind < 0.8:
+        loser = rng.randint(0, 19)
+        return (21, loser) if rng.random() < 0.5 else (loser, 21)
+    high = rng.randint(22, 30)
+    return (high, high - 2) if rng.random() < 0.5 else (high - 2, high)
+
+
+def run_scenario(factory, seed: int) -> list[tuple[object, ...]]:
+    rng = random.Random(seed)
+    match_ids = seed_full_tie(factory)
+    outcomes: list[tuple[object, ...]] = []
+
+    for _ in range(250):
+        match_id = rng.choice(match_ids)
+        action = rng.random()
+        with factory() as db:
+            try:
+                if action < 0.15:
+                    crud.assign_referee(db, match_id=match_id, name="Umpire")
+                elif action < 0.25:
+                    crud.update_match_status(
+                        db, match_id=match_id, status=rng.choice(["pending", "live"])
+                    )
+                else:
+                    score1, score2 = random_score(rng)
+                    crud.update_score(db, match_id, score1, score2)
+                outcomes.append(("ok",))
+            except (LookupError, ValueError) as exc:
+                outcomes.append(("error", str(exc)))
+
+    with factory() as db:
+        tie = db.query(models.Tie).one()
+        outcomes.append(crud._tie_aggregates(tie))
+        for match in db.query(models.Match).order_by(models.Match.match_no).all():
+            outcomes.append(
+                (
+                    match.match_no,
+                    match.status,
+                    match.team1_score,
+                    match.team2_score,
+                    match.winner_side,
+                )
+            )
+
+    return outcomes
+
+
+def test_python_and_trigger_engines_agree_on_random_scoring(make_session_factory):
+    for seed in range(3):
+        python_run = run_scenario(make_session_factory("python"), seed)
+        trigger_run = run_scenario(make_session_factory("trigger"), seed)
+        assert python_run == trigger_run